@@ -0,0 +1,62 @@
+"""Аутентификация по JWT без запроса пользователя из базы данных."""
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from users.models import User
+from users.tokens import (GENERATION_CLAIM, cached_generation,
+                          remember_generation)
+
+from .metrics import phase
+
+
+class ClaimsUser(TokenUser):
+    """Пользователь из claims токена для проверок прав.
+
+    Модель User загружается из базы, только когда к ней обращаются
+    через full_user."""
+
+    @cached_property
+    def role(self):
+        return self.token['role']
+
+    @property
+    def is_admin(self):
+        return self.role == User.admin
+
+    @property
+    def is_moder(self):
+        return self.role == User.moderator
+
+    @cached_property
+    def instance(self):
+        return User.objects.get(pk=self.id)
+
+
+def full_user(user):
+    """Модель пользователя запроса, даже если он собран из токена."""
+    if isinstance(user, ClaimsUser):
+        return user.instance
+    return user
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """Доверяет claims токена, если его поколение совпадает с текущим.
+
+    Токены без claims, выданные до их появления, и токены устаревшего
+    поколения проверяются по базе данных как раньше."""
+
+    def authenticate(self, request):
+        with phase(request, 'auth'):
+            return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if GENERATION_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+        generation = cached_generation(
+            validated_token.get(api_settings.USER_ID_CLAIM))
+        if generation == validated_token[GENERATION_CLAIM]:
+            return ClaimsUser(validated_token)
+        user = super().get_user(validated_token)
+        remember_generation(user)
+        return user
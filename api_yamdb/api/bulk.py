@@ -0,0 +1,243 @@
+"""Массовое создание и изменение произведений, жанров и категорий.
+
+Запрос - массив объектов, не больше BULK_MAX_ITEMS. Сначала проверяются
+все элементы, затем все slug жанров и категорий находятся одним
+запросом на модель. Если хоть один элемент с ошибкой, ответ 400
+содержит список ошибок по позициям (пустой словарь у верных элементов)
+и ничего не записывается. Иначе запись идет через bulk_create и
+bulk_update в одной транзакции. Сигналы моделей при этом не
+вызываются, поэтому версии, кеши и индекс поиска сбрасываются здесь,
+как после загрузки CSV, - после фиксации транзакции, чтобы откат не
+сбрасывал их напрасно, а читатели не кешировали незафиксированные
+данные."""
+from django.conf import settings
+from django.db import transaction
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
+from reviews.models import Category, Genre, GenreTitle, Title
+from reviews.search import title_index
+from reviews.stats import mark_all_dirty
+from reviews.versions import CATALOGUE, TITLES, bump_versions
+
+from .cache import invalidate_models
+
+REQUIRED = serializers.Field.default_error_messages['required']
+
+
+class BulkTitleSerializer(serializers.ModelSerializer):
+    """Элемент массива произведений: slug вместо связанных объектов."""
+
+    id = serializers.IntegerField(required=False)
+    genre = serializers.ListField(child=serializers.SlugField())
+    category = serializers.SlugField(required=False, allow_null=True)
+
+    class Meta:
+        model = Title
+        fields = ('id', 'name', 'year', 'description', 'genre', 'category')
+
+
+class BulkGenreSerializer(serializers.ModelSerializer):
+    """Уникальность slug проверяется одним запросом на весь массив."""
+
+    class Meta:
+        model = Genre
+        fields = ('name', 'slug')
+        extra_kwargs = {'slug': {'validators': []}}
+
+
+class BulkCategorySerializer(BulkGenreSerializer):
+
+    class Meta(BulkGenreSerializer.Meta):
+        model = Category
+
+
+def validate_items(serializer, data):
+    """Проверяет элементы по одному: (данные или None, ошибки)."""
+    if not isinstance(data, list):
+        raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+            'Ожидается массив объектов.']})
+    if len(data) > settings.BULK_MAX_ITEMS:
+        raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+            f'Не больше {settings.BULK_MAX_ITEMS} объектов за запрос.']})
+    items, errors = [], []
+    for item in data:
+        try:
+            items.append(serializer.run_validation(item))
+            errors.append({})
+        except ValidationError as error:
+            items.append(None)
+            errors.append(error.detail)
+    return items, errors
+
+
+def add_error(errors, index, field, message):
+    errors[index].setdefault(field, []).append(message)
+
+
+def slug_ids(model, slugs):
+    """slug -> id для всех slug одним запросом."""
+    if not slugs:
+        return {}
+    return dict(model.objects.filter(slug__in=slugs).values_list(
+        'slug', 'id'))
+
+
+def resolve_title_slugs(items, errors):
+    """Находит id жанров и категорий, отмечая неизвестные slug."""
+    valid = [item for item in items if item is not None]
+    genres = slug_ids(Genre, {
+        slug for item in valid for slug in item.get('genre', ())})
+    categories = slug_ids(Category, {
+        item['category'] for item in valid if item.get('category')})
+    for index, item in enumerate(items):
+        if item is None:
+            continue
+        for slug in item.get('genre', ()):
+            if slug not in genres:
+                add_error(errors, index, 'genre', f'Жанр {slug} не найден.')
+        slug = item.get('category')
+        if slug and slug not in categories:
+            add_error(errors, index, 'category',
+                      f'Категория {slug} не найдена.')
+    return genres, categories
+
+
+def raise_for_errors(errors):
+    if any(errors):
+        raise ValidationError(errors)
+
+
+def insert_titles(titles):
+    """bulk_create с id созданных строк в порядке массива."""
+    Title.objects.bulk_create(titles)
+    if titles and titles[0].pk is None:
+        # SQLite не возвращает id из INSERT. Блокировка записи держится
+        # с первой вставки до конца транзакции, поэтому новые строки -
+        # последние len(titles) id таблицы.
+        ids = Title.objects.order_by('-id').values_list(
+            'id', flat=True)[:len(titles)]
+        for title, pk in zip(titles, reversed(ids)):
+            title.pk = pk
+    return [title.pk for title in titles]
+
+
+def link_genres(title_ids, items, genres):
+    GenreTitle.objects.bulk_create(
+        GenreTitle(title_id=title_id, genre_id=genres[slug])
+        for title_id, item in zip(title_ids, items)
+        for slug in dict.fromkeys(item['genre'])
+    )
+
+
+def catalogue_written(*models):
+    """То, что при обычном сохранении делают сигналы моделей."""
+    bump_versions(TITLES, CATALOGUE)
+    mark_all_dirty()
+    title_index.reset()
+    invalidate_models(*models)
+
+
+def create_titles(data):
+    """Создает произведения; возвращает их id в порядке массива."""
+    items, errors = validate_items(BulkTitleSerializer(), data)
+    genres, categories = resolve_title_slugs(items, errors)
+    raise_for_errors(errors)
+    titles = [
+        Title(name=item['name'], year=item['year'],
+              description=item.get('description', ''),
+              category_id=categories.get(item.get('category')))
+        for item in items
+    ]
+    with transaction.atomic():
+        title_ids = insert_titles(titles)
+        link_genres(title_ids, items, genres)
+        transaction.on_commit(lambda: catalogue_written(Title, GenreTitle))
+    return title_ids
+
+
+def find_titles(items, errors):
+    """Произведения элементов по id одним запросом."""
+    for index, item in enumerate(items):
+        if item is not None and 'id' not in item:
+            add_error(errors, index, 'id', REQUIRED)
+    titles = Title.objects.in_bulk(
+        [item['id'] for item in items if item and 'id' in item])
+    for index, item in enumerate(items):
+        if item and 'id' in item and item['id'] not in titles:
+            add_error(errors, index, 'id',
+                      f'Произведение {item["id"]} не найдено.')
+    return titles
+
+
+def apply_changes(titles, items, categories):
+    """Меняет объекты; возвращает измененные поля и элементы с genre."""
+    fields, relinked = set(), []
+    for item in items:
+        title = titles[item['id']]
+        for field in ('name', 'year', 'description'):
+            if field in item:
+                setattr(title, field, item[field])
+                fields.add(field)
+        if 'category' in item:
+            title.category_id = categories.get(item['category'])
+            fields.add('category')
+        if 'genre' in item:
+            relinked.append(item)
+    return fields, relinked
+
+
+def update_titles(data):
+    """Изменяет переданные поля произведений по id.
+
+    Если передан genre, жанры произведения заменяются целиком."""
+    items, errors = validate_items(BulkTitleSerializer(partial=True), data)
+    titles = find_titles(items, errors)
+    genres, categories = resolve_title_slugs(items, errors)
+    raise_for_errors(errors)
+    fields, relinked = apply_changes(titles, items, categories)
+    with transaction.atomic():
+        if fields:
+            Title.objects.bulk_update(titles.values(), fields)
+        if relinked:
+            relinked_ids = [item['id'] for item in relinked]
+            GenreTitle.objects.filter(title_id__in=relinked_ids).delete()
+            link_genres(relinked_ids, relinked, genres)
+        transaction.on_commit(lambda: catalogue_written(Title, GenreTitle))
+    return [item['id'] for item in items]
+
+
+def create_groups(serializer, data):
+    """Создает жанры или категории; возвращает их slug."""
+    model = serializer.Meta.model
+    items, errors = validate_items(serializer, data)
+    slugs = [item['slug'] if item else None for item in items]
+    existing = set(slug_ids(model, set(slugs) - {None}))
+    seen = set()
+    for index, slug in enumerate(slugs):
+        if slug in existing or slug in seen:
+            add_error(errors, index, 'slug', f'Slug {slug} уже занят.')
+        seen.add(slug)
+    raise_for_errors(errors)
+    with transaction.atomic():
+        model.objects.bulk_create(model(**item) for item in items)
+        transaction.on_commit(lambda: catalogue_written(model))
+    return slugs
+
+
+def update_groups(serializer, data):
+    """Переименовывает жанры или категории, найденные по slug."""
+    model = serializer.Meta.model
+    items, errors = validate_items(serializer, data)
+    groups = model.objects.in_bulk(
+        [item['slug'] for item in items if item], field_name='slug')
+    for index, item in enumerate(items):
+        if item and item['slug'] not in groups:
+            add_error(errors, index, 'slug', f'Slug {item["slug"]} не найден.')
+    raise_for_errors(errors)
+    for item in items:
+        groups[item['slug']].name = item['name']
+    with transaction.atomic():
+        model.objects.bulk_update(groups.values(), ('name',))
+        transaction.on_commit(lambda: catalogue_written(model))
+    return [item['slug'] for item in items]
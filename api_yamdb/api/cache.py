@@ -0,0 +1,120 @@
+"""Кеш ответов публичных справочников для анонимных GET-запросов.
+
+Ключ строится из группы ресурсов, ее поколения, версии API, пути и
+строки запроса. Изменение модели увеличивает поколение затронутых групп,
+и все их старые записи перестают находиться без перебора ключей.
+Поколение сдвигается после фиксации транзакции: иначе читатель успел
+бы закешировать еще старые данные под новым поколением."""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.response import Response
+from reviews.models import Category, Genre, GenreTitle, Review, Title
+
+INVALIDATED_BY = {
+    Title: ('titles',),
+    GenreTitle: ('titles',),
+    Review: ('titles',),
+    Genre: ('genres', 'titles'),
+    Category: ('categories', 'titles'),
+}
+STATS = ('hits', 'misses', 'invalidations')
+
+
+def get_cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+def generation_key(group):
+    return f'api-cache:generation:{group}'
+
+
+def stat_key(name):
+    return f'api-cache:stats:{name}'
+
+
+def increment(cache, key):
+    # incr атомарен в общих бэкендах, но требует существующего ключа.
+    cache.add(key, 0, None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+        return 1
+
+
+def invalidate(*groups):
+    cache = get_cache()
+    for group in groups:
+        increment(cache, generation_key(group))
+        increment(cache, stat_key('invalidations'))
+
+
+def invalidate_models(*models):
+    """Сбрасывает группы, которые выводят данные моделей."""
+    invalidate(*{group for model in models
+                 for group in INVALIDATED_BY.get(model, ())})
+
+
+def cache_stats():
+    cache = get_cache()
+    values = cache.get_many([stat_key(name) for name in STATS])
+    return {name: values.get(stat_key(name), 0) for name in STATS}
+
+
+class CachedResponseMixin:
+    """Отдает list и retrieve анонимным пользователям из кеша."""
+
+    cache_group = None
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs)
+
+    def get_cache_key(self, request, generation):
+        query = request.GET.urlencode()
+        if query:
+            query = '&'.join(sorted(query.split('&')))
+        url = hashlib.md5(f'{request.path}?{query}'.encode()).hexdigest()
+        return (f'api-cache:{self.cache_group}:{generation}:'
+                f'{request.version}:{url}')
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+        cache = get_cache()
+        generation = cache.get(generation_key(self.cache_group), 0)
+        key = self.get_cache_key(request, generation)
+        data = cache.get(key)
+        if data is not None:
+            increment(cache, stat_key('hits'))
+            return Response(data, headers={'X-Cache': 'HIT'})
+        increment(cache, stat_key('misses'))
+        response = handler(request, *args, **kwargs)
+        # Потоковые ответы api.streaming не кешируются: у них нет data.
+        if response.status_code == 200 and not response.streaming:
+            cache.set(key, response.data, settings.API_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+def invalidate_on_change(sender, **kwargs):
+    transaction.on_commit(lambda: invalidate_models(sender))
+
+
+for model in INVALIDATED_BY:
+    post_save.connect(invalidate_on_change, sender=model)
+    post_delete.connect(invalidate_on_change, sender=model)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def invalidate_on_genre_change(sender, action, **kwargs):
+    if action.startswith('post_'):
+        transaction.on_commit(lambda: invalidate_models(GenreTitle))
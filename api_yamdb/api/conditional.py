@@ -0,0 +1,70 @@
+"""Условные GET-запросы: ETag и Last-Modified по версиям ресурсов.
+
+Версия читается одним запросом к таблице счетчиков, поэтому ответ
+304 Not Modified отдается до выборки и сериализации данных. Перед 304
+одним запросом exists() проверяется, что ресурс есть: для отсутствующего
+объекта или родителя обработчик отдаст 404."""
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+from reviews.versions import get_versions
+
+
+class ConditionalGetMixin:
+    """Добавляет ETag и Last-Modified к list и retrieve."""
+
+    def get_version_resources(self):
+        raise NotImplementedError(
+            'Укажите ресурсы, от которых зависит ответ.')
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs)
+
+    def get_etag(self, request, versions):
+        source = (f'{versions}|{request.get_full_path()}|'
+                  f'{request.accepted_media_type}')
+        return f'"{hashlib.md5(source.encode()).hexdigest()}"'
+
+    def is_not_modified(self, request, etag, modified):
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            etags = parse_etags(if_none_match)
+            return '*' in etags or etag in etags
+        since = parse_http_date_safe(
+            request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        return bool(since and modified
+                    and int(modified.timestamp()) <= since)
+
+    def resource_exists(self):
+        """Отдаст ли обработчик данные, а не 404."""
+        if self.action != 'retrieve':
+            return True
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            return self.get_queryset().filter(**{
+                self.lookup_field: self.kwargs[lookup_url_kwarg]}).exists()
+        except (TypeError, ValueError, ValidationError):
+            return False
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        versions, modified = get_versions(*self.get_version_resources())
+        etag = self.get_etag(request, versions)
+        if (self.is_not_modified(request, etag, modified)
+                and self.resource_exists()):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        response['ETag'] = etag
+        if modified:
+            response['Last-Modified'] = http_date(modified.timestamp())
+        return response
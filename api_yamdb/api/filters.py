@@ -1,13 +1,72 @@
 import django_filters
-from reviews.models import Title
+from django.db.models import F, Subquery
+from rest_framework.filters import OrderingFilter
+from reviews.models import Category, Genre, GenreTitle, Title
+from reviews.search import search_titles
+
+
+def slug_id(model, slug):
+    """Подзапрос id по slug: фильтр сравнивает столбец id без JOIN."""
+    return Subquery(model.objects.filter(slug=slug).values('id')[:1])
 
 
 class TitleFilter(django_filters.FilterSet):
-    """Фильтры для класса Title"""
-    genre = django_filters.CharFilter(field_name='genre', lookup_expr='slug')
-    category = django_filters.CharFilter(field_name='category',
-                                         lookup_expr='slug')
+    """Фильтры для класса Title.
+
+    Жанр и категория сначала превращаются в id. Жанр проверяется
+    полусоединением с GenreTitle (IN с подзапросом, планировщики
+    выполняют его как EXISTS): произведение с несколькими жанрами не
+    повторяется в выдаче. Индексы под фильтры - GenreTitle(genre,
+    title) и Title(category, year)."""
+    genre = django_filters.CharFilter(method='filter_genre')
+    category = django_filters.CharFilter(method='filter_category')
+    search = django_filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Title
         fields = ['genre', 'category', 'year', 'name']
+
+    def filter_genre(self, queryset, name, value):
+        return queryset.filter(id__in=GenreTitle.objects.filter(
+            genre_id=slug_id(Genre, value)).values('title_id'))
+
+    def filter_category(self, queryset, name, value):
+        return queryset.filter(category_id=slug_id(Category, value))
+
+    def filter_search(self, queryset, name, value):
+        """Полнотекстовый поиск по названию и описанию, по рангу."""
+        return search_titles(queryset, value)
+
+
+class TitleOrderingFilter(OrderingFilter):
+    """ordering= по хранимым индексированным столбцам произведения.
+
+    review_count - количество отзывов, оно же количество оценок.
+    Произведения без рейтинга при сортировке по нему всегда в конце.
+    Последним ключом добавляется id в направлении первого поля, чтобы
+    порядок был однозначным и совпадал с составными индексами."""
+
+    ordering_fields = ('name', 'year', 'rating', 'review_count')
+    aliases = {'review_count': 'rating_count'}
+
+    def get_default_ordering(self, view):
+        # Без параметра остается порядок queryset, например ранг поиска.
+        return None
+
+    def filter_queryset(self, request, queryset, view):
+        ordering = self.get_ordering(request, queryset, view)
+        if not ordering:
+            return queryset
+        expressions = []
+        for term in ordering:
+            name = term.lstrip('-')
+            name = self.aliases.get(name, name)
+            # NULLS LAST только у столбцов с NULL: иначе PostgreSQL не
+            # сопоставит порядок с обратным проходом по индексу.
+            nulls_last = queryset.model._meta.get_field(name).null or None
+            if term.startswith('-'):
+                expressions.append(F(name).desc(nulls_last=nulls_last))
+            else:
+                expressions.append(F(name).asc(nulls_last=nulls_last))
+        tie_breaker = F('id').desc() if ordering[0].startswith('-') else 'id'
+        return queryset.order_by(*expressions, tie_breaker)
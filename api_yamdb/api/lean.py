@@ -0,0 +1,112 @@
+"""Быстрый вывод списков только для чтения.
+
+ModelSerializer собирает ответ поле за полем и на каждое произведение
+создает вложенные сериализаторы жанров и категории. В list строки
+выбираются через .values(), а словари ответа собираются напрямую, с
+теми же ключами в том же порядке, что у сериализаторов. Совпадение
+JSON побайтно проверяют тесты. Отключается настройкой
+LEAN_LIST_SERIALIZATION."""
+from collections import defaultdict
+
+from django.conf import settings
+from rest_framework.fields import DateTimeField
+from rest_framework.response import Response
+from reviews.models import GenreTitle
+
+# Даты форматируются тем же полем DRF, что и в сериализаторах.
+DATETIME = DateTimeField()
+
+
+class LeanSerializer:
+    """Строки .values() с путями fields -> список словарей ответа."""
+
+    fields = ()
+
+    def rows(self, queryset):
+        return queryset.prefetch_related(None).values(*self.fields)
+
+    def to_representation(self, rows):
+        raise NotImplementedError('.to_representation() must be overridden')
+
+
+class LeanTitleSerializer(LeanSerializer):
+    """Как TitleSerializer; жанры страницы - одним запросом."""
+
+    fields = ('id', 'name', 'year', 'description', 'category__name',
+              'category__slug', 'rating', 'rating_count')
+
+    def genres(self, title_ids):
+        # Порядок как у prefetch_related('genre'): Genre.Meta.ordering.
+        genres = defaultdict(list)
+        for title_id, name, slug in GenreTitle.objects.filter(
+                title_id__in=title_ids).order_by('genre__name').values_list(
+                    'title_id', 'genre__name', 'genre__slug'):
+            genres[title_id].append({'name': name, 'slug': slug})
+        return genres
+
+    def to_representation(self, rows):
+        rows = list(rows)
+        genres = self.genres([row['id'] for row in rows])
+        return [{
+            'id': row['id'],
+            'name': row['name'],
+            'year': row['year'],
+            'description': row['description'],
+            'genre': genres.get(row['id'], []),
+            'category': None if row['category__slug'] is None else {
+                'name': row['category__name'],
+                'slug': row['category__slug'],
+            },
+            'rating': row['rating'],
+            'reviews_count': row['rating_count'],
+        } for row in rows]
+
+
+class LeanReviewsSerializer(LeanSerializer):
+    """Как ReviewsSerializer."""
+
+    fields = ('id', 'author__username', 'text', 'score', 'pub_date',
+              'comments_count', 'title_id')
+
+    def to_representation(self, rows):
+        return [{
+            'id': row['id'],
+            'author': row['author__username'],
+            'text': row['text'],
+            'score': row['score'],
+            'pub_date': DATETIME.to_representation(row['pub_date']),
+            'comments_count': row['comments_count'],
+            'title': row['title_id'],
+        } for row in rows]
+
+
+class LeanCommentsSerializer(LeanSerializer):
+    """Как CommentsSerializer."""
+
+    fields = ('id', 'author__username', 'text', 'pub_date', 'review_id')
+
+    def to_representation(self, rows):
+        return [{
+            'id': row['id'],
+            'author': row['author__username'],
+            'text': row['text'],
+            'pub_date': DATETIME.to_representation(row['pub_date']),
+            'review': row['review_id'],
+        } for row in rows]
+
+
+class LeanListMixin:
+    """list через lean_serializer_class вместо serializer_class."""
+
+    lean_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        if (self.lean_serializer_class is None
+                or not settings.LEAN_LIST_SERIALIZATION):
+            return super().list(request, *args, **kwargs)
+        lean = self.lean_serializer_class()
+        queryset = lean.rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(lean.to_representation(page))
+        return Response(lean.to_representation(queryset))
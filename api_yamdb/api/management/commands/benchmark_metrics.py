@@ -0,0 +1,114 @@
+"""Накладные расходы RequestMetricsMiddleware на запрос списка отзывов.
+
+Данные создаются во временной транзакции, которая откатывается.
+Запросы идут через тестовый клиент Django попеременно с замером и без
+него; сравниваются медианы. Отдельно замеряется сама работа замера на
+запрос - она не зависит от шума соседних запросов."""
+import statistics
+import time
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from reviews.models import Review, Title
+from users.models import User
+
+from api.metrics import RequestTimer, RouteMetrics, phase
+
+BUDGET_PERCENT = 1
+REVIEWS = 5
+# Столько запросов к БД делает список отзывов анонима.
+QUERIES = 3
+# Лимит, который не срабатывает: замеряется только сам запрос.
+RATES = {'anon_read': '1000000000/s', 'user_write': None}
+
+
+class Command(BaseCommand):
+    """Сравнивает время запроса с RequestMetricsMiddleware и без него."""
+    help = 'benchmark_metrics'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        rest_framework = {
+            **settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': RATES}
+        without = [name for name in settings.MIDDLEWARE
+                   if name != 'api.metrics.RequestMetricsMiddleware']
+        with transaction.atomic(), override_settings(
+                REST_FRAMEWORK=rest_framework, API_METRICS=True):
+            url = self.fill()
+            clients = {
+                'с замером': self.client(
+                    ['api.metrics.RequestMetricsMiddleware'] + without),
+                'без замера': self.client(without),
+            }
+            times = {name: [] for name in clients}
+            for number in range(options['requests']):
+                # Порядок чередуется, чтобы ни один вариант не шел
+                # всегда первым.
+                order = list(clients.items())
+                if number % 2:
+                    order.reverse()
+                for name, client in order:
+                    started = time.perf_counter()
+                    client.get(url)
+                    times[name].append(time.perf_counter() - started)
+            transaction.set_rollback(True)
+        medians = {name: statistics.median(values) * 1e6
+                   for name, values in times.items()}
+        for name, median in medians.items():
+            self.stdout.write(f'{name:<10}: медиана {median:8.1f} мкс')
+        cost = self.instrumentation_cost(options['requests'])
+        share = cost / medians['без замера'] * 100
+        verdict = 'в пределах' if share < BUDGET_PERCENT else 'больше'
+        self.stdout.write(
+            f'разница медиан: '
+            f'{medians["с замером"] - medians["без замера"]:+.1f} мкс; '
+            f'работа замера: {cost:.1f} мкс на запрос, {share:.2f}% '
+            f'({verdict} {BUDGET_PERCENT}%)'
+        )
+
+    def fill(self):
+        title = Title.objects.create(name='Benchmark', year=2000)
+        for number in range(REVIEWS):
+            author = User.objects.create(
+                username=f'benchmark-metrics-{number}',
+                email=f'benchmark-metrics-{number}@yamdb.fake')
+            Review.objects.create(
+                author=author, title=title, text='Отзыв', score=5)
+        return f'/api/v1/titles/{title.id}/reviews/'
+
+    def client(self, middleware):
+        with override_settings(MIDDLEWARE=middleware):
+            client = Client()
+            # Цепочка middleware собирается при первом запросе.
+            client.get('/api/v1/')
+        return client
+
+    def instrumentation_cost(self, requests):
+        """Работа замера на запрос с тем же числом запросов к БД, но
+        без самих запросов."""
+        metrics = RouteMetrics()
+        started = time.perf_counter()
+        wrappers = connection.execute_wrappers
+        for _ in range(requests):
+            request = SimpleNamespace(metrics_timer=RequestTimer())
+            timer = request.metrics_timer
+            wrappers.append(timer)
+            timer.switch('serialize')
+            for _ in range(QUERIES):
+                timer(noop, '', None, False, {})
+            for name in ('auth', 'render'):
+                with phase(request, name):
+                    pass
+            wrappers.pop()
+            metrics.record('viewsets-list', timer.sample(1000))
+        metrics.histograms()
+        return (time.perf_counter() - started) / requests * 1e6
+
+
+def noop(sql, params, many, context):
+    return None
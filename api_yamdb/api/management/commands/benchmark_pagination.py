@@ -0,0 +1,76 @@
+"""Сравнение задержки первой и дальней страницы отзывов
+при пагинации limit/offset и по курсору."""
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.urls import reverse
+from rest_framework.test import APIClient
+from reviews.models import Review, Title
+from users.models import User
+
+from api.pagination import KeysetPagination
+
+
+class Command(BaseCommand):
+    """Наполняет базу отзывами во временной транзакции и замеряет запросы."""
+    help = 'benchmark_pagination'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page', type=int, default=10000)
+        parser.add_argument('--page-size', type=int, default=5)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        page, size = options['page'], options['page_size']
+        with transaction.atomic():
+            title = self.fill(page * size)
+            url = reverse('viewsets-list', kwargs={'title_id': title.id})
+            offset = (page - 1) * size
+            # Первая страница запрашивается с пустым курсором.
+            cursor = ''
+            if offset:
+                last = title.reviews.order_by(
+                    *KeysetPagination.ordering).values('pub_date', 'id')[
+                        offset - 1]
+                cursor = KeysetPagination.encode_position(
+                    last['pub_date'], last['id'])
+            cases = (
+                ('limit/offset', 1, {'limit': size}),
+                ('limit/offset', page, {'limit': size, 'offset': offset}),
+                ('cursor', 1, {'limit': size, 'cursor': ''}),
+                ('cursor', page, {'limit': size, 'cursor': cursor}),
+            )
+            for mode, number, params in cases:
+                timings = self.measure(url, params, options['repeat'])
+                self.stdout.write(
+                    f'{mode:<13} страница {number:>6}: '
+                    f'медиана {statistics.median(timings):7.2f} мс, '
+                    f'максимум {max(timings):7.2f} мс'
+                )
+            transaction.set_rollback(True)
+
+    def fill(self, total):
+        title = Title.objects.create(name='Benchmark', year=2000)
+        authors = User.objects.bulk_create(
+            User(username=f'benchmark{i}', email=f'benchmark{i}@yamdb.fake')
+            for i in range(total)
+        )
+        if not authors[0].pk:
+            # Не все базы возвращают id после bulk_create.
+            authors = User.objects.filter(username__startswith='benchmark')
+        Review.objects.bulk_create(
+            (Review(author=author, title=title, text='text', score=5)
+             for author in authors))
+        return title
+
+    def measure(self, url, params, repeat):
+        client = APIClient()
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = client.get(url, params)
+            timings.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200, response.status_code
+        return timings
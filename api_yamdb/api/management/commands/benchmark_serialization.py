@@ -0,0 +1,93 @@
+"""Время сборки списка из 1000 строк: ModelSerializer против api.lean.
+
+Данные создаются во временной транзакции, которая откатывается.
+Замер включает выборку из базы и рендеринг JSON."""
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from reviews.models import (Category, Comments, Genre, GenreTitle, Review,
+                            Title)
+from users.models import User
+
+from api.lean import (LeanCommentsSerializer, LeanReviewsSerializer,
+                      LeanTitleSerializer)
+from api.serializers import (CommentsSerializer, ReviewsSerializer,
+                             TitleSerializer)
+from api.views import TitleViewSet
+
+ROWS = 1000
+
+
+class Command(BaseCommand):
+    """Замеряет оба способа вывода на одних и тех же строках."""
+    help = 'benchmark_serialization'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            review = self.fill()
+            cases = (
+                ('titles', TitleViewSet.queryset.all()[:ROWS],
+                 TitleSerializer, LeanTitleSerializer),
+                ('reviews', Review.objects.select_related('author')[:ROWS],
+                 ReviewsSerializer, LeanReviewsSerializer),
+                ('comments', review.comments.select_related('author')[:ROWS],
+                 CommentsSerializer, LeanCommentsSerializer),
+            )
+            for name, queryset, serializer, lean in cases:
+                full = self.measure(
+                    lambda: serializer(queryset.all(), many=True).data,
+                    options['repeat'])
+                fast = self.measure(
+                    lambda: lean().to_representation(
+                        lean().rows(queryset.all())),
+                    options['repeat'])
+                self.stdout.write(
+                    f'{name:<8} на {ROWS} строк: ModelSerializer '
+                    f'{full:7.2f} мс, lean {fast:7.2f} мс, '
+                    f'в {full / fast:4.1f} раза быстрее'
+                )
+            transaction.set_rollback(True)
+
+    def fill(self):
+        categories = [Category.objects.create(
+            name=f'Benchmark {number}', slug=f'benchmark-{number}')
+            for number in range(10)]
+        genres = [Genre.objects.create(
+            name=f'Benchmark {number}', slug=f'benchmark-{number}')
+            for number in range(10)]
+        Title.objects.bulk_create(
+            Title(name=f'Benchmark {number}', year=2000,
+                  description='Описание', rating=number % 10 + 1,
+                  category=categories[number % 10])
+            for number in range(ROWS))
+        titles = list(Title.objects.filter(name__startswith='Benchmark'))
+        GenreTitle.objects.bulk_create(
+            GenreTitle(title=title, genre=genres[(number + shift) % 10])
+            for number, title in enumerate(titles) for shift in range(3))
+        User.objects.bulk_create(
+            User(username=f'benchmark{number}',
+                 email=f'benchmark{number}@yamdb.fake')
+            for number in range(ROWS))
+        authors = list(User.objects.filter(username__startswith='benchmark'))
+        Review.objects.bulk_create(
+            Review(author=author, title=titles[0], text='text', score=5)
+            for author in authors)
+        review = Review.objects.filter(title=titles[0]).first()
+        Comments.objects.bulk_create(
+            Comments(author=author, review=review, text='text')
+            for author in authors)
+        return review
+
+    def measure(self, build, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            JSONRenderer().render(build())
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,77 @@
+"""План и задержка первой страницы списка произведений при разных ordering=.
+
+Произведения создаются во временной транзакции, которая откатывается."""
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.urls import reverse
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from reviews.models import Title
+
+from api.views import TitleViewSet
+
+ORDERINGS = ('name', '-year', '-rating', 'rating', '-review_count')
+
+
+class Command(BaseCommand):
+    """Выводит EXPLAIN запроса страницы и время ответа для каждого порядка."""
+    help = 'benchmark_title_ordering'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--titles', type=int, default=100000)
+        parser.add_argument('--page-size', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        size = options['page_size']
+        with transaction.atomic():
+            self.fill(options['titles'])
+            url = reverse('titles-list')
+            for ordering in ORDERINGS:
+                params = {'ordering': ordering, 'limit': size}
+                self.stdout.write(f'ordering={ordering}')
+                self.stdout.write(self.explain(params, size))
+                timings = self.measure(url, params, options['repeat'])
+                self.stdout.write(
+                    f'медиана {statistics.median(timings):7.2f} мс, '
+                    f'максимум {max(timings):7.2f} мс\n'
+                )
+            transaction.set_rollback(True)
+
+    def fill(self, total):
+        generator = random.Random(0)
+        titles = []
+        for number in range(total):
+            count = generator.randrange(0, 50)
+            # Примерно у трети произведений еще нет оценок.
+            if count < 15:
+                count = 0
+            score_sum = sum(generator.randint(1, 10) for _ in range(count))
+            titles.append(Title(
+                name=f'Benchmark {generator.random():.12f}',
+                year=generator.randint(1900, 2022),
+                rating_sum=score_sum,
+                rating_count=count,
+                rating=round(score_sum / count) if count else None,
+            ))
+        Title.objects.bulk_create(titles)
+
+    def explain(self, params, size):
+        request = Request(APIRequestFactory().get('/', params))
+        view = TitleViewSet(request=request, action='list', kwargs={})
+        queryset = view.filter_queryset(view.get_queryset())
+        return queryset.select_related(None)[:size].explain()
+
+    def measure(self, url, params, repeat):
+        client = APIClient()
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = client.get(url, params)
+            timings.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200, response.status_code
+        return timings
@@ -0,0 +1,114 @@
+"""Нагрузочный тест запущенного сервера: позволяет сравнить запуск
+через WSGI и ASGI при одинаковом лимите памяти контейнера.
+
+Пример: python manage.py loadtest http://127.0.0.1:8000 --slow-clients 20"""
+import http.client
+import math
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand
+
+DEFAULT_PATHS = (
+    '/api/v1/titles/',
+    '/api/v1/titles/?limit=20',
+    '/api/v1/genres/',
+)
+
+
+class Command(BaseCommand):
+    """Держит постоянную нагрузку и медленных клиентов, считает задержки."""
+    help = 'loadtest'
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='Адрес сервера, например '
+                                        'http://127.0.0.1:8000')
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='Путь для запросов, можно несколько.')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--duration', type=float, default=30.0)
+        parser.add_argument(
+            '--slow-clients', type=int, default=0,
+            help='Сколько клиентов отправляют запрос по байту в секунду.')
+
+    def handle(self, *args, **options):
+        self.target = urlsplit(options['url'])
+        self.paths = options['paths'] or DEFAULT_PATHS
+        self.deadline = time.monotonic() + options['duration']
+        self.timings, self.errors = [], []
+        self.lock = threading.Lock()
+        threads = [
+            threading.Thread(target=self.slow_client, daemon=True)
+            for _ in range(options['slow_clients'])
+        ] + [
+            threading.Thread(target=self.worker, args=(number,))
+            for number in range(options['concurrency'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            if not thread.daemon:
+                thread.join()
+        self.report(self.timings, self.errors, options['duration'])
+
+    def worker(self, number):
+        """Шлет запросы по одному keep-alive соединению до конца теста."""
+        connection = http.client.HTTPConnection(
+            self.target.hostname, self.target.port or 80, timeout=30)
+        index = number
+        while time.monotonic() < self.deadline:
+            path = self.paths[index % len(self.paths)]
+            index += 1
+            started = time.perf_counter()
+            try:
+                connection.request('GET', path)
+                response = connection.getresponse()
+                response.read()
+                ok = response.status == 200
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                ok = False
+            elapsed = (time.perf_counter() - started) * 1000
+            with self.lock:
+                (self.timings if ok else self.errors).append(elapsed)
+
+    def slow_client(self):
+        """Передает запрос по байту в секунду и держит соединение."""
+        address = (self.target.hostname, self.target.port or 80)
+        request = (f'GET {self.paths[0]} HTTP/1.1\r\n'
+                   f'Host: {self.target.hostname}\r\n\r\n').encode()
+        while time.monotonic() < self.deadline:
+            try:
+                with socket.create_connection(address, 30) as sock:
+                    for byte in request:
+                        if time.monotonic() >= self.deadline:
+                            return
+                        sock.send(bytes((byte,)))
+                        time.sleep(1)
+                    sock.recv(65536)
+            except OSError:
+                time.sleep(1)
+
+    def report(self, timings, errors, duration):
+        self.stdout.write(
+            f'Запросов: {len(timings)}, ошибок: {len(errors)}, '
+            f'{len(timings) / duration:.1f} запросов/с'
+        )
+        if not timings:
+            return
+        ordered = sorted(timings)
+        self.stdout.write(
+            f'Задержка, мс: p50 {percentile(ordered, 50):.1f}, '
+            f'p95 {percentile(ordered, 95):.1f}, '
+            f'p99 {percentile(ordered, 99):.1f}, '
+            f'максимум {ordered[-1]:.1f}'
+        )
+
+
+def percentile(ordered, percent):
+    """Перцентиль по ближайшему рангу в отсортированном списке.
+
+    statistics.quantiles появился только в Python 3.8."""
+    return ordered[max(0, math.ceil(len(ordered) * percent / 100) - 1)]
@@ -0,0 +1,277 @@
+"""Время, запросы к БД и размер ответа по маршрутам.
+
+RequestMetricsMiddleware замеряет каждый запрос и относит его к имени
+маршрута (titles-list, viewsets-detail, comments-list). Время делится
+на непересекающиеся фазы, их сумма - полное время запроса (total):
+
+auth - аутентификация DRF, см. ClaimsJWTAuthentication;
+db - выполнение SQL, считается через execute_wrapper подключения;
+serialize - остальное время представления: права, фильтры,
+  сериализаторы;
+render - кодирование ответа, см. FastJSONRenderer;
+other - прочие middleware и разбор URL.
+
+Значения копятся в гистограммах в памяти процесса. Корзины, как в
+HdrHistogram, растут степенями двойки и делятся на 64 равные части,
+поэтому квантиль отличается от точного не больше чем на 1/64, а
+значение попадает в корзину одной операцией со словарем. При
+нескольких процессах у каждого свои гистограммы. Текст в формате
+Prometheus отдает /metrics."""
+import math
+import threading
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+PHASES = ('auth', 'db', 'serialize', 'render', 'other')
+NAMES = ('total', ) + PHASES + ('queries', 'bytes')
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+# Значения до 2 ** PRECISION_BITS хранятся точно, большие - с шагом
+# не больше 1/64 значения.
+PRECISION_BITS = 7
+UNRESOLVED = 'unresolved'
+FOLD_EVERY = 1000
+
+
+class Histogram:
+    """Распределение неотрицательных целых значений.
+
+    Ключ корзины - одно число: сдвиг в старших битах, старшие
+    PRECISION_BITS бит значения в младших. Ключи упорядочены так же,
+    как значения."""
+
+    def __init__(self):
+        self.counts = {}
+        self.total = 0
+        self.max = 0
+
+    def record(self, value):
+        shift = value.bit_length() - PRECISION_BITS
+        key = value if shift <= 0 else shift << 8 | value >> shift
+        counts = self.counts
+        counts[key] = counts.get(key, 0) + 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def count(self):
+        return sum(self.counts.values())
+
+    def quantile(self, quantile):
+        """Верхняя граница корзины, в которую попал квантиль."""
+        rank = max(1, math.ceil(quantile * self.count))
+        seen = 0
+        for key in sorted(self.counts):
+            seen += self.counts[key]
+            if seen >= rank:
+                shift = key >> 8
+                return min(((key & 0xff) + 1 << shift) - 1, self.max)
+        return self.max
+
+
+class RouteMetrics:
+    """Гистограммы по маршрутам: маршрут -> имя величины -> Histogram.
+
+    Запрос только добавляет значения в очередь, в гистограммы они
+    переносятся пачками по FOLD_EVERY и перед выгрузкой."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = {}
+        self.pending = []
+
+    def record(self, route, sample):
+        """sample - значения величин в порядке NAMES."""
+        with self.lock:
+            self.pending.append((route, sample))
+            if len(self.pending) >= FOLD_EVERY:
+                self.fold()
+
+    def fold(self):
+        routes = self.routes
+        for route, sample in self.pending:
+            histograms = routes.get(route)
+            if histograms is None:
+                histograms = routes[route] = {
+                    name: Histogram() for name in NAMES}
+            for histogram, value in zip(histograms.values(), sample):
+                histogram.record(value)
+        self.pending.clear()
+
+    def histograms(self):
+        """Все значения, включая еще не перенесенные из очереди."""
+        with self.lock:
+            self.fold()
+            return self.routes
+
+    def export(self):
+        """Квантили, сумма и количество в текстовом формате Prometheus."""
+        lines = []
+        with self.lock:
+            self.fold()
+            for metric, kind, help_text, names, scale in EXPORTED:
+                lines.append(f'# HELP {metric} {help_text}')
+                lines.append(f'# TYPE {metric} summary')
+                for route in sorted(self.routes):
+                    for name in names:
+                        lines.extend(summary_lines(
+                            metric, labels(route, kind, name),
+                            self.routes[route][name], scale))
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        with self.lock:
+            self.routes.clear()
+            self.pending.clear()
+
+
+# Метрика, метка, описание, величины и множитель к единицам метрики.
+EXPORTED = (
+    ('api_request_duration_seconds', 'phase',
+     'Время запроса к API целиком (total) и по фазам.',
+     ('total', ) + PHASES, 1e-6),
+    ('api_request_queries', None,
+     'Количество запросов к БД на один запрос к API.', ('queries', ), 1),
+    ('api_response_bytes', None,
+     'Размер тела ответа в байтах.', ('bytes', ), 1),
+)
+
+
+def labels(route, kind, name):
+    if kind is None:
+        return f'route="{route}"'
+    return f'route="{route}",{kind}="{name}"'
+
+
+def summary_lines(metric, label, histogram, scale):
+    for quantile in QUANTILES:
+        value = histogram.quantile(quantile) * scale
+        yield f'{metric}{{{label},quantile="{quantile}"}} {value:g}'
+    yield f'{metric}_sum{{{label}}} {histogram.total * scale:g}'
+    yield f'{metric}_count{{{label}}} {histogram.count}'
+
+
+route_metrics = RouteMetrics()
+
+
+class RequestTimer:
+    """Фазы одного запроса: время идет текущей фазе до смены фазы.
+
+    Экземпляр служит и оберткой execute_wrapper: запросы к БД
+    считаются и их время относится к фазе db."""
+
+    def __init__(self):
+        self.phase = 'other'
+        self.started = self.mark = perf_counter()
+        self.spent = dict.fromkeys(PHASES, 0.0)
+        self.queries = 0
+
+    def switch(self, phase):
+        """Начинает фазу phase; возвращает прежнюю."""
+        now = perf_counter()
+        self.spent[self.phase] += now - self.mark
+        previous, self.phase, self.mark = self.phase, phase, now
+        return previous
+
+    def __call__(self, execute, sql, params, many, context):
+        # Без смены фазы: время запроса переносится из текущей фазы в
+        # db, так на запрос к БД уходит два вызова perf_counter.
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = perf_counter() - started
+            spent = self.spent
+            spent[self.phase] -= elapsed
+            spent['db'] += elapsed
+            self.queries += 1
+
+    def sample(self, size):
+        """Значения запроса в порядке NAMES, время в микросекундах."""
+        self.switch('other')
+        spent = self.spent
+        return (
+            int((self.mark - self.started) * 1e6),
+            *[int(spent[phase] * 1e6) for phase in PHASES],
+            self.queries,
+            size,
+        )
+
+
+class phase:
+    """Относит время блока with к фазе name, если запрос замеряется.
+
+    request - HttpRequest или Request DRF, который отдает атрибуты
+    исходного запроса. Класс, а не contextmanager: блок выполняется
+    на каждом запросе, а генератор заметно дороже."""
+
+    __slots__ = ('timer', 'name', 'previous')
+
+    def __init__(self, request, name):
+        self.timer = getattr(request, 'metrics_timer', None)
+        self.name = name
+
+    def __enter__(self):
+        if self.timer is not None:
+            self.previous = self.timer.switch(self.name)
+
+    def __exit__(self, *exc_info):
+        if self.timer is not None:
+            self.timer.switch(self.previous)
+
+
+def route_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNRESOLVED
+    return match.url_name or match.view_name
+
+
+class RequestMetricsMiddleware:
+    """Замеряет запросы; ставится первым в MIDDLEWARE.
+
+    Потоковый ответ учитывается, когда тело отдано целиком."""
+
+    def __init__(self, get_response):
+        if not settings.API_METRICS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = request.metrics_timer = RequestTimer()
+        # То же, что connection.execute_wrapper(timer), без генератора
+        # contextmanager на каждом запросе.
+        wrappers = connection.execute_wrappers
+        wrappers.append(timer)
+        try:
+            response = self.get_response(request)
+        finally:
+            wrappers.pop()
+        route = route_name(request)
+        if response.streaming:
+            timer.switch('other')
+            response.streaming_content = self.stream(
+                timer, route, response.streaming_content)
+        else:
+            route_metrics.record(route, timer.sample(len(response.content)))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_timer.switch('serialize')
+
+    def stream(self, timer, route, content):
+        size = 0
+        chunks = iter(content)
+        with connection.execute_wrapper(timer):
+            while True:
+                timer.switch('serialize')
+                chunk = next(chunks, None)
+                timer.switch('other')
+                if chunk is None:
+                    break
+                size += len(chunk)
+                yield chunk
+        route_metrics.record(route, timer.sample(size))
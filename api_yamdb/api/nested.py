@@ -0,0 +1,57 @@
+"""Родительские объекты вложенных маршрутов.
+
+Маршрут titles/<title_id>/reviews/<review_id>/comments задает цепочку
+title -> review. Список фильтруется по всей цепочке сразу, без чтения
+родителя: комментарии отбираются по review_id и title_id отзыва одним
+запросом. Родитель загружается только для создания объекта и для
+пустой страницы, когда нужно отличить пустой список от 404; перед
+ответом 304 проверяется, что родитель существует. Родитель
+проверяется одним запросом: отзыв ищется по id вместе с title_id, а
+существование произведения гарантирует внешний ключ."""
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+
+
+class NestedResourceMixin:
+    """Фильтр по родителям из URL и родитель, загруженный один раз.
+
+    parent_model - ближайший родитель, parent_field - ссылка на него у
+    модели представления, parent_lookups - соответствие аргументов URL
+    полям родителя."""
+
+    parent_model = None
+    parent_field = None
+    parent_lookups = {}
+
+    def get_parent_filter(self):
+        """Условия на родителя по аргументам URL."""
+        return {field: self.kwargs.get(kwarg)
+                for kwarg, field in self.parent_lookups.items()}
+
+    def get_parent(self):
+        """Родитель из URL; 404, если цепочка не сходится."""
+        if not hasattr(self, '_parent'):
+            self._parent = get_object_or_404(
+                self.parent_model, **self.get_parent_filter())
+        return self._parent
+
+    def parent_exists(self):
+        return self.parent_model.objects.filter(
+            **self.get_parent_filter()).exists()
+
+    def resource_exists(self):
+        # Отдельный объект ищется по всей цепочке в get_queryset.
+        if self.action == 'list':
+            return self.parent_exists()
+        return super().resource_exists()
+
+    def get_queryset(self):
+        return self.queryset.filter(**{
+            f'{self.parent_field}__{field}': value
+            for field, value in self.get_parent_filter().items()})
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if not page and not self.parent_exists():
+            raise Http404
+        return page
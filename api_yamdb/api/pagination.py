@@ -0,0 +1,111 @@
+import base64
+import binascii
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(LimitOffsetPagination):
+    """Постраничный вывод по ключу (pub_date, id) вместо смещения.
+
+    Включается параметром cursor: первая страница запрашивается с пустым
+    cursor, следующие - по ссылкам next/previous. Без cursor работает
+    обычная пагинация limit/offset, так что старые клиенты не меняются."""
+
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+    ordering = ('-pub_date', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.position, self.reverse = self.decode_cursor(request)
+        if self.position is not None:
+            pub_date, pk = self.position
+            # Условие на pub_date повторяет OR, но дает PostgreSQL границу
+            # для поиска по индексу (родитель, pub_date, id) вместо его
+            # чтения с начала.
+            if self.reverse:
+                queryset = queryset.filter(
+                    Q(pub_date__gte=pub_date)
+                    & (Q(pub_date__gt=pub_date)
+                       | Q(pub_date=pub_date, id__gt=pk)))
+            else:
+                queryset = queryset.filter(
+                    Q(pub_date__lte=pub_date)
+                    & (Q(pub_date__lt=pub_date)
+                       | Q(pub_date=pub_date, id__lt=pk)))
+        ordering = self.ordering
+        if self.reverse:
+            ordering = [field.lstrip('-') for field in ordering]
+        results = list(queryset.order_by(*ordering)[:self.limit + 1])
+        has_more = len(results) > self.limit
+        self.page = results[:self.limit]
+        if self.reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.position is not None
+        return self.page
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    @staticmethod
+    def encode_position(pub_date, pk, reverse=False):
+        position = f'{int(reverse)}|{pub_date.isoformat()}|{pk}'
+        return base64.urlsafe_b64encode(position.encode()).decode()
+
+    def encode_cursor(self, obj, reverse):
+        # На странице объекты модели или строки .values() из api.lean.
+        if isinstance(obj, dict):
+            cursor = self.encode_position(obj['pub_date'], obj['id'], reverse)
+        else:
+            cursor = self.encode_position(obj.pub_date, obj.pk, reverse)
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.offset_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        cursor = request.query_params[self.cursor_query_param]
+        if not cursor:
+            return None, False
+        try:
+            reverse, pub_date, pk = base64.urlsafe_b64decode(
+                cursor.encode()).decode().split('|')
+            pub_date = parse_datetime(pub_date)
+            pk = int(pk)
+        except (ValueError, UnicodeDecodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if pub_date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return (pub_date, pk), reverse == '1'
@@ -0,0 +1,77 @@
+"""JSON ответов API через orjson, если он установлен.
+
+Вывод совпадает с JSONRenderer DRF при настройках по умолчанию
+(компактный JSON без экранирования Unicode): даты, Decimal и прочие
+типы форматирует тот же JSONEncoder DRF. Кодировщик выбирается
+настройкой API_JSON_ENCODER: auto, orjson или json."""
+import json
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .metrics import phase
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ENCODER = JSONEncoder()
+
+
+def stdlib_dumps(data):
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False,
+                      allow_nan=False, separators=(',', ':')).encode()
+
+
+def orjson_dumps(data):
+    # Даты - через JSONEncoder DRF: он обрезает микросекунды и пишет Z.
+    return orjson.dumps(data, default=ENCODER.default, option=(
+        orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS))
+
+
+def get_dumps():
+    name = settings.API_JSON_ENCODER
+    if name == 'auto':
+        name = 'json' if orjson is None else 'orjson'
+    if name == 'json':
+        return stdlib_dumps
+    if name == 'orjson' and orjson is not None:
+        return orjson_dumps
+    raise ImproperlyConfigured(
+        f'API_JSON_ENCODER: кодировщик {name} недоступен.')
+
+
+def dumps(data):
+    # Как DRF: разделители строк JavaScript экранируются.
+    return get_dumps()(data).replace(
+        b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer с кодировщиком из API_JSON_ENCODER."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        with phase(renderer_context.get('request'), 'render'):
+            if self.get_indent(accepted_media_type, renderer_context):
+                return super().render(
+                    data, accepted_media_type, renderer_context)
+            return dumps(data)
+
+
+class PrometheusTextRenderer(BaseRenderer):
+    """Текстовый формат метрик Prometheus; ошибки - как JSON."""
+
+    media_type = 'text/plain'
+    format = 'txt'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, str):
+            return data.encode(self.charset)
+        return dumps(data)
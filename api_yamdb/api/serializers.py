@@ -1,10 +1,10 @@
+import json
 import re
 
-from django.shortcuts import get_object_or_404
 from rest_framework import serializers
-from rest_framework.serializers import (IntegerField, ModelSerializer,
-                                        ValidationError)
-from reviews.models import Category, Comments, Genre, Review, Title
+from rest_framework.serializers import IntegerField, ModelSerializer
+from reviews.models import (CatalogueStats, Category, Comments, Genre, Review,
+                            Title)
 from users.models import User
 
 REGEXP = r'^[\w.@+-]+\Z'
@@ -17,6 +17,10 @@ def valid_username(value):
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
+    # Уникальность проверяет сама вставка в register_user,
+    # без отдельных запросов к базе на каждое поле.
+    username = serializers.CharField(max_length=150)
+    email = serializers.EmailField(max_length=254)
 
     class Meta:
         fields = ('username', 'email')
@@ -81,16 +85,16 @@ class TitleSerializer(serializers.ModelSerializer):
     category = CategoryTitle(slug_field='slug',
                              required=False,
                              queryset=Category.objects.all())
-    rating = IntegerField(
-        source='reviews__score__avg',
-        read_only=True
-    )
+    rating = IntegerField(read_only=True)
+    # Каждый отзыв несет одну оценку: количество отзывов хранится в
+    # rating_count.
+    reviews_count = IntegerField(source='rating_count', read_only=True)
 
     class Meta:
         model = Title
         fields = ('id', 'name', 'year',
                   'description', 'genre',
-                  'category', 'rating')
+                  'category', 'rating', 'reviews_count')
 
 
 class ReviewsSerializer(ModelSerializer):
@@ -102,17 +106,6 @@ class ReviewsSerializer(ModelSerializer):
         model = Review
         read_only_fields = ('title',)
 
-    def validate(self, data):
-        title_id = self.context.get('view').kwargs.get('title_id')
-        author = self.context.get('request').user
-        title = get_object_or_404(Title, id=title_id)
-        if (title.reviews.filter(author=author).exists()
-                and self.context.get('request').method != 'PATCH'):
-            raise ValidationError(
-                'Можно оставлять только один отзыв!'
-            )
-        return data
-
 
 class CommentsSerializer(ModelSerializer):
     author = serializers.SlugRelatedField(
@@ -122,3 +115,19 @@ class CommentsSerializer(ModelSerializer):
         fields = '__all__'
         model = Comments
         read_only_fields = ('review',)
+
+
+class CatalogueStatsSerializer(ModelSerializer):
+    top_rated = serializers.SerializerMethodField()
+    most_reviewed = serializers.SerializerMethodField()
+
+    class Meta:
+        model = CatalogueStats
+        fields = ('slug', 'titles_count', 'reviews_count', 'average_rating',
+                  'top_rated', 'most_reviewed', 'refreshed')
+
+    def get_top_rated(self, obj):
+        return json.loads(obj.top_rated)
+
+    def get_most_reviewed(self, obj):
+        return json.loads(obj.most_reviewed)
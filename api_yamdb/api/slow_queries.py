@@ -0,0 +1,208 @@
+"""Журнал медленных запросов к БД с планами выполнения.
+
+Включается настройкой SLOW_QUERY_MS: SlowQueryMiddleware оборачивает
+выполнение SQL на время запроса к API, и каждый запрос к БД дольше
+порога попадает в журнал. Запросы группируются по отпечатку - SQL без
+значений, где списки IN сжаты до одного элемента. Для отпечатка
+хранятся маршрут и представление, поле сериализатора, которое
+выполнялось в момент запроса, число срабатываний и время.
+
+Впервые увиденный SELECT разбирается через EXPLAIN (ANALYZE, BUFFERS)
+в PostgreSQL или EXPLAIN QUERY PLAN в SQLite, и запись выводится в
+лог. ANALYZE выполняет запрос еще раз, поэтому план снимается один раз
+на отпечаток, а изменяющие запросы не разбираются. Журнал - LRU на
+SLOW_QUERY_LOG_SIZE отпечатков в памяти процесса, его отдает
+/api/v1/db/slow-queries/. Запросы из тела потокового ответа не
+отслеживаются."""
+import hashlib
+import logging
+import re
+import sys
+import threading
+from collections import OrderedDict
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connection, transaction
+
+from .metrics import route_name
+
+logger = logging.getLogger(__name__)
+
+EXPLAIN = {
+    'postgresql': 'EXPLAIN (ANALYZE, BUFFERS) ',
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+}
+LITERALS = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(?)'),
+    (re.compile(r'\s+'), ' '),
+)
+SERIALIZERS_FILE = 'rest_framework/serializers.py'
+
+
+def normalize(sql):
+    """SQL без значений: одинаковые запросы с разными данными совпадают."""
+    for pattern, replacement in LITERALS:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def fingerprint(sql):
+    return hashlib.md5(normalize(sql).encode()).hexdigest()[:16]
+
+
+def serializer_field():
+    """Поле сериализатора, которое сейчас выводится, или None.
+
+    Ищется ближайший кадр Serializer.to_representation с переменной
+    field. Стек обходится только для медленных запросов."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        if (code.co_name == 'to_representation'
+                and code.co_filename.endswith(SERIALIZERS_FILE)
+                and 'field' in frame.f_locals):
+            serializer = frame.f_locals['self']
+            field = frame.f_locals['field']
+            return f'{type(serializer).__name__}.{field.field_name}'
+        frame = frame.f_back
+    return None
+
+
+def explain(sql, params):
+    """План выполнения SELECT или None, если СУБД не поддерживается."""
+    prefix = EXPLAIN.get(connection.vendor)
+    if prefix is None:
+        return None
+    try:
+        # Ошибка EXPLAIN в PostgreSQL прервала бы транзакцию запроса.
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+    except DatabaseError as error:
+        return f'EXPLAIN не выполнен: {error}'
+
+
+class SlowQueryLog:
+    """Медленные запросы по отпечаткам; не больше max_size записей."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def seen(self, key, milliseconds):
+        """Учитывает повтор; False, если отпечаток новый."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return False
+            self.entries.move_to_end(key)
+            entry['count'] += 1
+            entry['total_ms'] += milliseconds
+            entry['max_ms'] = max(entry['max_ms'], milliseconds)
+            return True
+
+    def add(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def snapshot(self):
+        """Записи от самой долгой к самой быстрой."""
+        with self.lock:
+            entries = [dict(entry) for entry in self.entries.values()]
+        return sorted(entries, key=lambda entry: -entry['max_ms'])
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+slow_query_log = SlowQueryLog(settings.SLOW_QUERY_LOG_SIZE)
+
+
+class SlowQueryWrapper:
+    """Обертка execute_wrapper: замеряет запросы и пишет медленные."""
+
+    def __init__(self, threshold_ms, route=None, view=None, log=None):
+        self.threshold = threshold_ms / 1000
+        self.route = route
+        self.view = view
+        self.log = log or slow_query_log
+        self.explaining = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.explaining:
+            return execute(sql, params, many, context)
+        started = perf_counter()
+        result = execute(sql, params, many, context)
+        elapsed = perf_counter() - started
+        if elapsed >= self.threshold:
+            self.slow(sql, params, many, elapsed * 1000)
+        return result
+
+    def slow(self, sql, params, many, milliseconds):
+        key = fingerprint(sql)
+        if self.log.seen(key, milliseconds):
+            return
+        plan = None
+        if not many and sql.lstrip()[:6].upper() == 'SELECT':
+            self.explaining = True
+            try:
+                plan = explain(sql, params)
+            finally:
+                self.explaining = False
+        entry = {
+            'fingerprint': key,
+            'sql': normalize(sql),
+            'route': self.route,
+            'view': self.view,
+            'field': serializer_field(),
+            'count': 1,
+            'total_ms': milliseconds,
+            'max_ms': milliseconds,
+            'plan': plan,
+        }
+        self.log.add(key, entry)
+        logger.warning(
+            'Медленный запрос %s, %.1f мс, %s (%s), поле %s:\n%s\n%s',
+            key, milliseconds, entry['route'], entry['view'],
+            entry['field'], entry['sql'], plan or 'без плана')
+
+
+def view_name(view_func, method):
+    """TitleViewSet.list для набора представлений, иначе имя класса."""
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return view_func.__name__
+    action = getattr(view_func, 'actions', {}).get(method.lower())
+    if action is None:
+        return view_class.__name__
+    return f'{view_class.__name__}.{action}'
+
+
+class SlowQueryMiddleware:
+    """Включает SlowQueryWrapper на время запроса, если задан порог."""
+
+    def __init__(self, get_response):
+        if not settings.SLOW_QUERY_MS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        wrapper = request.slow_query_wrapper = SlowQueryWrapper(
+            settings.SLOW_QUERY_MS)
+        with connection.execute_wrapper(wrapper):
+            return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        wrapper = request.slow_query_wrapper
+        wrapper.route = route_name(request)
+        wrapper.view = view_name(view_func, request.method)
@@ -0,0 +1,89 @@
+"""Потоковая отдача больших страниц списков.
+
+Страница с limit не меньше API_STREAMING_MIN_LIMIT не собирается в
+памяти целиком: строки читаются через .iterator() (в PostgreSQL -
+серверным курсором) пачками по stream_chunk_size, каждая пачка
+сериализуется и сразу отправляется. Тело ответа побайтно совпадает с
+обычным ответом LimitOffsetPagination."""
+from collections import OrderedDict
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import prefetch_related_objects
+from django.http import StreamingHttpResponse
+from rest_framework.pagination import LimitOffsetPagination
+
+from .renderers import dumps
+
+
+class StreamingListMixin:
+    """list большой страницы потоком; остальные запросы - как обычно."""
+
+    stream_chunk_size = 500
+
+    def should_stream(self, request):
+        paginator = self.paginator
+        if (not isinstance(paginator, LimitOffsetPagination)
+                or getattr(paginator, 'cursor_query_param', None)
+                in request.query_params):
+            return False
+        # Браузерный API и ответы с отступами собираются как обычно.
+        if (request.accepted_renderer.format != 'json'
+                or 'indent' in request.accepted_media_type):
+            return False
+        limit = paginator.get_limit(request)
+        return limit is not None and limit >= settings.API_STREAMING_MIN_LIMIT
+
+    def list(self, request, *args, **kwargs):
+        if not self.should_stream(request):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        paginator = self.paginator
+        # Те же атрибуты, что выставляет paginate_queryset, без выборки
+        # всей страницы в список.
+        paginator.request = request
+        paginator.limit = paginator.get_limit(request)
+        paginator.offset = paginator.get_offset(request)
+        paginator.count = paginator.get_count(queryset)
+        head = dumps(OrderedDict([
+            ('count', paginator.count),
+            ('next', paginator.get_next_link()),
+            ('previous', paginator.get_previous_link()),
+            ('results', []),
+        ]))
+        return StreamingHttpResponse(
+            self.stream_body(head[:-2], queryset, paginator),
+            content_type='application/json')
+
+    def stream_body(self, head, queryset, paginator):
+        yield head
+        separator = b''
+        for data in self.stream_chunks(
+                queryset, paginator.offset, paginator.limit):
+            for item in data:
+                yield separator + dumps(item)
+                separator = b','
+        yield b']}'
+
+    def stream_chunks(self, queryset, offset, limit):
+        """Представления строк страницы пачками."""
+        lean = getattr(self, 'lean_serializer_class', None)
+        if lean is not None and settings.LEAN_LIST_SERIALIZATION:
+            lean = lean()
+            represent = lean.to_representation
+            rows = lean.rows(queryset)
+        else:
+            lookups = queryset._prefetch_related_lookups
+            rows = queryset
+
+            def represent(chunk):
+                # iterator() не выполняет prefetch_related, он делается
+                # отдельно для каждой пачки.
+                prefetch_related_objects(chunk, *lookups)
+                return self.get_serializer(chunk, many=True).data
+        rows = rows[offset:offset + limit].iterator(self.stream_chunk_size)
+        while True:
+            chunk = list(islice(rows, self.stream_chunk_size))
+            if not chunk:
+                return
+            yield represent(chunk)
@@ -0,0 +1,140 @@
+"""Ограничение частоты запросов по алгоритму token bucket.
+
+Лимиты задаются в REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] в формате DRF
+('60/min'): число - емкость корзины, она же допустимый всплеск, и
+столько же токенов восстанавливается за период. Проверка - одна запись
+в словаре корзин, без списка истории запросов, как у SimpleRateThrottle.
+
+Корзины хранятся в памяти процесса (THROTTLE_BUCKETS = 'local') или в
+кеше Django ('cache'), чтобы делить лимит между процессами; в кеше
+чтение и запись не атомарны, и лимит соблюдается приблизительно."""
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """'60/min' -> (емкость, токенов в секунду)."""
+    if rate is None:
+        return None
+    number, period = rate.split('/')
+    capacity = int(number)
+    return capacity, capacity / DURATIONS[period[0]]
+
+
+class LocalBuckets:
+    """Корзины в памяти процесса; число ключей ограничено max_keys."""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self.lock = threading.Lock()
+        self.buckets = OrderedDict()
+
+    def take(self, key, capacity, refill):
+        """Берет токен; возвращает 0 или сколько секунд ждать."""
+        now = time.monotonic()
+        with self.lock:
+            tokens, stamp = self.buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - stamp) * refill)
+            wait = 0 if tokens >= 1 else (1 - tokens) / refill
+            if not wait:
+                tokens -= 1
+            self.buckets[key] = (tokens, now)
+            if len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        return wait
+
+    def clear(self):
+        with self.lock:
+            self.buckets.clear()
+
+
+class CacheBuckets:
+    """Корзины в кеше Django, общие для процессов с общим кешем."""
+
+    def take(self, key, capacity, refill):
+        cache = caches[settings.THROTTLE_CACHE_ALIAS]
+        key = f'throttle:{key}'
+        now = time.time()
+        tokens, stamp = cache.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - stamp) * refill)
+        wait = 0 if tokens >= 1 else (1 - tokens) / refill
+        if not wait:
+            tokens -= 1
+        # Полная корзина равна отсутствующей, ключ можно забыть.
+        cache.set(key, (tokens, now), capacity / refill)
+        return wait
+
+    def clear(self):
+        pass
+
+
+BUCKETS = {'local': LocalBuckets(), 'cache': CacheBuckets()}
+
+
+def get_buckets():
+    return BUCKETS[settings.THROTTLE_BUCKETS]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Базовый класс: подклассы выбирают область лимита для запроса."""
+
+    def get_scope(self, request, view):
+        raise NotImplementedError('.get_scope() must be overridden')
+
+    def get_key(self, request, scope):
+        if request.user and request.user.is_authenticated:
+            return f'{scope}:user:{request.user.pk}'
+        return f'{scope}:ip:{self.get_ident(request)}'
+
+    def allow_request(self, request, view):
+        self.wait_time = 0
+        scope = self.get_scope(request, view)
+        rate = parse_rate(api_settings.DEFAULT_THROTTLE_RATES.get(scope))
+        if rate is None:
+            return True
+        self.wait_time = get_buckets().take(
+            self.get_key(request, scope), *rate)
+        return not self.wait_time
+
+    def wait(self):
+        # Retry-After передается целыми секундами.
+        return math.ceil(self.wait_time)
+
+
+class AnonReadThrottle(TokenBucketThrottle):
+    """Чтение анонимными пользователями."""
+
+    def get_scope(self, request, view):
+        if request.method in SAFE_METHODS and not (
+                request.user and request.user.is_authenticated):
+            return 'anon_read'
+        return None
+
+
+class UserWriteThrottle(TokenBucketThrottle):
+    """Изменяющие запросы авторизованных пользователей."""
+
+    def get_scope(self, request, view):
+        if request.method not in SAFE_METHODS and (
+                request.user and request.user.is_authenticated):
+            return 'user_write'
+        return None
+
+
+class ScopedTokenBucketThrottle(TokenBucketThrottle):
+    """Лимит из атрибута throttle_scope представления, как у DRF."""
+
+    def get_scope(self, request, view):
+        return getattr(view, 'throttle_scope', None)
@@ -1,8 +1,9 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import (CategoryViewSet, CommentsViewSet, GenreViewSet,
-                    ReviewsViewSet, TitleViewSet, UserGetTokenAPIView,
+from .views import (CacheStatsAPIView, CategoryViewSet, CommentsViewSet,
+                    EmailStatsAPIView, GenreViewSet, ReviewsViewSet,
+                    SlowQueriesAPIView, TitleViewSet, UserGetTokenAPIView,
                     UserRegistrationAPIView, UserViewSet)
 
 router_v1 = DefaultRouter()
@@ -21,5 +22,9 @@ router_v1.register(
 urlpatterns = [
     path('v1/auth/signup/', UserRegistrationAPIView.as_view(), name='signup'),
     path('v1/auth/token/', UserGetTokenAPIView.as_view(), name='token'),
+    path('v1/cache/stats/', CacheStatsAPIView.as_view(), name='cache-stats'),
+    path('v1/mail/stats/', EmailStatsAPIView.as_view(), name='mail-stats'),
+    path('v1/db/slow-queries/', SlowQueriesAPIView.as_view(),
+         name='slow-queries'),
     path('v1/', include(router_v1.urls)),
 ]
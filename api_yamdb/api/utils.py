@@ -1,20 +1,14 @@
 import uuid
 
-from django.core.mail import send_mail
+from users.mail import send_mail_later
 
-from api_yamdb.settings import EMAIL_HOST_USER
 
+def make_confirmation_code():
+    return str(uuid.uuid4())
 
-def send_email_with_code(email):
-    """Отправка email с кодом подтверждения регистрации."""
+
+def send_email_with_code(email, code):
+    """Ставит в очередь email с кодом подтверждения регистрации."""
     SUBJECT = 'Подтверждение регистрации Yamdb.'
-    code = uuid.uuid4()
     MESSAGE = f'Your code: {code}'
-    send_mail(
-        SUBJECT,
-        MESSAGE,
-        EMAIL_HOST_USER,
-        [email],
-        fail_silently=False,
-    )
-    return code
+    send_mail_later(SUBJECT, MESSAGE, email)
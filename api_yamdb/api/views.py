@@ -1,43 +1,62 @@
-from django.db.models import Avg
+from django.db import IntegrityError, transaction
 from django.shortcuts import get_object_or_404
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, permissions, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.exceptions import MethodNotAllowed
+from rest_framework.exceptions import (MethodNotAllowed, NotFound, Throttled,
+                                       ValidationError)
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
-from reviews.models import Category, Genre, Review, Title
+from reviews.models import (CatalogueStats, Category, Comments, Genre, Review,
+                            Title)
+from reviews.stats import get_stats
+from reviews.versions import (CATALOGUE, TITLES, comments_resource,
+                              reviews_resource, title_resource)
+from users.codes import token_attempts, verify_code
+from users.mail import get_dispatcher
 from users.models import User
-
-from .filters import TitleFilter
+from users.registration import register_user
+from users.tokens import access_token_for
+
+from .authentication import full_user
+from .bulk import (BulkCategorySerializer, BulkGenreSerializer, create_groups,
+                   create_titles, update_groups, update_titles)
+from .cache import CachedResponseMixin, cache_stats
+from .conditional import ConditionalGetMixin
+from .filters import TitleFilter, TitleOrderingFilter
+from .lean import (LeanCommentsSerializer, LeanListMixin,
+                   LeanReviewsSerializer, LeanTitleSerializer)
+from .metrics import route_metrics
+from .nested import NestedResourceMixin
+from .pagination import KeysetPagination
 from .permissions import (IsAdminOrReadOnly, IsAuthorAdminModeratorOrReadOnly,
                           OnlyAdmin)
-from .serializers import (CategorySerializer, CommentsSerializer,
-                          GenreSerializer, ObtainTokenSerializer,
-                          ReviewsSerializer, TitleSerializer,
-                          UserRegistrationSerializer, UserSerializer)
-from .utils import send_email_with_code
+from .renderers import PrometheusTextRenderer
+from .serializers import (CatalogueStatsSerializer, CategorySerializer,
+                          CommentsSerializer, GenreSerializer,
+                          ObtainTokenSerializer, ReviewsSerializer,
+                          TitleSerializer, UserRegistrationSerializer,
+                          UserSerializer)
+from .slow_queries import slow_query_log
+from .streaming import StreamingListMixin
+from .utils import make_confirmation_code, send_email_with_code
 
 
 class UserRegistrationAPIView(APIView):
     """Создает аккаунт пользователя в БД и отправляет
      на почту код подтверждения для получения токена."""
 
+    throttle_scope = 'signup'
+
     def post(self, request):
         serializer = UserRegistrationSerializer(data=request.data)
-        if not User.objects.filter(
-            username=request.data.get('username'),
-            email=request.data.get('email')
-        ).exists():
-            if serializer.is_valid(raise_exception=True):
-                serializer.save()
-        user = get_object_or_404(
-            User,
-            username=request.data.get('username'),
-            email=request.data.get('email'))
-        confirmation_code = send_email_with_code(request.data.get('email'))
-        user.confirmation_code = confirmation_code
-        user.save()
+        serializer.is_valid(raise_exception=True)
+        email = serializer.validated_data['email']
+        confirmation_code = make_confirmation_code()
+        register_user(
+            serializer.validated_data['username'], email, confirmation_code)
+        send_email_with_code(email, confirmation_code)
         return Response(request.data, status=status.HTTP_200_OK)
 
 
@@ -45,22 +64,66 @@ class UserGetTokenAPIView(APIView):
     """Отправляет пользователю токен
      в случае верного кода подтверждения."""
 
+    throttle_scope = 'token'
+
     def post(self, request):
         serializer = ObtainTokenSerializer(data=request.data)
-        if serializer.is_valid(raise_exception=True):
-            username = request.data.get('username')
-            confirmation_code = request.data.get('confirmation_code')
+        serializer.is_valid(raise_exception=True)
+        username = serializer.validated_data['username']
+        if not token_attempts.allow(username):
+            raise Throttled(wait=token_attempts.retry_after(username))
+        verified = verify_code(
+            username, serializer.validated_data['confirmation_code'])
+        if verified is None:
+            get_object_or_404(User, username=username)
+        if verified:
             user = get_object_or_404(User, username=username)
-            if confirmation_code == user.confirmation_code:
-                refresh = RefreshToken.for_user(user)
-                return Response({
-                    'token': str(refresh.access_token)},
-                    status=status.HTTP_201_CREATED)
-            return Response({'message': 'Неверный код активации'},
-                            status=status.HTTP_400_BAD_REQUEST)
+            return Response({
+                'token': str(access_token_for(user))},
+                status=status.HTTP_201_CREATED)
+        return Response({'message': 'Неверный код активации'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+
+class CacheStatsAPIView(APIView):
+    """Счетчики кеша публичных справочников для администратора."""
+
+    permission_classes = (OnlyAdmin, )
 
+    def get(self, request):
+        return Response(cache_stats(), status=status.HTTP_200_OK)
 
-class UserViewSet(viewsets.ModelViewSet):
+
+class MetricsAPIView(APIView):
+    """Время, запросы к БД и размер ответов по маршрутам для
+     администратора, в формате Prometheus."""
+
+    permission_classes = (OnlyAdmin, )
+    renderer_classes = (PrometheusTextRenderer, )
+
+    def get(self, request):
+        return Response(route_metrics.export(), status=status.HTTP_200_OK)
+
+
+class SlowQueriesAPIView(APIView):
+    """Журнал медленных запросов к БД для администратора."""
+
+    permission_classes = (OnlyAdmin, )
+
+    def get(self, request):
+        return Response(slow_query_log.snapshot(), status=status.HTTP_200_OK)
+
+
+class EmailStatsAPIView(APIView):
+    """Глубина очереди писем и задержка доставки для администратора."""
+
+    permission_classes = (OnlyAdmin, )
+
+    def get(self, request):
+        return Response(get_dispatcher().stats(), status=status.HTTP_200_OK)
+
+
+class UserViewSet(StreamingListMixin, viewsets.ModelViewSet):
     """Позволяет просматривать собственные данные пользователя и изменять их.
      Позволяет администратору создавать пользователей
       и изменять их информацию."""
@@ -83,34 +146,81 @@ class UserViewSet(viewsets.ModelViewSet):
         methods=['GET', 'PATCH'],
         permission_classes=(permissions.IsAuthenticated,))
     def me(self, request):
-        serializer = self.get_serializer(request.user)
+        user = full_user(request.user)
+        serializer = self.get_serializer(user)
         if request.method == 'PATCH':
             serializer = self.get_serializer(
-                request.user,
+                user,
                 data=request.data,
                 partial=True)
             if serializer.is_valid(raise_exception=True):
-                serializer.save(role=request.user.role)
+                serializer.save(role=user.role)
                 return Response(serializer.data,
                                 status=status.HTTP_200_OK)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(ConditionalGetMixin, CachedResponseMixin,
+                   StreamingListMixin, LeanListMixin, viewsets.ModelViewSet):
     """Отправляет информацию о произведениях.
      Создавать произведения может только администратор."""
 
-    queryset = Title.objects.all().annotate(
-        Avg('reviews__score')).order_by('name')
+    cache_group = 'titles'
+    queryset = Title.objects.select_related(
+        'category').prefetch_related('genre').order_by('name', 'id')
     serializer_class = TitleSerializer
+    lean_serializer_class = LeanTitleSerializer
     permission_classes = (IsAdminOrReadOnly, )
+    filter_backends = (DjangoFilterBackend, TitleOrderingFilter)
     filterset_class = TitleFilter
 
-
-class CategoryViewSet(viewsets.ModelViewSet):
+    def get_version_resources(self):
+        if self.action == 'retrieve':
+            return (CATALOGUE, title_resource(self.kwargs['pk']))
+        return (TITLES, )
+
+    @action(detail=False, url_path='bulk', methods=['POST', 'PATCH'])
+    def bulk(self, request):
+        """Массив произведений: POST создает, PATCH изменяет по id."""
+        if request.method == 'POST':
+            ids, code = create_titles(request.data), status.HTTP_201_CREATED
+        else:
+            ids, code = update_titles(request.data), status.HTTP_200_OK
+        lean = LeanTitleSerializer()
+        rows = {row['id']: row for row in lean.to_representation(
+            lean.rows(Title.objects.filter(id__in=ids)))}
+        return Response([rows[pk] for pk in dict.fromkeys(ids)], status=code)
+
+
+def bulk_groups_response(request, serializer):
+    """Массив жанров или категорий: POST создает, PATCH переименовывает."""
+    if request.method == 'POST':
+        slugs = create_groups(serializer, request.data)
+        code = status.HTTP_201_CREATED
+    else:
+        slugs = update_groups(serializer, request.data)
+        code = status.HTTP_200_OK
+    groups = {group['slug']: group for group in serializer.Meta.model.objects
+              .filter(slug__in=slugs).values('name', 'slug')}
+    return Response([groups[slug] for slug in dict.fromkeys(slugs)],
+                    status=code)
+
+
+def stats_response(kind, slug):
+    """Статистика группы из сводной таблицы, без агрегации отзывов."""
+    stats = get_stats(kind, slug)
+    if stats is None:
+        raise NotFound(f'Группа {slug} не найдена.')
+    data = CatalogueStatsSerializer(stats).data
+    return Response({kind: data.pop('slug'), **data},
+                    status=status.HTTP_200_OK)
+
+
+class CategoryViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     """Отправляет информацию о категориях.
      Создавать категории может только администратор."""
 
+    cache_group = 'categories'
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = (IsAdminOrReadOnly, )
@@ -124,11 +234,20 @@ class CategoryViewSet(viewsets.ModelViewSet):
     def update(self, request, *args, **kwargs):
         return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
+    @action(detail=True, url_path='top', methods=['GET'])
+    def top(self, request, slug=None):
+        return stats_response(CatalogueStats.CATEGORY, slug)
+
+    @action(detail=False, url_path='bulk', methods=['POST', 'PATCH'])
+    def bulk(self, request):
+        return bulk_groups_response(request, BulkCategorySerializer())
 
-class GenreViewSet(viewsets.ModelViewSet):
+
+class GenreViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     """Отправляет информацию о жанрах.
      Создавать новые жанры может только администратор."""
 
+    cache_group = 'genres'
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
     permission_classes = (IsAdminOrReadOnly, )
@@ -142,36 +261,67 @@ class GenreViewSet(viewsets.ModelViewSet):
     def update(self, request, *args, **kwargs):
         return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
+    @action(detail=True, url_path='stats', methods=['GET'])
+    def stats(self, request, slug=None):
+        return stats_response(CatalogueStats.GENRE, slug)
+
+    @action(detail=False, url_path='bulk', methods=['POST', 'PATCH'])
+    def bulk(self, request):
+        return bulk_groups_response(request, BulkGenreSerializer())
 
-class ReviewsViewSet(viewsets.ModelViewSet):
+
+class ReviewsViewSet(NestedResourceMixin, ConditionalGetMixin, LeanListMixin,
+                     viewsets.ModelViewSet):
     """Отправляет отзывы на произведение.
      Авторы могут редактировать свои отзывы.
      Изменение всех отзывов доступно также модератору и администратору."""
 
+    queryset = Review.objects.select_related('author')
     serializer_class = ReviewsSerializer
+    lean_serializer_class = LeanReviewsSerializer
     permission_classes = (IsAuthorAdminModeratorOrReadOnly, )
+    pagination_class = KeysetPagination
+    parent_model = Title
+    parent_field = 'title'
+    parent_lookups = {'title_id': 'id'}
 
-    def get_queryset(self):
-        title = get_object_or_404(Title, id=self.kwargs.get('title_id'))
-        return title.reviews.all()
+    def get_version_resources(self):
+        return (reviews_resource(self.kwargs.get('title_id')), )
 
     def perform_create(self, serializer):
-        title = get_object_or_404(Title, id=self.kwargs.get('title_id'))
-        serializer.save(author=self.request.user, title=title)
-
-
-class CommentsViewSet(viewsets.ModelViewSet):
+        # Второй отзыв автора отклоняет ограничение unique_review, без
+        # проверки перед вставкой, которую проходят параллельные запросы.
+        title, author = self.get_parent(), full_user(self.request.user)
+        try:
+            with transaction.atomic():
+                serializer.save(author=author, title=title)
+        except IntegrityError:
+            if not title.reviews.filter(author_id=author.id).exists():
+                raise
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                'Можно оставлять только один отзыв!']})
+
+
+class CommentsViewSet(NestedResourceMixin, ConditionalGetMixin,
+                      LeanListMixin, viewsets.ModelViewSet):
     """Отправляет комментарии на отзывы.
      Авторы могут редактировать свои отзывы.
      Изменение всех отзывов доступно также модератору и администратору."""
 
+    queryset = Comments.objects.select_related('author')
     serializer_class = CommentsSerializer
+    lean_serializer_class = LeanCommentsSerializer
     permission_classes = (IsAuthorAdminModeratorOrReadOnly, )
+    pagination_class = KeysetPagination
+    parent_model = Review
+    parent_field = 'review'
+    parent_lookups = {'review_id': 'id', 'title_id': 'title_id'}
 
-    def get_queryset(self):
-        review = get_object_or_404(Review, id=self.kwargs.get('review_id'))
-        return review.comments.all()
+    def get_version_resources(self):
+        return (comments_resource(self.kwargs.get('review_id')), )
 
     def perform_create(self, serializer):
-        review = get_object_or_404(Review, id=self.kwargs.get('review_id'))
-        serializer.save(author=self.request.user, review=review)
+        # Комментарий и счетчик отзыва записываются вместе.
+        with transaction.atomic():
+            serializer.save(
+                author=full_user(self.request.user), review=self.get_parent())
@@ -9,8 +9,18 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
-
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
 
+try:
+    from django.core.asgi import get_asgi_application
+except ImportError:
+    # В Django 2.2 нет ASGI-обработчика: синхронное WSGI-приложение
+    # выполняется в пуле потоков, а медленных клиентов обслуживает
+    # цикл событий сервера, не занимая поток Django.
+    from asgiref.wsgi import WsgiToAsgi
+    from django.core.wsgi import get_wsgi_application
+
+    def get_asgi_application():
+        return WsgiToAsgi(get_wsgi_application())
+
 application = get_asgi_application()
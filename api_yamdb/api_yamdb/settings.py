@@ -31,6 +31,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.RequestMetricsMiddleware',
+    'api.slow_queries.SlowQueryMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,6 +78,48 @@ DATABASES = {
 }
 
 
+# Cache
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='yamdb'),
+    }
+}
+
+# Кеш ответов /titles/, /genres/ и /categories/ для анонимных запросов
+API_CACHE_ALIAS = 'default'
+API_CACHE_TIMEOUT = int(os.getenv('API_CACHE_TIMEOUT', default=60))
+
+# На сколько секунд статистика жанров и категорий может отставать.
+CATALOGUE_STATS_MAX_AGE = int(
+    os.getenv('CATALOGUE_STATS_MAX_AGE', default=300))
+
+# Списки произведений, отзывов и комментариев собираются из .values()
+# без ModelSerializer, см. api.lean; 0 - через сериализаторы.
+LEAN_LIST_SERIALIZATION = bool(
+    int(os.getenv('LEAN_LIST_SERIALIZATION', default=1)))
+
+# Кодировщик JSON: auto - orjson, если установлен, иначе json.
+API_JSON_ENCODER = os.getenv('API_JSON_ENCODER', default='auto')
+# Страницы с limit от этого значения отдаются потоком, см. api.streaming.
+API_STREAMING_MIN_LIMIT = int(
+    os.getenv('API_STREAMING_MIN_LIMIT', default=1000))
+
+# Наибольший массив в запросах /titles/bulk/, /genres/bulk/ и
+# /categories/bulk/.
+BULK_MAX_ITEMS = int(os.getenv('BULK_MAX_ITEMS', default=10000))
+
+# Время, запросы к БД и размер ответов по маршрутам для /metrics,
+# см. api.metrics; 0 - не замерять.
+API_METRICS = bool(int(os.getenv('API_METRICS', default=1)))
+
+# Запросы к БД дольше стольких миллисекунд попадают в журнал с планом
+# выполнения, см. api.slow_queries; 0 - журнал выключен.
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', default=0))
+SLOW_QUERY_LOG_SIZE = int(os.getenv('SLOW_QUERY_LOG_SIZE', default=200))
+
+
 # Password validation
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -121,20 +165,66 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication', ],
+        'api.authentication.ClaimsJWTAuthentication', ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 5,
-    'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend']
+    'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.AnonReadThrottle',
+        'api.throttling.UserWriteThrottle',
+        'api.throttling.ScopedTokenBucketThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'anon_read': os.getenv('THROTTLE_ANON_READ', default='600/min'),
+        'user_write': os.getenv('THROTTLE_USER_WRITE', default='60/min'),
+        'signup': os.getenv('THROTTLE_SIGNUP', default='10/min'),
+        'token': os.getenv('THROTTLE_TOKEN', default='20/min'),
+    },
+    # Ограничения анонимных запросов считаются по адресу клиента из
+    # X-Forwarded-For. Перед приложением стоит один nginx; без прокси
+    # задайте 0, иначе клиент сможет подставить адрес в заголовок.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', default=1)),
 }
 
+# Где хранить корзины ограничения частоты: local - память процесса,
+# cache - кеш THROTTLE_CACHE_ALIAS, общий для процессов.
+THROTTLE_BUCKETS = os.getenv('THROTTLE_BUCKETS', default='local')
+THROTTLE_CACHE_ALIAS = 'default'
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# Кеш поколений токенов: срок хранения ограничивает, сколько секунд
+# после смены роли еще принимаются claims из старого токена.
+AUTH_CLAIMS_CACHE_ALIAS = 'default'
+AUTH_CLAIMS_CACHE_TIMEOUT = int(
+    os.getenv('AUTH_CLAIMS_CACHE_TIMEOUT', default=60))
+
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
 
 EMPTY_VALUE_DISPLAY = '-пусто-'
 
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', default='')
+
+# Код подтверждения действует CONFIRMATION_CODE_TTL секунд и не больше
+# CONFIRMATION_CODE_MAX_ATTEMPTS неверных попыток; запросов токена на
+# один username - не больше CONFIRMATION_ATTEMPTS_LIMIT за
+# CONFIRMATION_ATTEMPTS_WINDOW секунд.
+CONFIRMATION_CODE_TTL = int(os.getenv('CONFIRMATION_CODE_TTL', default=3600))
+CONFIRMATION_CODE_MAX_ATTEMPTS = 5
+CONFIRMATION_ATTEMPTS_LIMIT = 10
+CONFIRMATION_ATTEMPTS_WINDOW = 60
+
+# Доставка писем: thread - фоновый поток, outbox - таблица и команда
+# send_emails, sync - прямо в запросе.
+EMAIL_QUEUE = os.getenv('EMAIL_QUEUE', default='thread')
+EMAIL_BATCH_SIZE = int(os.getenv('EMAIL_BATCH_SIZE', default=50))
+EMAIL_MAX_ATTEMPTS = int(os.getenv('EMAIL_MAX_ATTEMPTS', default=5))
+EMAIL_RETRY_BACKOFF = float(os.getenv('EMAIL_RETRY_BACKOFF', default=2))
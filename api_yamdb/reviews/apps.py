@@ -5,3 +5,13 @@ class ReviewsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'reviews'
     verbose_name = 'Yamdb Я.Практикум'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+
+        from . import signals  # noqa: F401
+        from .indexes import create_rating_indexes
+        from .search import create_search_indexes
+
+        post_migrate.connect(create_search_indexes, sender=self)
+        post_migrate.connect(create_rating_indexes, sender=self)
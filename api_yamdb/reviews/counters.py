@@ -0,0 +1,46 @@
+"""Счетчик комментариев отзыва.
+
+Отзыв хранит количество своих комментариев, чтобы списки отзывов не
+считали их подзапросом на каждую строку. Количество отзывов
+произведения - это его rating_count, см. reviews.ratings. Счетчик
+сдвигается сигналами в той же транзакции, что и запись комментария;
+расхождения после загрузки в обход сигналов исправляет
+rebuild_comment_counts."""
+from django.db.models import Count, F
+
+from .models import Comments, Review
+from .stats import mark_all_dirty
+from .versions import EPOCH, bump_versions
+
+
+def apply_comment_delta(review_id, delta):
+    """Сдвигает счетчик комментариев отзыва одним UPDATE."""
+    Review.objects.filter(pk=review_id).update(
+        comments_count=F('comments_count') + delta)
+
+
+def rebuild_comment_counts(dry_run=False):
+    """Сверяет счетчики комментариев всех отзывов с таблицей комментариев.
+
+    Возвращает список кортежей (id, сохраненное, актуальное) для
+    отзывов, у которых счетчик разошелся с комментариями."""
+    actual = dict(Comments.objects.order_by().values('review').annotate(
+        count=Count('id')).values_list('review', 'count'))
+    drift = []
+    stale = []
+    reviews = Review.objects.order_by('pk').only('comments_count')
+    for review in reviews.iterator():
+        count = actual.get(review.pk, 0)
+        if review.comments_count == count:
+            continue
+        drift.append((review.pk, review.comments_count, count))
+        review.comments_count = count
+        stale.append(review)
+    if stale and not dry_run:
+        Review.objects.bulk_update(
+            stale, ('comments_count', ), batch_size=1000)
+        # Как и rebuild_ratings: версии отдельных отзывов не перебираются,
+        # массовая правка сбрасывает все ETag.
+        bump_versions(EPOCH)
+        mark_all_dirty()
+    return drift
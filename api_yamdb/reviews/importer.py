@@ -0,0 +1,409 @@
+"""Потоковая загрузка данных из CSV пакетами через bulk_create.
+
+Файлы читаются частями, внешние ключи проверяются по множествам
+известных id в памяти, а каждая пачка записывается одной транзакцией."""
+import csv
+import io
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import count, islice
+from pathlib import Path
+
+import django
+from api.cache import invalidate_models
+from django.core.exceptions import ValidationError
+from django.core.management.color import no_style
+from django.db import IntegrityError, connection, connections, transaction
+from users.models import User
+
+from .counters import rebuild_comment_counts
+from .models import Category, Comments, Genre, GenreTitle, Review, Title
+from .ratings import rebuild_ratings
+from .search import title_index
+from .stats import mark_all_dirty
+from .versions import EPOCH, bump_versions
+
+ON_CONFLICT_ERROR = 'error'
+ON_CONFLICT_IGNORE = 'ignore'
+ON_CONFLICT_UPDATE = 'update'
+ON_CONFLICT_CHOICES = (ON_CONFLICT_ERROR, ON_CONFLICT_IGNORE,
+                       ON_CONFLICT_UPDATE)
+
+MAX_REPORTED_ERRORS = 20
+
+
+class CsvImportError(Exception):
+    """Пачку не удалось записать в базу данных."""
+
+
+class Stage:
+    """Описание одного CSV файла: модель и порядок колонок в файле."""
+
+    def __init__(self, name, file_name, model, fields, relations=None):
+        self.name = name
+        self.file_name = file_name
+        self.model = model
+        self.fields = fields
+        self.relations = relations or {}
+        # Связи проверяются по id в памяти, пароль в CSV не передается.
+        self.unchecked_fields = ['id', 'password'] + [
+            model._meta.get_field(attname).name for attname in self.relations
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+STAGES = (
+    Stage('Категории', 'category.csv', Category, ('id', 'name', 'slug')),
+    Stage('Жанры', 'genre.csv', Genre, ('id', 'name', 'slug')),
+    Stage(
+        'Произведения', 'titles.csv', Title,
+        ('id', 'name', 'year', 'category_id'),
+        {'category_id': Category},
+    ),
+    Stage(
+        'Жанры произведений', 'genre_title.csv', GenreTitle,
+        ('id', 'title_id', 'genre_id'),
+        {'title_id': Title, 'genre_id': Genre},
+    ),
+    Stage(
+        'Пользователи', 'users.csv', User,
+        ('id', 'username', 'email', 'role', 'bio', 'first_name',
+         'last_name'),
+    ),
+    Stage(
+        'Отзывы', 'review.csv', Review,
+        ('id', 'title_id', 'text', 'author_id', 'score', 'pub_date'),
+        {'title_id': Title, 'author_id': User},
+    ),
+    Stage(
+        'Комментарии', 'comments.csv', Comments,
+        ('id', 'review_id', 'text', 'author_id', 'pub_date'),
+        {'review_id': Review, 'author_id': User},
+    ),
+)
+
+
+def stage_dependencies(stages):
+    """Граф этапов: каждый этап ждет этапы, на модели которых ссылается."""
+    by_model = {stage.model: stage for stage in stages}
+    return {
+        stage: {
+            by_model[model] for model in stage.relations.values()
+            if model in by_model and by_model[model] is not stage
+        }
+        for stage in stages
+    }
+
+
+class StageResult:
+    """Счетчики загрузки одного файла."""
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.read = 0
+        self.created = 0
+        self.updated = 0
+        self.skipped = 0
+        self.errors = []
+        self.seconds = 0.0
+
+    def error(self, line, message):
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f'{self.stage.file_name}:{line}: {message}')
+
+    def merge(self, other):
+        """Добавляет счетчики части файла, загруженной другим процессом."""
+        self.read += other.read
+        self.created += other.created
+        self.updated += other.updated
+        self.skipped += other.skipped
+        self.errors.extend(
+            other.errors[:MAX_REPORTED_ERRORS - len(self.errors)])
+
+    @property
+    def rows_per_second(self):
+        if not self.seconds:
+            return 0.0
+        return self.read / self.seconds
+
+
+def read_csv(path, offset=None, line=2, limit=None):
+    """Построчно читает CSV, пропуская заголовок; отдает (номер, строка).
+
+    offset - смещение в байтах начала записи из task_ranges, с него
+    читаются limit записей, первая получает номер line."""
+    with open(path, 'rb') as raw:
+        if offset is not None:
+            raw.seek(offset)
+        csv_file = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+        reader = csv.reader(csv_file, delimiter=',')
+        if offset is None:
+            next(reader, None)
+        yield from islice(enumerate(reader, start=line), limit)
+
+
+def task_ranges(path, rows_per_task):
+    """Делит CSV на диапазоны по rows_per_task записей за одно чтение.
+
+    Отдает списки [смещение в байтах, номер первой записи, количество].
+    Поля могут содержать переносы строк, поэтому границы записей
+    находит csv.reader: он берет строки файла по одной, и число
+    прочитанных байт перед каждой записью - ее начало."""
+    ranges = []
+    position = 0
+    with open(path, 'rb') as raw:
+
+        def lines():
+            nonlocal position
+            for line in raw:
+                position += len(line)
+                yield line.decode('utf-8')
+
+        reader = csv.reader(lines(), delimiter=',')
+        next(reader, None)
+        for index in count():
+            start = position
+            if next(reader, None) is None:
+                break
+            if index % rows_per_task == 0:
+                ranges.append([start, index + 2, 0])
+            ranges[-1][2] += 1
+    return ranges
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class CsvImporter:
+    """Загружает файлы из data_dir пачками по batch_size строк."""
+
+    def __init__(self, data_dir, batch_size=1000,
+                 on_conflict=ON_CONFLICT_IGNORE, dry_run=False):
+        self.data_dir = Path(data_dir)
+        self.batch_size = batch_size
+        self.on_conflict = on_conflict
+        self.dry_run = dry_run
+        self._known_ids = {}
+
+    def known_ids(self, model):
+        """Множество id модели: из базы плюс загруженные в этом запуске."""
+        if model not in self._known_ids:
+            self._known_ids[model] = set(
+                model.objects.values_list('pk', flat=True).iterator())
+        return self._known_ids[model]
+
+    def load(self, stage, offset=None, line=2, limit=None):
+        """Загружает файл этапа или limit записей с offset, см. read_csv."""
+        result = StageResult(stage)
+        began = time.monotonic()
+        rows = read_csv(self.data_dir / stage.file_name, offset, line, limit)
+        for chunk in chunked(rows, self.batch_size):
+            objects = self.build_objects(stage, chunk, result)
+            if not self.dry_run:
+                objects = self.save(stage, objects, result)
+            self.known_ids(stage.model).update(obj.pk for _, obj in objects)
+        result.seconds = time.monotonic() - began
+        return result
+
+    def parse_row(self, stage, row):
+        """Превращает строку CSV в значения полей или сообщает об ошибке."""
+        if len(row) != len(stage.fields):
+            raise ValueError(f'ожидалось колонок: {len(stage.fields)}')
+        values = dict(zip(stage.fields, row))
+        try:
+            values['id'] = int(values['id'])
+            for attname in stage.relations:
+                values[attname] = int(values[attname]) if (
+                    values[attname]) else None
+        except ValueError as error:
+            raise ValueError(f'некорректный id: {error}')
+        missing = [
+            f'{attname}={values[attname]}'
+            for attname, model in stage.relations.items()
+            if values[attname] is not None
+            and values[attname] not in self.known_ids(model)
+        ]
+        if missing:
+            raise ValueError('нет связанных объектов: ' + ', '.join(missing))
+        return values
+
+    def validate(self, stage, obj):
+        """Проверки, которые выполняются только при --dry-run."""
+        if (obj.pk in self.known_ids(stage.model)
+                and self.on_conflict == ON_CONFLICT_ERROR):
+            raise ValueError(f'id={obj.pk} уже есть в базе')
+        try:
+            obj.clean_fields(exclude=stage.unchecked_fields)
+        except ValidationError as error:
+            raise ValueError('; '.join(error.messages))
+
+    def build_objects(self, stage, chunk, result):
+        """Список пар (номер строки, объект) для корректных строк."""
+        seen = set()
+        objects = []
+        for line, row in chunk:
+            result.read += 1
+            try:
+                values = self.parse_row(stage, row)
+                if values['id'] in seen:
+                    raise ValueError(f'повтор id={values["id"]} в файле')
+                obj = stage.model(**values)
+                if self.dry_run:
+                    self.validate(stage, obj)
+            except ValueError as error:
+                result.error(line, error)
+                continue
+            seen.add(obj.pk)
+            objects.append((line, obj))
+        return objects
+
+    def save(self, stage, objects, result):
+        """Записывает пачку; возвращает пары, которые попали в базу."""
+        existing = self.known_ids(stage.model)
+        # Кроме режима error, новые строки с занятым уникальным полем
+        # пропускаются, а не прерывают всю пачку.
+        ignore = self.on_conflict != ON_CONFLICT_ERROR
+        to_create, to_update = objects, []
+        if ignore:
+            to_create = [item for item in objects
+                         if item[1].pk not in existing]
+        if self.on_conflict == ON_CONFLICT_UPDATE:
+            to_update = [item for item in objects if item[1].pk in existing]
+        try:
+            with transaction.atomic():
+                # Пачка уже не больше batch_size, а размер одного INSERT
+                # Django подберет сам с учетом ограничений СУБД.
+                stage.model.objects.bulk_create(
+                    [obj for _, obj in to_create], ignore_conflicts=ignore)
+                if ignore and to_create:
+                    to_create = self.inserted(stage, to_create, result)
+                if to_update:
+                    stage.model.objects.bulk_update(
+                        [obj for _, obj in to_update],
+                        [field for field in stage.fields if field != 'id'],
+                        batch_size=self.batch_size,
+                    )
+        except IntegrityError as error:
+            raise CsvImportError(
+                f'{stage.file_name}: пачка из {len(objects)} строк '
+                f'не записана: {error}'
+            ) from error
+        result.created += len(to_create)
+        result.updated += len(to_update)
+        return to_create + to_update
+
+    def inserted(self, stage, objects, result):
+        """Пары, которые база записала: при ignore_conflicts строки с
+        занятым уникальным полем (slug, email, автор и произведение
+        отзыва) пропускаются молча."""
+        stored = set()
+        # По 500 id, чтобы не упереться в лимит параметров SQLite.
+        for ids in chunked((obj.pk for _, obj in objects), 500):
+            stored.update(stage.model.objects.filter(
+                pk__in=ids).values_list('pk', flat=True))
+        for line, obj in objects:
+            if obj.pk not in stored:
+                result.error(
+                    line, f'id={obj.pk} не записан: конфликт уникальных полей')
+        return [item for item in objects if item[1].pk in stored]
+
+    def finish(self, stages):
+        """Сдвигает последовательности id, пересчитывает рейтинги и
+        счетчики комментариев, сбрасывает кеши, которые обходит
+        bulk_create."""
+        if self.dry_run:
+            return
+        models = [stage.model for stage in stages]
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+        if Review in models:
+            rebuild_ratings()
+        if Comments in models:
+            rebuild_comment_counts()
+        # bulk_create не вызывает сигналы, сбрасываем все ETag разом.
+        bump_versions(EPOCH)
+        invalidate_models(*models)
+        title_index.reset()
+        mark_all_dirty()
+
+
+def _init_worker():
+    # При запуске через spawn процесс начинает с чистого интерпретатора.
+    django.setup()
+
+
+def _load_range(importer_options, stage_index, offset, line, limit):
+    importer = CsvImporter(**importer_options)
+    return importer.load(STAGES[stage_index], offset, line, limit)
+
+
+class ParallelCsvImporter:
+    """Загружает этапы в пуле процессов в порядке графа зависимостей.
+
+    Этап запускается, как только загружены все этапы, на которые он
+    ссылается; большие файлы делятся на диапазоны по rows_per_task
+    строк. Каждый процесс работает через собственное подключение к БД."""
+
+    def __init__(self, workers, rows_per_task=100000, **importer_options):
+        self.workers = workers
+        self.rows_per_task = rows_per_task
+        self.importer_options = importer_options
+        self.importer = CsvImporter(**importer_options)
+
+    def tasks(self, stage):
+        """Диапазоны файла: процесс читает только свои записи."""
+        return task_ranges(self.importer.data_dir / stage.file_name,
+                           self.rows_per_task) or [(None, 2, 0)]
+
+    def run(self, stages):
+        """Отдает итоги этапов по мере их завершения."""
+        dependencies = stage_dependencies(stages)
+        waiting = list(stages)
+        running = {}
+        # Дочерние процессы не должны делить подключение родителя.
+        connections.close_all()
+        with ProcessPoolExecutor(self.workers,
+                                 initializer=_init_worker) as pool:
+            while waiting or running:
+                done = {stage for stage in stages
+                        if stage not in waiting and stage not in running}
+                for stage in [stage for stage in waiting
+                              if dependencies[stage] <= done]:
+                    waiting.remove(stage)
+                    running[stage] = self.submit(pool, stage)
+                yield from self.collect(running)
+
+    def submit(self, pool, stage):
+        index = STAGES.index(stage)
+        futures = {
+            pool.submit(_load_range, self.importer_options, index, *task)
+            for task in self.tasks(stage)
+        }
+        return StageResult(stage), futures, time.monotonic()
+
+    def collect(self, running):
+        futures = set().union(*(item[1] for item in running.values()))
+        finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+        for stage, (result, pending, began) in list(running.items()):
+            for future in pending & finished:
+                pending.discard(future)
+                result.merge(future.result())
+            if not pending:
+                del running[stage]
+                result.seconds = time.monotonic() - began
+                yield result
+
+    def finish(self, stages):
+        self.importer.finish(stages)
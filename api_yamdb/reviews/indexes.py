@@ -0,0 +1,33 @@
+"""Индексы, которые нельзя описать в Meta.indexes Django 2.2.
+
+Сортировка по рейтингу ставит произведения без оценок в конец: в
+PostgreSQL это NULLS LAST, в SQLite Django сортирует сначала по
+rating IS NULL. Индексы под оба порядка создаются после migrate,
+как и индексы поиска."""
+from django.db import connections
+
+from .models import Title
+
+TITLE_TABLE = Title._meta.db_table
+INDEXES = {
+    'postgresql': (
+        # По возрастанию подходит title_rating_idx: ASC NULLS LAST
+        # совпадает с порядком индекса по умолчанию.
+        f'CREATE INDEX IF NOT EXISTS title_rating_desc_idx '
+        f'ON {TITLE_TABLE} (rating DESC NULLS LAST, id DESC)',
+    ),
+    'sqlite': (
+        f'CREATE INDEX IF NOT EXISTS title_rating_nulls_idx '
+        f'ON {TITLE_TABLE} (rating IS NULL, rating, id)',
+        f'CREATE INDEX IF NOT EXISTS title_rating_desc_idx '
+        f'ON {TITLE_TABLE} (rating IS NULL, rating DESC, id DESC)',
+    ),
+}
+
+
+def create_rating_indexes(using='default', **kwargs):
+    """Обработчик post_migrate для индексов текущей СУБД."""
+    target = connections[using]
+    with target.cursor() as cursor:
+        for sql in INDEXES.get(target.vendor, ()):
+            cursor.execute(sql)
@@ -1,112 +1,100 @@
 """Модуль для заполнения базы данных из документов формата .csv.
 Данные в документах должны быть структурированны согласно модели
  и в качестве разделителя используется запятая.
- Для загрузки данные должны находиться по пути /static/data"""
-import csv
+ По умолчанию данные берутся из static/data, другой каталог
+ можно передать через --data-dir."""
 from pathlib import Path
 
 from django.conf import settings
-from django.core.management.base import BaseCommand
-from django.shortcuts import get_object_or_404
-from reviews.models import Category, Comments, Genre, GenreTitle, Review, Title
-from users.models import User
-
-
-def read_csv(file_name: str):
-    csv_path = Path(settings.BASE_DIR, 'static/data/', file_name)
-    csv_file = open(csv_path, 'r', encoding='utf-8')
-    reader = csv.reader(csv_file, delimiter=',')
-    return reader
+from django.core.management.base import BaseCommand, CommandError
+from reviews.importer import (ON_CONFLICT_CHOICES, ON_CONFLICT_IGNORE, STAGES,
+                              CsvImporter, CsvImportError,
+                              ParallelCsvImporter)
 
 
 class Command(BaseCommand):
     """Парсер базы данных из файлов CSV."""
     help = 'load_csv'
 
-    def handle(self, *args, **options):
-        csv_reader = read_csv('category.csv')
-        next(csv_reader, None)
-        for row in csv_reader:
-            obj, created = Category.objects.get_or_create(
-                id=row[0],
-                name=row[1],
-                slug=row[2]
-            )
-        print('Категории - OK')
-
-        csv_reader = read_csv('genre.csv')
-        next(csv_reader, None)
-        for row in csv_reader:
-            obj, created = Genre.objects.get_or_create(
-                id=row[0],
-                name=row[1],
-                slug=row[2]
-            )
-        print('Жанры - OK')
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--data-dir',
+            default=Path(settings.BASE_DIR, 'static/data/'),
+            help='Каталог с CSV файлами.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество строк в одной пачке bulk_create.',
+        )
+        parser.add_argument(
+            '--on-conflict',
+            choices=ON_CONFLICT_CHOICES,
+            default=ON_CONFLICT_IGNORE,
+            help='Что делать со строками, id которых уже есть в базе.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только проверить файлы, ничего не записывая.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Количество процессов для параллельной загрузки.',
+        )
+        parser.add_argument(
+            '--rows-per-task',
+            type=int,
+            default=100000,
+            help='По сколько строк делить большие файлы между процессами.',
+        )
 
-        csv_reader = read_csv('titles.csv')
-        next(csv_reader, None)
-        for row in csv_reader:
-            obj_category = get_object_or_404(Category, id=row[3])
-            obj, created = Title.objects.get_or_create(
-                id=row[0],
-                name=row[1],
-                year=row[2],
-                category=obj_category
-            )
-        print('Произведения - OK')
-
-        csv_reader = read_csv('genre_title.csv')
-        next(csv_reader, None)
-        for row in csv_reader:
-            obj_genre = get_object_or_404(Genre, id=row[2])
-            obj_title = get_object_or_404(Title, id=row[1])
-            obj, created = GenreTitle.objects.get_or_create(
-                id=row[0],
-                genre=obj_genre,
-                title=obj_title
-            )
-        print('Жанры произведений - OK')
-
-        csv_reader = read_csv('users.csv')
-        next(csv_reader, None)
-        for row in csv_reader:
-            obj, created = User.objects.get_or_create(
-                id=row[0],
-                username=row[1],
-                email=row[2],
-                role=row[3],
-                bio=row[4],
-                first_name=row[5],
-                last_name=row[6]
-            )
-        print('Пользователи - OK')
-
-        csv_reader = read_csv('review.csv')
-        next(csv_reader, None)
-        for row in csv_reader:
-            obj_title = get_object_or_404(Title, id=row[1])
-            obj_user = get_object_or_404(User, id=row[3])
-            obj, created = Review.objects.get_or_create(
-                id=row[0],
-                title=obj_title,
-                text=row[2],
-                author=obj_user,
-                score=row[4],
-                pub_date=row[5]
-            )
-        print('Отзывы - OK')
+    def handle(self, *args, **options):
+        for option in ('batch_size', 'workers', 'rows_per_task'):
+            if options[option] < 1:
+                raise CommandError(
+                    f'--{option.replace("_", "-")} должен быть положительным.')
+        importer_options = {
+            'data_dir': options['data_dir'],
+            'batch_size': options['batch_size'],
+            'on_conflict': options['on_conflict'],
+            'dry_run': options['dry_run'],
+        }
+        if options['workers'] > 1 and options['dry_run']:
+            # Проверка связей опирается на id, прочитанные на прошлых этапах.
+            self.stdout.write('--dry-run выполняется в одном процессе.')
+            options['workers'] = 1
+        if options['workers'] > 1:
+            importer = ParallelCsvImporter(
+                options['workers'], options['rows_per_task'],
+                **importer_options)
+            results = importer.run(STAGES)
+        else:
+            importer = CsvImporter(**importer_options)
+            results = (importer.load(stage) for stage in STAGES)
+        try:
+            for result in results:
+                self.report(result)
+        except (CsvImportError, OSError) as error:
+            raise CommandError(error)
+        finally:
+            # Пачки до ошибки уже записаны: последовательности, рейтинги
+            # и кеши должны учитывать их и при прерванной загрузке.
+            importer.finish(STAGES)
 
-        csv_reader = read_csv('comments.csv')
-        next(csv_reader, None)
-        for row in csv_reader:
-            obj_review = get_object_or_404(Review, id=row[1])
-            obj_user = get_object_or_404(User, id=row[3])
-            obj, created = Comments.objects.get_or_create(
-                id=row[0],
-                review=obj_review,
-                text=row[2],
-                author=obj_user,
-                pub_date=row[4]
-            )
-        print('Комментарии - OK')
+    def report(self, result):
+        for error in result.errors:
+            self.stderr.write(error)
+        message = (
+            f'{result.stage} - OK: прочитано {result.read}, '
+            f'добавлено {result.created}, обновлено {result.updated}, '
+            f'пропущено {result.skipped}, '
+            f'{result.rows_per_second:.0f} строк/с'
+        )
+        if result.skipped:
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(message)
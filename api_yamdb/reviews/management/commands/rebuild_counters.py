@@ -0,0 +1,20 @@
+"""Пересчет хранимых счетчиков отзывов и комментариев."""
+from reviews.counters import rebuild_comment_counts
+
+from .rebuild_ratings import Command as RebuildRatingsCommand
+
+
+class Command(RebuildRatingsCommand):
+    """Сверяет reviews_count произведений и comments_count отзывов с
+    таблицами отзывов и комментариев и исправляет расхождения.
+
+    Количество отзывов произведения - rating_count, его сверяют вместе
+    с рейтингом."""
+    help = 'rebuild_counters'
+
+    def rebuild(self, dry_run):
+        return super().rebuild(dry_run) + [
+            f'Отзыв {review_id}: комментариев {stored} -> {actual}'
+            for review_id, stored, actual in rebuild_comment_counts(
+                dry_run=dry_run)
+        ]
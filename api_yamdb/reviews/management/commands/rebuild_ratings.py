@@ -0,0 +1,34 @@
+"""Пересчет хранимых рейтингов произведений по таблице отзывов."""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from reviews.ratings import rebuild_ratings
+
+
+class Command(BaseCommand):
+    """Сверяет рейтинги произведений с отзывами и исправляет расхождения.
+
+    Команды пересчета других счетчиков наследуют аргументы и отчет и
+    дополняют rebuild."""
+    help = 'rebuild_ratings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать расхождения, ничего не сохраняя.',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drift = self.rebuild(dry_run=options['dry_run'])
+        for line in drift:
+            self.stdout.write(line)
+        self.stdout.write(f'Расхождений: {len(drift)}')
+
+    def rebuild(self, dry_run):
+        """Пересчитывает значения; возвращает строки о расхождениях."""
+        return [
+            f'Произведение {title_id}: '
+            f'сумма/количество/рейтинг {stored} -> {actual}'
+            for title_id, stored, actual in rebuild_ratings(dry_run=dry_run)
+        ]
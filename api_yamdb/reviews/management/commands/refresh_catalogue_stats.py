@@ -0,0 +1,19 @@
+"""Пересчет сводной статистики жанров и категорий."""
+from django.core.management.base import BaseCommand
+from reviews.stats import refresh_all
+
+
+class Command(BaseCommand):
+    """Пересчитывает устаревшие строки статистики, например по cron."""
+    help = 'refresh_catalogue_stats'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Пересчитать все группы, а не только устаревшие.',
+        )
+
+    def handle(self, *args, **options):
+        refreshed = refresh_all(dirty_only=not options['all'])
+        self.stdout.write(f'Пересчитано групп: {refreshed}')
@@ -13,6 +13,27 @@ def not_future(val):
         raise ValidationError('Не достижимая дата.')
 
 
+class CounterFieldsMixin:
+    """Не записывает при save() поля counter_fields.
+
+    Счетчики меняют только UPDATE из reviews.ratings и reviews.counters,
+    иначе сохранение загруженного объекта затрет изменения, сделанные
+    после его чтения. Отложенные поля (only(), defer()) Django и сам не
+    записывает, не загружая их перед сохранением."""
+
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not kwargs.get('update_fields'):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+                and field.attname not in deferred]
+        super().save(*args, **kwargs)
+
+
 class Category(models.Model):
     """Класс категорий."""
 
@@ -43,13 +64,12 @@ class Genre(models.Model):
         return self.name[:15]
 
 
-class Title(models.Model):
+class Title(CounterFieldsMixin, models.Model):
     """Класс произведений."""
 
     name = models.CharField('Hазвание', max_length=150)
     year = models.PositiveIntegerField(
         verbose_name='Год выпуска',
-        db_index=True,
         validators=(
             not_future,
             # или ограничть в сериализаторе
@@ -68,9 +88,22 @@ class Title(models.Model):
         verbose_name='категория',
         on_delete=models.SET_NULL,
         related_name='titles',
-        null=True
+        null=True,
+        # Столбец покрыт первым полем индекса title_category_year_idx.
+        db_index=False,
+    )
+    rating_sum = models.PositiveIntegerField(
+        'Сумма оценок', default=0, editable=False
+    )
+    rating_count = models.PositiveIntegerField(
+        'Количество оценок', default=0, editable=False
+    )
+    rating = models.PositiveSmallIntegerField(
+        'Рейтинг', null=True, editable=False
     )
 
+    counter_fields = ('rating_sum', 'rating_count', 'rating')
+
     def clean(self) -> None:
         from django.core.exceptions import ValidationError
         if self.year > dt.datetime.now().year:
@@ -81,6 +114,19 @@ class Title(models.Model):
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
         ordering = ('-year', 'name')
+        # Под ordering= в API: поле сортировки и id для однозначности.
+        # Индекс рейтинга по убыванию с NULLS LAST создается отдельно,
+        # см. reviews.indexes.
+        indexes = (
+            models.Index(fields=('name', 'id'), name='title_name_idx'),
+            models.Index(fields=('year', 'id'), name='title_year_idx'),
+            models.Index(fields=('rating', 'id'), name='title_rating_idx'),
+            models.Index(fields=('rating_count', 'id'),
+                         name='title_rating_count_idx'),
+            # Под фильтры category= и category= с year=.
+            models.Index(fields=('category', 'year'),
+                         name='title_category_year_idx'),
+        )
 
     def __str__(self):
         return self.name[:15]
@@ -93,6 +139,8 @@ class GenreTitle(models.Model):
         Genre,
         verbose_name='Жанр',
         on_delete=models.CASCADE,
+        # Столбец покрыт первым полем уникального индекса (genre, title).
+        db_index=False,
     )
     title = models.ForeignKey(
         Title,
@@ -104,12 +152,18 @@ class GenreTitle(models.Model):
         verbose_name = 'Соответствие жанра и произведения'
         verbose_name_plural = 'Таблица соответствия жанров и произведений'
         ordering = ('id', )
+        # Индекс ограничения отдает id произведений жанра без чтения
+        # таблицы при фильтре genre=.
+        constraints = (
+            models.UniqueConstraint(fields=('genre', 'title'),
+                                    name='genre_title_unique'),
+        )
 
     def __str__(self):
         return f'{self.title} принадлежит жанру/ам {self.genre}'
 
 
-class Review(models.Model):  # Изменить название
+class Review(CounterFieldsMixin, models.Model):  # Изменить название
 
     author = models.ForeignKey(
         User,
@@ -137,16 +191,35 @@ class Review(models.Model):  # Изменить название
         'Дата публикации',
         auto_now_add=True
     )
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев', default=0, editable=False
+    )
+
+    counter_fields = ('comments_count', )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Запоминаем загруженные значения, чтобы при сохранении
+        # пересчитать рейтинг произведения по разнице оценок.
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
 
     class Meta:
         verbose_name = 'Отзыв'
         verbose_name_plural = 'Отзывы'
-        ordering = ('-pub_date', )
+        ordering = ('-pub_date', '-id')
         constraints = (
             models.UniqueConstraint(
                 fields=('author', 'title'), name='unique_review'
             ),
         )
+        indexes = (
+            models.Index(
+                fields=('title', '-pub_date', '-id'),
+                name='review_title_pub_date_idx',
+            ),
+        )
 
     def __str__(self):
         return self.text[:15]
@@ -177,7 +250,67 @@ class Comments(models.Model):
     class Meta:
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
-        ordering = ('-pub_date', )
+        ordering = ('-pub_date', '-id')
+        indexes = (
+            models.Index(
+                fields=('review', '-pub_date', '-id'),
+                name='comment_review_pub_date_idx',
+            ),
+        )
 
     def __str__(self):
         return self.text[:15]
+
+
+class ResourceVersion(models.Model):
+    """Счетчик изменений ресурса API для ETag и Last-Modified."""
+
+    name = models.CharField('Ресурс', max_length=64, unique=True)
+    version = models.PositiveIntegerField('Версия', default=0)
+    modified = models.DateTimeField('Дата изменения', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Версия ресурса'
+        verbose_name_plural = 'Версии ресурсов'
+
+    def __str__(self):
+        return f'{self.name}: {self.version}'
+
+
+class CatalogueStats(models.Model):
+    """Сводка по произведениям жанра или категории.
+
+    Пересчитывается командой refresh_catalogue_stats или при чтении, если
+    отмечена устаревшей и старше CATALOGUE_STATS_MAX_AGE секунд."""
+
+    GENRE = 'genre'
+    CATEGORY = 'category'
+    KINDS = (
+        (GENRE, 'Жанр'),
+        (CATEGORY, 'Категория'),
+    )
+
+    kind = models.CharField('Группа', max_length=16, choices=KINDS)
+    slug = models.SlugField('slug')
+    titles_count = models.PositiveIntegerField(
+        'Количество произведений', default=0)
+    reviews_count = models.PositiveIntegerField(
+        'Количество отзывов', default=0)
+    average_rating = models.FloatField('Средний рейтинг', null=True)
+    top_rated = models.TextField('Лучшие по рейтингу (JSON)', default='[]')
+    most_reviewed = models.TextField('Больше всего отзывов (JSON)',
+                                     default='[]')
+    dirty = models.BooleanField('Требует пересчета', default=True)
+    refreshed = models.DateTimeField('Дата пересчета', null=True)
+
+    class Meta:
+        verbose_name = 'Статистика группы'
+        verbose_name_plural = 'Статистика жанров и категорий'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('kind', 'slug'), name='unique_catalogue_stats'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.kind}: {self.slug}'
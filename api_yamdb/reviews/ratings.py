@@ -0,0 +1,94 @@
+"""Поддержка денормализованного рейтинга произведений.
+
+Произведение хранит сумму и количество оценок, а также готовое
+значение рейтинга, чтобы списки произведений не агрегировали отзывы
+на каждый запрос."""
+from django.db.models import Case, Count, F, IntegerField, Sum, When
+
+from .models import Review, Title
+from .stats import mark_all_dirty
+from .versions import EPOCH, TITLES, bump_versions, title_resource
+
+
+def rating_changed(title_id):
+    """Рейтинг входит в представление произведения и в список."""
+    bump_versions(TITLES, title_resource(title_id))
+
+
+def apply_rating_delta(title_id, score_delta, count_delta):
+    """Сдвигает сумму и количество оценок произведения одним UPDATE."""
+    if not score_delta and not count_delta:
+        return
+    updated = Title.objects.filter(pk=title_id).update(
+        rating_sum=F('rating_sum') + score_delta,
+        rating_count=F('rating_count') + count_delta,
+        rating=Case(
+            When(rating_count=-count_delta, then=None),
+            default=(
+                (F('rating_sum') + score_delta)
+                / (F('rating_count') + count_delta)
+            ),
+            output_field=IntegerField(),
+        ),
+    )
+    if updated:
+        rating_changed(title_id)
+
+
+def calculate_rating(rating_sum, rating_count):
+    """Рейтинг в том же виде, в каком его отдавал Avg в сериализаторе."""
+    if not rating_count:
+        return None
+    return rating_sum // rating_count
+
+
+def refresh_title_rating(title_id):
+    """Пересчитывает рейтинг одного произведения по его отзывам."""
+    totals = Review.objects.filter(title_id=title_id).aggregate(
+        score_sum=Sum('score'), score_count=Count('id'))
+    rating_sum = totals['score_sum'] or 0
+    rating_count = totals['score_count']
+    updated = Title.objects.filter(pk=title_id).exclude(
+        rating_sum=rating_sum, rating_count=rating_count,
+    ).update(
+        rating_sum=rating_sum,
+        rating_count=rating_count,
+        rating=calculate_rating(rating_sum, rating_count),
+    )
+    if updated:
+        rating_changed(title_id)
+
+
+def rebuild_ratings(dry_run=False):
+    """Пересчитывает рейтинги всех произведений по таблице отзывов.
+
+    Возвращает список кортежей (id, сохраненное, актуальное) для
+    произведений, у которых хранимые значения разошлись с отзывами."""
+    actual = {
+        row['title']: (row['score_sum'], row['score_count'])
+        for row in Review.objects.order_by().values('title').annotate(
+            score_sum=Sum('score'), score_count=Count('id'))
+    }
+    drift = []
+    stale = []
+    titles = Title.objects.order_by('pk').only(
+        'rating_sum', 'rating_count', 'rating')
+    for title in titles.iterator():
+        rating_sum, rating_count = actual.get(title.pk, (0, 0))
+        rating = calculate_rating(rating_sum, rating_count)
+        stored = (title.rating_sum, title.rating_count, title.rating)
+        if stored == (rating_sum, rating_count, rating):
+            continue
+        drift.append((title.pk, stored, (rating_sum, rating_count, rating)))
+        title.rating_sum = rating_sum
+        title.rating_count = rating_count
+        title.rating = rating
+        stale.append(title)
+    if stale and not dry_run:
+        Title.objects.bulk_update(
+            stale, ('rating_sum', 'rating_count', 'rating'), batch_size=1000)
+        # Версии отдельных произведений не перебираются: массовая правка
+        # сбрасывает все ETag.
+        bump_versions(EPOCH)
+        mark_all_dirty()
+    return drift
@@ -0,0 +1,193 @@
+"""Полнотекстовый поиск произведений по названию и описанию.
+
+В PostgreSQL поиск идет по выражению tsvector с GIN-индексом и по
+триграммному индексу названия для нечеткого совпадения начала слова.
+Индексы создаются после migrate: в репозитории нет миграций, а SQLite
+не умеет строить GIN-индексы из Meta.indexes. На остальных СУБД (SQLite
+в тестах) используется инвертированный индекс в памяти процесса."""
+import re
+import threading
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from django.db import connection, connections
+
+from .models import Title
+
+SEARCH_CONFIG = 'russian'
+NAME_WEIGHT = 2
+DESCRIPTION_WEIGHT = 1
+PREFIX_FACTOR = 0.5
+
+TITLE_TABLE = Title._meta.db_table
+
+
+def vector_sql(table=TITLE_TABLE):
+    """Выражение tsvector; в индексе и запросе оно должно совпадать."""
+    prefix = f'{table}.' if table else ''
+    return (
+        f"(setweight(to_tsvector('{SEARCH_CONFIG}', "
+        f"coalesce({prefix}name, '')), 'A') || "
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', "
+        f"coalesce({prefix}description, '')), 'B'))"
+    )
+
+
+VECTOR_SQL = vector_sql()
+QUERY_SQL = f"plainto_tsquery('{SEARCH_CONFIG}', %s)"
+POSTGRESQL_INDEXES = (
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    f'CREATE INDEX IF NOT EXISTS reviews_title_search_idx '
+    f'ON {TITLE_TABLE} USING GIN ({vector_sql(table=None)})',
+    f'CREATE INDEX IF NOT EXISTS reviews_title_name_trgm_idx '
+    f'ON {TITLE_TABLE} USING GIN (name gin_trgm_ops)',
+)
+
+
+def tokenize(text):
+    return re.findall(r'\w+', (text or '').lower())
+
+
+class InvertedIndex:
+    """Токен -> {id произведения: вес} с поиском по началу токена."""
+
+    def __init__(self):
+        self.postings = defaultdict(dict)
+        self.documents = {}
+        self.vocabulary = []
+        self.vocabulary_dirty = False
+
+    def add(self, pk, name, description):
+        self.remove(pk)
+        weights = Counter()
+        for token in tokenize(name):
+            weights[token] += NAME_WEIGHT
+        for token in tokenize(description):
+            weights[token] += DESCRIPTION_WEIGHT
+        for token, weight in weights.items():
+            if token not in self.postings:
+                self.vocabulary_dirty = True
+            self.postings[token][pk] = weight
+        self.documents[pk] = tuple(weights)
+
+    def remove(self, pk):
+        for token in self.documents.pop(pk, ()):
+            postings = self.postings[token]
+            postings.pop(pk, None)
+            if not postings:
+                del self.postings[token]
+                self.vocabulary_dirty = True
+
+    def prefixed(self, prefix):
+        if self.vocabulary_dirty:
+            self.vocabulary = sorted(self.postings)
+            self.vocabulary_dirty = False
+        position = bisect_left(self.vocabulary, prefix)
+        while (position < len(self.vocabulary)
+               and self.vocabulary[position].startswith(prefix)):
+            yield self.vocabulary[position]
+            position += 1
+
+    def search(self, query):
+        """Баллы произведений, в которых есть все слова запроса."""
+        total = None
+        for token in tokenize(query):
+            scores = Counter()
+            for candidate in self.prefixed(token):
+                factor = 1 if candidate == token else PREFIX_FACTOR
+                for pk, weight in self.postings[candidate].items():
+                    scores[pk] = max(scores[pk], weight * factor)
+            if total is None:
+                total = scores
+            else:
+                total = Counter({
+                    pk: score + scores[pk] for pk, score in total.items()
+                    if pk in scores
+                })
+        return total or Counter()
+
+
+class TitleSearchIndex:
+    """Ленивый индекс в памяти, который поддерживают сигналы Title."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.index = None
+
+    def build(self):
+        index = InvertedIndex()
+        rows = Title.objects.values_list('pk', 'name', 'description')
+        for pk, name, description in rows.iterator():
+            index.add(pk, name, description)
+        return index
+
+    def search(self, query):
+        with self.lock:
+            if self.index is None:
+                self.index = self.build()
+            return self.index.search(query)
+
+    def update(self, title):
+        with self.lock:
+            if self.index is not None:
+                self.index.add(title.pk, title.name, title.description)
+
+    def remove(self, pk):
+        with self.lock:
+            if self.index is not None:
+                self.index.remove(pk)
+
+    def reset(self):
+        with self.lock:
+            self.index = None
+
+
+title_index = TitleSearchIndex()
+
+
+def id_list(pks):
+    return ', '.join(str(int(pk)) for pk in sorted(pks))
+
+
+def search_titles(queryset, query):
+    """Оставляет произведения, подходящие под запрос, по убыванию ранга."""
+    if not tokenize(query):
+        return queryset.none()
+    if connection.vendor == 'postgresql':
+        return queryset.extra(
+            select={'search_rank': (
+                f'ts_rank({VECTOR_SQL}, {QUERY_SQL}) '
+                f'+ word_similarity(%s, {TITLE_TABLE}.name)')},
+            select_params=(query, query),
+            where=(f'({VECTOR_SQL} @@ {QUERY_SQL} '
+                   f'OR %s <%% {TITLE_TABLE}.name)',),
+            params=(query, query),
+        ).order_by('-search_rank', 'name')
+    scores = title_index.search(query)
+    if not scores:
+        return queryset.none()
+    # Число параметров запроса у SQLite ограничено, а совпадений может
+    # быть сколько угодно. id и ранги - числа из индекса, поэтому они
+    # подставляются в SQL текстом, а произведения с равным рангом
+    # группируются в один WHEN.
+    ranked = defaultdict(list)
+    for pk, score in scores.items():
+        ranked[float(score)].append(pk)
+    cases = ' '.join(
+        f'WHEN {TITLE_TABLE}.id IN ({id_list(pks)}) THEN {score!r}'
+        for score, pks in ranked.items()
+    )
+    return queryset.extra(
+        select={'search_rank': f'CASE {cases} ELSE 0 END'},
+        where=(f'{TITLE_TABLE}.id IN ({id_list(scores)})',),
+    ).order_by('-search_rank', 'name')
+
+
+def create_search_indexes(using='default', **kwargs):
+    """Обработчик post_migrate: индексы поиска для PostgreSQL."""
+    target = connections[using]
+    if target.vendor != 'postgresql':
+        return
+    with target.cursor() as cursor:
+        for sql in POSTGRESQL_INDEXES:
+            cursor.execute(sql)
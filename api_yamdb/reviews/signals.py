@@ -0,0 +1,130 @@
+from django.db.models import DEFERRED
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from users.models import User
+
+from .counters import apply_comment_delta
+from .models import Category, Comments, Genre, GenreTitle, Review, Title
+from .ratings import apply_rating_delta, refresh_title_rating
+from .search import title_index
+from .stats import mark_all_dirty, mark_title_dirty
+from .versions import (CATALOGUE, EPOCH, TITLES, bump_versions,
+                       comments_resource, reviews_resource, title_resource)
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, raw=False, **kwargs):
+    """Учитывает новую или измененную оценку в рейтинге произведения."""
+    if raw:
+        return
+    # Отзыв, загруженный через only() или defer(), хранит не все поля.
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    old_title_id = loaded.get('title_id', DEFERRED)
+    old_score = loaded.get('score', DEFERRED)
+    if created:
+        apply_rating_delta(instance.title_id, instance.score, 1)
+    elif DEFERRED in (old_title_id, old_score):
+        # Прежняя оценка неизвестна: пересчитываем произведение целиком.
+        refresh_title_rating(instance.title_id)
+    elif old_title_id != instance.title_id:
+        apply_rating_delta(old_title_id, -old_score, -1)
+        apply_rating_delta(instance.title_id, instance.score, 1)
+    else:
+        apply_rating_delta(instance.title_id, instance.score - old_score, 0)
+    instance._loaded_values = {
+        'title_id': instance.title_id, 'score': instance.score}
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    """Убирает оценку удаленного отзыва из рейтинга произведения."""
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    apply_rating_delta(
+        loaded.get('title_id', instance.title_id),
+        -loaded.get('score', instance.score), -1)
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def catalogue_changed(sender, raw=False, **kwargs):
+    if not raw:
+        bump_versions(TITLES, CATALOGUE)
+        mark_all_dirty()
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+@receiver(post_save, sender=GenreTitle)
+@receiver(post_delete, sender=GenreTitle)
+def title_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        title_id = instance.pk if sender is Title else instance.title_id
+        bump_versions(TITLES, title_resource(title_id))
+        mark_all_dirty()
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genres_changed(sender, instance, action, reverse, **kwargs):
+    if action.startswith('post_'):
+        # Со стороны жанра меняются связи сразу нескольких произведений.
+        bump_versions(TITLES, CATALOGUE if reverse
+                      else title_resource(instance.pk))
+        mark_all_dirty()
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def review_changed(sender, instance, raw=False, **kwargs):
+    # Версии произведения меняются в reviews.ratings, только если
+    # изменился его рейтинг.
+    if not raw:
+        bump_versions(reviews_resource(instance.title_id))
+        mark_title_dirty(instance.title_id)
+
+
+@receiver(post_delete, sender=Review)
+def review_removed(sender, instance, **kwargs):
+    # Комментарии удаленного отзыва больше не отдаются.
+    bump_versions(comments_resource(instance.pk))
+
+
+@receiver(post_save, sender=Comments)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        apply_comment_delta(instance.review_id, 1)
+
+
+@receiver(post_delete, sender=Comments)
+def comment_deleted(sender, instance, **kwargs):
+    apply_comment_delta(instance.review_id, -1)
+
+
+@receiver(post_save, sender=Comments)
+@receiver(post_delete, sender=Comments)
+def comment_changed(sender, instance, raw=False, **kwargs):
+    # Количество комментариев входит в представление отзыва.
+    if not raw:
+        bump_versions(comments_resource(instance.review_id),
+                      reviews_resource(instance.review.title_id))
+
+
+@receiver(post_save, sender=User)
+def username_changed(sender, instance, raw=False, **kwargs):
+    """Имя автора выводится в отзывах и комментариях."""
+    # Прежнюю строку уже прочитал users.signals.claims_changing.
+    previous = getattr(instance, '_previous_claims', None)
+    if (not raw and previous is not None
+            and previous['username'] != instance.username):
+        bump_versions(EPOCH)
+
+
+@receiver(post_save, sender=Title)
+def title_saved(sender, instance, raw=False, **kwargs):
+    title_index.update(instance)
+
+
+@receiver(post_delete, sender=Title)
+def title_deleted(sender, instance, **kwargs):
+    title_index.remove(instance.pk)
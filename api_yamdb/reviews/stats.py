@@ -0,0 +1,103 @@
+"""Сводная статистика жанров и категорий.
+
+Ответ строится из одной строки CatalogueStats. Сигналы отзывов и
+произведений только отмечают затронутые строки устаревшими; строка
+пересчитывается при чтении, если она устарела и пересчитана больше
+CATALOGUE_STATS_MAX_AGE секунд назад, или командой
+refresh_catalogue_stats. Так запись отзыва не агрегирует весь жанр, а
+данные отстают не больше чем на заданный срок."""
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Avg, Count, Q, Sum
+from django.utils import timezone
+
+from .models import CatalogueStats, Category, Genre, Title
+
+TOP_SIZE = 10
+TOP_FIELDS = ('id', 'name', 'year', 'rating', 'rating_count')
+GROUPS = {
+    CatalogueStats.GENRE: (Genre, 'genre__slug'),
+    CatalogueStats.CATEGORY: (Category, 'category__slug'),
+}
+
+
+def compute_stats(kind, slug):
+    titles = Title.objects.filter(**{GROUPS[kind][1]: slug})
+    summary = titles.aggregate(
+        titles_count=Count('id'),
+        reviews_count=Sum('rating_count'),
+        average_rating=Avg('rating'),
+    )
+    top_rated = titles.filter(rating__isnull=False).order_by(
+        '-rating', '-rating_count', 'name').values(*TOP_FIELDS)[:TOP_SIZE]
+    most_reviewed = titles.filter(rating_count__gt=0).order_by(
+        '-rating_count', '-rating', 'name').values(*TOP_FIELDS)[:TOP_SIZE]
+    return {
+        'titles_count': summary['titles_count'],
+        'reviews_count': summary['reviews_count'] or 0,
+        'average_rating': summary['average_rating'],
+        'top_rated': json.dumps(list(top_rated), ensure_ascii=False),
+        'most_reviewed': json.dumps(list(most_reviewed), ensure_ascii=False),
+    }
+
+
+def refresh_stats(kind, slug):
+    """Пересчитывает строку группы; None, если группы больше нет."""
+    rows = CatalogueStats.objects.filter(kind=kind, slug=slug)
+    if not GROUPS[kind][0].objects.filter(slug=slug).exists():
+        rows.delete()
+        return None
+    # Отметка снимается до подсчета: изменения, пришедшие во время
+    # подсчета, снова пометят строку устаревшей.
+    rows.update(dirty=False)
+    values = compute_stats(kind, slug)
+    values['refreshed'] = timezone.now()
+    stats, created = CatalogueStats.objects.get_or_create(
+        kind=kind, slug=slug, defaults={**values, 'dirty': False})
+    if not created:
+        rows.update(**values)
+        for field, value in values.items():
+            setattr(stats, field, value)
+    return stats
+
+
+def get_stats(kind, slug):
+    stats = CatalogueStats.objects.filter(kind=kind, slug=slug).first()
+    if stats is None:
+        return refresh_stats(kind, slug)
+    max_age = timedelta(seconds=settings.CATALOGUE_STATS_MAX_AGE)
+    if stats.dirty and stats.refreshed < timezone.now() - max_age:
+        return refresh_stats(kind, slug)
+    return stats
+
+
+def mark_title_dirty(title_id):
+    """Отмечает устаревшими строки жанров и категории произведения."""
+    CatalogueStats.objects.filter(
+        Q(kind=CatalogueStats.GENRE,
+          slug__in=Genre.objects.filter(titles=title_id).values('slug'))
+        | Q(kind=CatalogueStats.CATEGORY,
+            slug__in=Category.objects.filter(titles=title_id).values('slug'))
+    ).update(dirty=True)
+
+
+def mark_all_dirty():
+    CatalogueStats.objects.update(dirty=True)
+
+
+def refresh_all(dirty_only=True):
+    """Пересчитывает строки групп и удаляет строки удаленных групп."""
+    refreshed = 0
+    for kind, (model, _) in GROUPS.items():
+        existing = CatalogueStats.objects.filter(kind=kind)
+        existing.exclude(slug__in=model.objects.values('slug')).delete()
+        slugs = model.objects.values_list('slug', flat=True)
+        if dirty_only:
+            clean = existing.filter(dirty=False).values('slug')
+            slugs = slugs.exclude(slug__in=clean)
+        for slug in slugs.iterator():
+            refresh_stats(kind, slug)
+            refreshed += 1
+    return refreshed
@@ -0,0 +1,56 @@
+"""Версии ресурсов API, по которым строятся ETag без сериализации.
+
+Каждое изменение данных увеличивает счетчики затронутых ресурсов в той же
+транзакции. Счетчик epoch увеличивается при массовых операциях, которые
+обходят сигналы, и входит в версию любого ресурса."""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ResourceVersion
+
+EPOCH = 'epoch'
+# Список произведений: меняется с любым произведением и его рейтингом.
+TITLES = 'titles'
+# Общее для всех произведений: категории, жанры и массовые записи.
+CATALOGUE = 'catalogue'
+
+
+def title_resource(title_id):
+    return f'title:{title_id}'
+
+
+def reviews_resource(title_id):
+    return f'reviews:{title_id}'
+
+
+def comments_resource(review_id):
+    return f'comments:{review_id}'
+
+
+def bump_versions(*names):
+    for name in set(names):
+        updated = ResourceVersion.objects.filter(name=name).update(
+            version=F('version') + 1, modified=timezone.now())
+        if updated:
+            continue
+        try:
+            with transaction.atomic():
+                ResourceVersion.objects.create(name=name, version=1)
+        except IntegrityError:
+            # Строку успел создать параллельный запрос.
+            ResourceVersion.objects.filter(name=name).update(
+                version=F('version') + 1, modified=timezone.now())
+
+
+def get_versions(*names):
+    """Возвращает строку версий и дату последнего изменения ресурсов."""
+    names = (EPOCH,) + names
+    rows = {
+        name: (version, modified)
+        for name, version, modified in ResourceVersion.objects.filter(
+            name__in=names).values_list('name', 'version', 'modified')
+    }
+    versions = ':'.join(str(rows.get(name, (0,))[0]) for name in names)
+    modified = max((row[1] for row in rows.values()), default=None)
+    return versions, modified
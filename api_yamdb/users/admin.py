@@ -2,7 +2,7 @@ from django.contrib import admin
 
 from api_yamdb.settings import EMPTY_VALUE_DISPLAY
 
-from .models import User
+from .models import OutboxEmail, User
 
 
 @admin.register(User)
@@ -13,3 +13,13 @@ class UserAdmin(admin.ModelAdmin):
     search_fields = ('email',)
     list_filter = ('role',)
     empty_value_display = EMPTY_VALUE_DISPLAY
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    """Очередь писем: что ждет отправки и почему не ушло."""
+    list_display = ('pk', 'recipient', 'subject', 'created', 'attempts',
+                    'next_attempt', 'sent',)
+    search_fields = ('recipient',)
+    list_filter = ('sent',)
+    empty_value_display = EMPTY_VALUE_DISPLAY
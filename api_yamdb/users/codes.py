@@ -0,0 +1,108 @@
+"""Коды подтверждения: хранение хеша, проверка и ограничение попыток.
+
+В базе лежит только HMAC-SHA256 кода, сравнение идет за постоянное
+время. Код одноразовый: верный код удаляется тем же запросом, который
+подтверждает проверку. Код действует CONFIRMATION_CODE_TTL секунд и не больше
+CONFIRMATION_CODE_MAX_ATTEMPTS неверных попыток; просроченные строки
+удаляет команда purge_confirmation_codes. Поток запросов токена на один
+username отсекается в памяти процесса еще до обращения к базе."""
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ConfirmationCode
+
+
+def hash_code(code):
+    return hmac.new(settings.SECRET_KEY.encode(), str(code).encode(),
+                    hashlib.sha256).hexdigest()
+
+
+# Сравнение с ним, когда кода нет, выравнивает время ответа.
+MISSING_HASH = hash_code('')
+
+
+def code_row(username, code):
+    return ConfirmationCode(
+        username=username,
+        code_hash=hash_code(code),
+        expires=timezone.now() + timedelta(
+            seconds=settings.CONFIRMATION_CODE_TTL),
+        attempts=0,
+    )
+
+
+def verify_code(username, code):
+    """True или False по коду, None - если действующего кода нет."""
+    row = ConfirmationCode.objects.filter(
+        username=username,
+        expires__gt=timezone.now(),
+        attempts__lt=settings.CONFIRMATION_CODE_MAX_ATTEMPTS,
+    ).values_list('pk', 'code_hash').first()
+    pk, code_hash = row or (None, MISSING_HASH)
+    matches = hmac.compare_digest(code_hash, hash_code(code))
+    if row is None:
+        return None
+    if not matches:
+        ConfirmationCode.objects.filter(pk=pk).update(
+            attempts=F('attempts') + 1)
+        return False
+    # Из параллельных запросов с одним кодом строку удалит только один.
+    # Условие на хеш не даст удалить код, выданный заново после чтения.
+    deleted, _ = ConfirmationCode.objects.filter(
+        pk=pk, code_hash=code_hash).delete()
+    return bool(deleted)
+
+
+def purge_expired_codes():
+    """Удаляет просроченные коды одним DELETE, возвращает их число."""
+    deleted, _ = ConfirmationCode.objects.filter(
+        expires__lte=timezone.now()).delete()
+    return deleted
+
+
+class AttemptLimiter:
+    """Не больше limit попыток на ключ за window секунд.
+
+    Окна хранятся в памяти процесса; число ключей ограничено max_keys,
+    при переполнении забываются самые старые."""
+
+    def __init__(self, limit, window, max_keys=10000):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self.lock = threading.Lock()
+        self.windows = OrderedDict()
+
+    def allow(self, key):
+        now = time.monotonic()
+        with self.lock:
+            started, count = self.windows.pop(key, (now, 0))
+            if now - started >= self.window:
+                started, count = now, 0
+            self.windows[key] = (started, count + 1)
+            if len(self.windows) > self.max_keys:
+                self.windows.popitem(last=False)
+            return count < self.limit
+
+    def retry_after(self, key):
+        with self.lock:
+            started, _ = self.windows.get(key, (time.monotonic(), 0))
+        return max(0, self.window - (time.monotonic() - started))
+
+    def reset(self):
+        with self.lock:
+            self.windows.clear()
+
+
+token_attempts = AttemptLimiter(
+    settings.CONFIRMATION_ATTEMPTS_LIMIT,
+    settings.CONFIRMATION_ATTEMPTS_WINDOW,
+)
@@ -0,0 +1,260 @@
+"""Фоновая отправка писем, чтобы запрос не ждал почтовый сервер.
+
+Способ доставки задается настройкой EMAIL_QUEUE:
+thread - очередь в памяти процесса и поток-отправитель (по умолчанию),
+    письма, не отправленные к остановке процесса, теряются;
+outbox - письма сохраняются в таблицу OutboxEmail, их отправляет
+    команда send_emails, запущенная отдельным процессом;
+sync - отправка прямо во время запроса.
+
+Письма уходят пачками через одно соединение с почтовым сервером,
+неудачные повторяются с экспоненциально растущей задержкой."""
+import atexit
+import heapq
+import itertools
+import smtplib
+import threading
+import time
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import (Avg, Count, DurationField, ExpressionWrapper, F,
+                              Min, Q)
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+QUEUE_THREAD = 'thread'
+QUEUE_OUTBOX = 'outbox'
+QUEUE_SYNC = 'sync'
+# Сколько секунд при остановке процесса ждать отправки очереди в памяти.
+SHUTDOWN_TIMEOUT = 5
+DELIVERY_ERRORS = (smtplib.SMTPException, OSError)
+
+
+def retry_delay(attempts):
+    """Задержка в секундах перед попыткой после attempts неудачных."""
+    return settings.EMAIL_RETRY_BACKOFF * 2 ** (attempts - 1)
+
+
+def deliver(messages):
+    """Отправляет письма в одной сессии, возвращает ошибку по каждому."""
+    connection = get_connection()
+    try:
+        connection.open()
+    except DELIVERY_ERRORS as error:
+        return [error] * len(messages)
+    errors = []
+    try:
+        for message in messages:
+            message.connection = connection
+            try:
+                message.send()
+            except DELIVERY_ERRORS as error:
+                errors.append(error)
+            else:
+                errors.append(None)
+    finally:
+        connection.close()
+    return errors
+
+
+class SyncDispatcher:
+    """Отправка во время запроса, как до появления очереди."""
+
+    def enqueue(self, message):
+        message.send()
+
+    def stats(self):
+        return {'mode': QUEUE_SYNC}
+
+
+class ThreadDispatcher:
+    """Очередь писем в памяти с одним фоновым потоком-отправителем.
+
+    Очередь упорядочена по времени следующей попытки, так что письма на
+    повторе не задерживают новые."""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.heap = []
+        self.sequence = itertools.count()
+        self.thread = None
+        self.in_flight = 0
+        self.counters = {'queued': 0, 'sent': 0, 'retried': 0, 'failed': 0}
+        self.latency_total = self.latency_max = 0.0
+        self.last_error = None
+        atexit.register(self.join, SHUTDOWN_TIMEOUT)
+
+    def enqueue(self, message):
+        with self.condition:
+            now = time.monotonic()
+            self.push(now, message, 0, now)
+            self.counters['queued'] += 1
+            if self.thread is None or not self.thread.is_alive():
+                # Поток создается при первом письме, уже после fork
+                # воркера gunicorn.
+                self.thread = threading.Thread(
+                    target=self.run, name='email-dispatcher', daemon=True)
+                self.thread.start()
+            self.condition.notify_all()
+
+    def push(self, due, message, attempts, enqueued):
+        heapq.heappush(
+            self.heap, (due, next(self.sequence), message, attempts, enqueued))
+
+    def take_batch(self):
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                if self.heap and self.heap[0][0] <= now:
+                    break
+                timeout = self.heap[0][0] - now if self.heap else None
+                self.condition.wait(timeout)
+            batch = []
+            while (self.heap and self.heap[0][0] <= now
+                   and len(batch) < settings.EMAIL_BATCH_SIZE):
+                batch.append(heapq.heappop(self.heap))
+            self.in_flight = len(batch)
+            return batch
+
+    def run(self):
+        while True:
+            batch = self.take_batch()
+            errors = deliver([entry[2] for entry in batch])
+            with self.condition:
+                for entry, error in zip(batch, errors):
+                    self.record(entry, error)
+                self.in_flight = 0
+                self.condition.notify_all()
+
+    def record(self, entry, error):
+        _, _, message, attempts, enqueued = entry
+        attempts += 1
+        now = time.monotonic()
+        if error is None:
+            self.counters['sent'] += 1
+            self.latency_total += now - enqueued
+            self.latency_max = max(self.latency_max, now - enqueued)
+            return
+        self.last_error = str(error)
+        if attempts < settings.EMAIL_MAX_ATTEMPTS:
+            self.counters['retried'] += 1
+            self.push(now + retry_delay(attempts), message, attempts, enqueued)
+        else:
+            self.counters['failed'] += 1
+
+    def join(self, timeout=None):
+        """Ждет опустошения очереди; False, если не дождался."""
+        with self.condition:
+            return self.condition.wait_for(
+                lambda: not self.heap and not self.in_flight, timeout)
+
+    def stats(self):
+        with self.condition:
+            sent = self.counters['sent']
+            return {
+                'mode': QUEUE_THREAD,
+                'depth': len(self.heap) + self.in_flight,
+                **self.counters,
+                'latency_avg': self.latency_total / sent if sent else None,
+                'latency_max': self.latency_max if sent else None,
+                'last_error': self.last_error,
+            }
+
+
+class OutboxDispatcher:
+    """Очередь в таблице OutboxEmail: письма переживают перезапуск."""
+
+    def enqueue(self, message):
+        OutboxEmail.objects.bulk_create([
+            OutboxEmail(
+                subject=message.subject,
+                body=message.body,
+                from_email=message.from_email,
+                recipient=recipient,
+                next_attempt=timezone.now(),
+            )
+            for recipient in message.recipients()
+        ])
+
+    def pending(self):
+        return OutboxEmail.objects.filter(
+            sent__isnull=True, attempts__lt=settings.EMAIL_MAX_ATTEMPTS)
+
+    def process(self, batch_size=None):
+        """Отправляет одну пачку писем, время которых подошло.
+
+        Строки блокируются с SKIP LOCKED, поэтому несколько команд
+        send_emails не отправят одно письмо дважды."""
+        with transaction.atomic():
+            entries = list(
+                self.pending().select_for_update(skip_locked=True).filter(
+                    next_attempt__lte=timezone.now()
+                )[:batch_size or settings.EMAIL_BATCH_SIZE]
+            )
+            if not entries:
+                return 0
+            errors = deliver([
+                EmailMessage(entry.subject, entry.body, entry.from_email,
+                             [entry.recipient])
+                for entry in entries
+            ])
+            now = timezone.now()
+            for entry, error in zip(entries, errors):
+                entry.attempts += 1
+                if error is None:
+                    entry.sent = now
+                    entry.last_error = ''
+                else:
+                    entry.last_error = str(error)
+                    entry.next_attempt = now + timedelta(
+                        seconds=retry_delay(entry.attempts))
+            OutboxEmail.objects.bulk_update(
+                entries, ('attempts', 'sent', 'last_error', 'next_attempt'))
+        return len(entries)
+
+    def stats(self):
+        pending = Q(sent__isnull=True,
+                    attempts__lt=settings.EMAIL_MAX_ATTEMPTS)
+        # Псевдоним sent совпал бы с полем и попал в другие фильтры.
+        stats = OutboxEmail.objects.aggregate(
+            depth=Count('id', filter=pending),
+            delivered=Count('id', filter=Q(sent__isnull=False)),
+            retried=Count('id', filter=pending & Q(attempts__gt=0)),
+            failed=Count('id', filter=Q(
+                sent__isnull=True,
+                attempts__gte=settings.EMAIL_MAX_ATTEMPTS)),
+            latency_avg=Avg(ExpressionWrapper(
+                F('sent') - F('created'), output_field=DurationField())),
+            oldest=Min('created', filter=pending),
+        )
+        stats['sent'] = stats.pop('delivered')
+        if stats['latency_avg'] is not None:
+            stats['latency_avg'] = stats['latency_avg'].total_seconds()
+        return {'mode': QUEUE_OUTBOX, **stats}
+
+
+DISPATCHERS = {
+    QUEUE_THREAD: ThreadDispatcher,
+    QUEUE_OUTBOX: OutboxDispatcher,
+    QUEUE_SYNC: SyncDispatcher,
+}
+
+
+@lru_cache(maxsize=None)
+def create_dispatcher(mode):
+    return DISPATCHERS[mode]()
+
+
+def get_dispatcher():
+    return create_dispatcher(settings.EMAIL_QUEUE)
+
+
+def send_mail_later(subject, message, recipient):
+    """Ставит письмо в очередь текущего способа доставки."""
+    get_dispatcher().enqueue(EmailMessage(
+        subject, message, settings.EMAIL_HOST_USER, [recipient]))
@@ -0,0 +1,11 @@
+"""Удаление просроченных кодов подтверждения."""
+from django.core.management.base import BaseCommand
+from users.codes import purge_expired_codes
+
+
+class Command(BaseCommand):
+    """Удаляет коды, срок действия которых истек, одним запросом."""
+    help = 'purge_confirmation_codes'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Удалено кодов: {purge_expired_codes()}')
@@ -0,0 +1,49 @@
+"""Обработчик очереди писем в таблице OutboxEmail (EMAIL_QUEUE=outbox)."""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from users.mail import OutboxDispatcher
+
+
+class Command(BaseCommand):
+    """Отправляет письма из очереди пачками, пока его не остановят."""
+    help = 'send_emails'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Сколько писем отправлять за одно соединение.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Пауза в секундах, когда очередь пуста.',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Отправить все готовые письма и завершиться.',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] is not None and options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть положительным.')
+        dispatcher = OutboxDispatcher()
+        try:
+            while True:
+                processed = dispatcher.process(options['batch_size'])
+                if processed:
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        stats = dispatcher.stats()
+        self.stdout.write(
+            f'В очереди {stats["depth"]}, отправлено {stats["sent"]}, '
+            f'не доставлено {stats["failed"]}'
+        )
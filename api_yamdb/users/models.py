@@ -24,7 +24,9 @@ class User(AbstractUser):
         choices=CHOICES_ROLE,
         default=user,
     )
-    confirmation_code = models.CharField(max_length=50, blank=True)
+    # Растет при смене данных, записанных в токен; старые токены с
+    # прежним значением проверяются по базе данных.
+    token_generation = models.PositiveIntegerField(default=0, editable=False)
     REQUIRED_FIELDS = ['email']
 
     def __str__(self):
@@ -44,3 +46,41 @@ class User(AbstractUser):
         constraints = [models.UniqueConstraint(
             fields=('username', 'email'),
             name='Поля `email` и `username` должны быть уникальными.'), ]
+
+
+class ConfirmationCode(models.Model):
+    """Хеш кода подтверждения, выданного при регистрации.
+
+    Код ищется по username без загрузки пользователя."""
+    username = models.CharField(max_length=150, unique=True)
+    code_hash = models.CharField(max_length=64)
+    expires = models.DateTimeField(db_index=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Код подтверждения'
+        verbose_name_plural = 'Коды подтверждения'
+
+    def __str__(self):
+        return self.username
+
+
+class OutboxEmail(models.Model):
+    """Письмо в очереди на отправку, если включен режим outbox."""
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254, blank=True)
+    recipient = models.EmailField(max_length=254)
+    created = models.DateTimeField(auto_now_add=True)
+    next_attempt = models.DateTimeField(db_index=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    sent = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name = 'Письмо в очереди'
+        verbose_name_plural = 'Очередь писем'
+        ordering = ('next_attempt', 'id')
+
+    def __str__(self):
+        return f'{self.recipient}: {self.subject}'
@@ -0,0 +1,95 @@
+"""Регистрация пользователя двумя вставками без предварительных проверок.
+
+Пользователь добавляется через INSERT ... ON CONFLICT (username, email)
+DO NOTHING, затем код подтверждения через INSERT ... ON CONFLICT
+(username) DO UPDATE. Такой синтаксис понимают и PostgreSQL, и
+SQLite 3.24+. Конфликт только по username или только по email
+по-прежнему нарушает уникальность и становится ошибкой валидации.
+PostgreSQL может сообщить о нарушении отдельного индекса username или
+email и для той же пары, добавленной параллельным запросом, поэтому
+после ошибки пара проверяется еще раз. Параллельные регистрации одного
+пользователя не создают дубликатов: их разрешает сама база данных."""
+from contextlib import nullcontext
+
+from django.db import IntegrityError, connection, transaction
+from rest_framework.exceptions import ValidationError
+
+from .codes import code_row
+from .models import User
+
+UPSERT_VENDORS = ('postgresql', 'sqlite')
+USERNAME_TAKEN = 'Пользователь с таким username уже существует.'
+EMAIL_TAKEN = 'Пользователь с таким email уже существует.'
+
+
+def upsert_sql(model, fields, conflict, update):
+    quote = connection.ops.quote_name
+
+    def columns(names):
+        return [quote(model._meta.get_field(name).column) for name in names]
+
+    action = 'DO NOTHING'
+    if update:
+        action = 'DO UPDATE SET ' + ', '.join(
+            f'{column} = EXCLUDED.{column}' for column in columns(update))
+    return (
+        f'INSERT INTO {quote(model._meta.db_table)} '
+        f'({", ".join(quote(field.column) for field in fields)}) '
+        f'VALUES ({", ".join(["%s"] * len(fields))}) '
+        f'ON CONFLICT ({", ".join(columns(conflict))}) {action}'
+    )
+
+
+def upsert(obj, conflict, update=()):
+    """Вставляет obj или обновляет поля update у строки с тем же conflict."""
+    model = type(obj)
+    if connection.vendor not in UPSERT_VENDORS:
+        return update_or_insert(obj, conflict, update)
+    fields = [
+        field for field in model._meta.concrete_fields if not field.primary_key
+    ]
+    params = [
+        field.get_db_prep_save(field.pre_save(obj, True), connection)
+        for field in fields
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(upsert_sql(model, fields, conflict, update), params)
+
+
+def update_or_insert(obj, conflict, update=()):
+    # Запасной путь для СУБД без ON CONFLICT.
+    model = type(obj)
+    with transaction.atomic():
+        existing = model.objects.filter(
+            **{name: getattr(obj, name) for name in conflict})
+        if update:
+            found = existing.update(
+                **{name: getattr(obj, name) for name in update})
+        else:
+            found = existing.exists()
+        if not found:
+            obj.save(force_insert=True)
+
+
+def check_taken(username, email):
+    """Ошибка валидации, если username или email занят другой парой."""
+    if User.objects.filter(username=username, email=email).exists():
+        return
+    if User.objects.filter(username=username).exists():
+        raise ValidationError({'username': [USERNAME_TAKEN]})
+    raise ValidationError({'email': [EMAIL_TAKEN]})
+
+
+def register_user(username, email, confirmation_code):
+    """Создает пользователя, если его нет, и выдает новый код."""
+    # Ошибка внутри внешней транзакции не должна ее обрывать.
+    context = (transaction.atomic() if connection.in_atomic_block
+               else nullcontext())
+    try:
+        with context:
+            upsert(User(username=username, email=email),
+                   conflict=('username', 'email'))
+    except IntegrityError:
+        check_taken(username, email)
+    upsert(code_row(username, confirmation_code), conflict=('username',),
+           update=('code_hash', 'expires', 'attempts'))
@@ -0,0 +1,41 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import User
+from .tokens import CLAIM_FIELDS, forget_generation, remember_generation
+
+
+@receiver(pre_save, sender=User)
+def claims_changing(sender, instance, raw=False, **kwargs):
+    """Увеличивает поколение токенов, если меняются данные из claims.
+
+    Прежние значения claims остаются в instance._previous_claims: по ним
+    обработчики post_save других приложений сверяют изменения без
+    повторного чтения строки."""
+    instance._claims_changed = False
+    instance._previous_claims = None
+    if raw or instance.pk is None:
+        return
+    old = User.objects.filter(pk=instance.pk).values_list(
+        *CLAIM_FIELDS, 'token_generation').first()
+    if old is None:
+        return
+    instance._previous_claims = dict(zip(CLAIM_FIELDS, old))
+    if old[:-1] != tuple(getattr(instance, field) for field in CLAIM_FIELDS):
+        instance.token_generation = old[-1] + 1
+        instance._claims_changed = True
+
+
+@receiver(post_save, sender=User)
+def claims_changed(sender, instance, update_fields=None, **kwargs):
+    if not getattr(instance, '_claims_changed', False):
+        return
+    if update_fields is not None and 'token_generation' not in update_fields:
+        User.objects.filter(pk=instance.pk).update(
+            token_generation=instance.token_generation)
+    remember_generation(instance)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    forget_generation(instance.pk)
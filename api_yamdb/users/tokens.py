@@ -0,0 +1,43 @@
+"""Токены доступа с ролью пользователя в claims.
+
+Вместе с id в токен записываются данные, которых хватает проверкам прав,
+и поколение токенов пользователя. Поколение растет при изменении этих
+данных; текущее значение хранится в кеше с коротким сроком, поэтому
+устаревшие claims перестают приниматься не позже чем через
+AUTH_CLAIMS_CACHE_TIMEOUT секунд даже при кеше в памяти процесса."""
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework_simplejwt.tokens import RefreshToken
+
+GENERATION_CLAIM = 'generation'
+CLAIM_FIELDS = ('username', 'role', 'is_staff', 'is_superuser', 'is_active')
+
+
+def get_cache():
+    return caches[settings.AUTH_CLAIMS_CACHE_ALIAS]
+
+
+def generation_key(user_id):
+    return f'auth:generation:{user_id}'
+
+
+def cached_generation(user_id):
+    return get_cache().get(generation_key(user_id))
+
+
+def remember_generation(user):
+    get_cache().set(generation_key(user.pk), user.token_generation,
+                    settings.AUTH_CLAIMS_CACHE_TIMEOUT)
+
+
+def forget_generation(user_id):
+    get_cache().delete(generation_key(user_id))
+
+
+def access_token_for(user):
+    refresh = RefreshToken.for_user(user)
+    for field in CLAIM_FIELDS:
+        refresh[field] = getattr(user, field)
+    refresh[GENERATION_CLAIM] = user.token_generation
+    remember_generation(user)
+    return refresh.access_token
@@ -1,9 +1,71 @@
+import os
 import sys
 from os.path import abspath, dirname, join
 
+import pytest
+
 root_dir = dirname(dirname(abspath(__file__)))
 sys.path.append(root_dir)
 infra_dir_path = join(root_dir, 'infra')
 
 pytest_plugins = [
+    'tests.fixtures.fixture_data',
 ]
+
+
+def pytest_configure(config):
+    # Без переменной окружения DB_ENGINE (локально и в CI без postgres)
+    # тесты с базой данных выполняются на SQLite в памяти.
+    if 'DB_ENGINE' in os.environ:
+        return
+    from django.conf import settings
+    from django.db import connections
+    settings.DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ':memory:',
+        }
+    }
+    # Подключение создается еще при загрузке моделей, до conftest:
+    # сбрасываем закешированные настройки и само подключение.
+    connections._databases = None
+    connections.__dict__.pop('databases', None)
+    connections._connections.__dict__.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    from django.core.cache import caches
+
+    for cache in caches.all():
+        cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_search_index():
+    # Откат транзакции теста не вызывает сигналы, индекс в памяти
+    # процесса нужно строить заново.
+    from reviews.search import title_index
+
+    title_index.reset()
+
+
+@pytest.fixture(autouse=True)
+def reset_token_attempts():
+    from users.codes import token_attempts
+
+    token_attempts.reset()
+
+
+@pytest.fixture(autouse=True)
+def reset_throttling():
+    from api.throttling import get_buckets
+
+    get_buckets().clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    from api.metrics import route_metrics
+
+    route_metrics.clear()
@@ -0,0 +1,61 @@
+import pytest
+
+
+@pytest.fixture
+def admin(django_user_model):
+    return django_user_model.objects.create_user(
+        username='TestAdmin', email='admin@yamdb.fake', role='admin',
+        password='1234567'
+    )
+
+
+@pytest.fixture
+def admin_client(admin):
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    client.force_authenticate(user=admin)
+    return client
+
+
+@pytest.fixture
+def catalogue(django_user_model, admin):
+    """Наполняет базу несколькими произведениями со всеми связями."""
+    from reviews.models import (Category, Comments, Genre, GenreTitle, Review,
+                                Title)
+
+    authors = [
+        django_user_model.objects.create_user(
+            username=f'user{i}', email=f'user{i}@yamdb.fake')
+        for i in range(3)
+    ]
+    categories = [
+        Category.objects.create(name=f'Категория {i}', slug=f'category-{i}')
+        for i in range(3)
+    ]
+    genres = [
+        Genre.objects.create(name=f'Жанр {i}', slug=f'genre-{i}')
+        for i in range(3)
+    ]
+    titles = []
+    for i in range(6):
+        title = Title.objects.create(
+            name=f'Произведение {i}', year=2000 + i,
+            description=f'Описание {i}', category=categories[i % 3])
+        for genre in genres[:i % 3 + 1]:
+            GenreTitle.objects.create(genre=genre, title=title)
+        titles.append(title)
+    reviews = []
+    for author in authors:
+        review = Review.objects.create(
+            author=author, title=titles[0], text=f'Отзыв {author}', score=5)
+        reviews.append(review)
+        for commenter in authors:
+            Comments.objects.create(
+                author=commenter, review=review, text='Комментарий')
+    return {
+        'categories': categories,
+        'genres': genres,
+        'titles': titles,
+        'reviews': reviews,
+    }
@@ -0,0 +1,160 @@
+import pytest
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+
+def titles(count, genres=('genre-0', 'genre-1'), category='category-0'):
+    return [{'name': f'Новое {number}', 'year': 2001, 'genre': list(genres),
+             'category': category} for number in range(count)]
+
+
+@pytest.mark.django_db
+class TestBulkTitles:
+    url = '/api/v1/titles/bulk/'
+
+    # Кеши и индекс поиска сбрасываются после фиксации транзакции.
+    @pytest.mark.django_db(transaction=True)
+    def test_create(self, admin_client, client, catalogue):
+        from reviews.models import GenreTitle
+
+        client.get('/api/v1/titles/', {'limit': 100})
+        client.get('/api/v1/titles/', {'search': 'категории'})
+        data = titles(2) + [{'name': 'Без категории', 'year': 1990,
+                             'genre': ['genre-2']}]
+        response = admin_client.post(self.url, data, format='json')
+        assert response.status_code == 201, response.json()
+        created = response.json()
+        assert [title['name'] for title in created] == [
+            'Новое 0', 'Новое 1', 'Без категории'], (
+            'Ответ должен перечислять произведения в порядке запроса'
+        )
+        assert [genre['slug'] for genre in created[0]['genre']] == [
+            'genre-0', 'genre-1']
+        assert created[2]['category'] is None
+        assert GenreTitle.objects.filter(
+            title_id__in=[title['id'] for title in created]).count() == 5
+        listed = client.get('/api/v1/titles/', {'limit': 100}).json()
+        assert listed['count'] == 9, (
+            'Массовая запись должна сбрасывать кеш списка произведений'
+        )
+        found = client.get('/api/v1/titles/', {'search': 'категории'}).json()
+        assert [title['name'] for title in found['results']] == [
+            'Без категории']
+
+    def test_queries_do_not_depend_on_size(self, admin_client, catalogue):
+        counts = []
+        for size in (2, 40):
+            with CaptureQueriesContext(connection) as context:
+                response = admin_client.post(
+                    self.url, titles(size), format='json')
+            assert response.status_code == 201
+            counts.append(len(context.captured_queries))
+        assert counts[0] == counts[1], (
+            'Slug жанров и категорий должны находиться одним запросом, '
+            'а произведения записываться через bulk_create'
+        )
+
+    def test_errors_by_position(self, admin_client, catalogue):
+        from reviews.models import Title
+
+        data = titles(1) + [
+            {'name': 'Будущее', 'year': 3000, 'genre': []},
+            {'name': 'Нет жанра', 'year': 2000, 'genre': ['unknown'],
+             'category': 'unknown'},
+        ]
+        response = admin_client.post(self.url, data, format='json')
+        assert response.status_code == 400
+        errors = response.json()
+        assert errors[0] == {}
+        assert list(errors[1]) == ['year']
+        assert set(errors[2]) == {'genre', 'category'}
+        assert Title.objects.count() == 6, (
+            'При ошибке в любом элементе ничего не должно записываться'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_update(self, admin_client, client, catalogue):
+        from reviews.models import GenreTitle
+
+        first, second = catalogue['titles'][:2]
+        client.get(f'/api/v1/titles/{second.id}/')
+        response = admin_client.patch(self.url, [
+            {'id': second.id, 'name': 'Переименовано', 'genre': ['genre-2']},
+            {'id': first.id, 'category': None},
+        ], format='json')
+        assert response.status_code == 200, response.json()
+        updated = response.json()
+        assert updated[0]['name'] == 'Переименовано'
+        assert [genre['slug'] for genre in updated[0]['genre']] == [
+            'genre-2']
+        assert updated[1]['category'] is None
+        assert updated[1]['name'] == first.name
+        assert list(GenreTitle.objects.filter(title=second).values_list(
+            'genre__slug', flat=True)) == ['genre-2']
+        cached = client.get(f'/api/v1/titles/{second.id}/').json()
+        assert cached['name'] == 'Переименовано', (
+            'Массовое изменение должно сбрасывать кеш произведения'
+        )
+        response = admin_client.patch(
+            self.url, [{'name': 'Без id'}, {'id': 0}], format='json')
+        assert response.status_code == 400
+        assert [list(error) for error in response.json()] == [['id'], ['id']]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_rollback_keeps_caches(self, client, catalogue):
+        from api.bulk import create_titles
+
+        client.get('/api/v1/titles/')
+        with transaction.atomic():
+            create_titles(titles(1))
+            transaction.set_rollback(True)
+        assert client.get('/api/v1/titles/')['X-Cache'] == 'HIT', (
+            'Откат массовой записи не должен сбрасывать кеш'
+        )
+
+    def test_only_admin(self, catalogue):
+        from rest_framework.test import APIClient
+
+        client = APIClient()
+        assert client.post(
+            self.url, titles(1), format='json').status_code == 401
+        client.force_authenticate(user=catalogue['reviews'][0].author)
+        assert client.post(
+            self.url, titles(1), format='json').status_code == 403
+
+
+@pytest.mark.django_db
+class TestBulkGroups:
+
+    def test_create_and_rename_genres(self, admin_client, catalogue):
+        url = '/api/v1/genres/bulk/'
+        response = admin_client.post(url, [
+            {'name': 'Вестерн', 'slug': 'western'},
+            {'name': 'Нуар', 'slug': 'noir'},
+        ], format='json')
+        assert response.status_code == 201
+        assert response.json() == [{'name': 'Вестерн', 'slug': 'western'},
+                                   {'name': 'Нуар', 'slug': 'noir'}]
+        response = admin_client.post(url, [
+            {'name': 'Снова', 'slug': 'genre-0'},
+            {'name': 'Дважды', 'slug': 'twice'},
+            {'name': 'Дважды', 'slug': 'twice'},
+        ], format='json')
+        assert response.status_code == 400
+        assert [list(error) for error in response.json()] == [
+            ['slug'], [], ['slug']]
+        response = admin_client.patch(
+            url, [{'name': 'Неонуар', 'slug': 'noir'}], format='json')
+        assert response.json() == [{'name': 'Неонуар', 'slug': 'noir'}]
+
+    def test_categories(self, admin_client, catalogue):
+        url = '/api/v1/categories/bulk/'
+        response = admin_client.post(
+            url, [{'name': 'Игры', 'slug': 'games'}], format='json')
+        assert response.status_code == 201
+        response = admin_client.patch(
+            url, [{'name': 'Нет', 'slug': 'unknown'}], format='json')
+        assert response.status_code == 400
+        response = admin_client.post(url, {'name': 'Не массив'},
+                                     format='json')
+        assert response.status_code == 400
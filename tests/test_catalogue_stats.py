@@ -0,0 +1,50 @@
+import pytest
+
+
+@pytest.mark.django_db
+class TestCatalogueStats:
+    genre_url = '/api/v1/genres/genre-0/stats/'
+    category_url = '/api/v1/categories/category-0/top/'
+
+    def test_genre_stats(self, client, catalogue,
+                         django_assert_num_queries):
+        response = client.get(self.genre_url)
+        assert response.status_code == 200
+        data = response.json()
+        assert data['genre'] == 'genre-0'
+        assert data['titles_count'] == 6 and data['reviews_count'] == 3
+        assert [title['name'] for title in data['top_rated']] == [
+            'Произведение 0'], (
+            'В лучших по рейтингу должны быть произведения с оценками'
+        )
+        with django_assert_num_queries(1):
+            response = client.get(self.genre_url)
+        assert response.json() == data, (
+            'Статистика должна читаться одной строкой сводной таблицы'
+        )
+
+    def test_category_top_and_missing_group(self, client, catalogue):
+        response = client.get(self.category_url)
+        assert response.status_code == 200
+        assert response.json()['category'] == 'category-0'
+        assert response.json()['most_reviewed'][0]['rating_count'] == 3
+        assert client.get(
+            '/api/v1/categories/unknown/top/').status_code == 404
+
+    def test_staleness_bound(self, client, catalogue, settings):
+        from reviews.models import Review
+
+        client.get(self.genre_url)
+        title = catalogue['titles'][1]
+        author = catalogue['reviews'][0].author
+        Review.objects.create(author=author, title=title, text='Да', score=9)
+        settings.CATALOGUE_STATS_MAX_AGE = 3600
+        assert client.get(self.genre_url).json()['reviews_count'] == 3, (
+            'В пределах срока устаревания отдается сохраненная статистика'
+        )
+        settings.CATALOGUE_STATS_MAX_AGE = 0
+        data = client.get(self.genre_url).json()
+        assert data['reviews_count'] == 4, (
+            'Устаревшая статистика старше срока должна пересчитываться'
+        )
+        assert data['top_rated'][0]['name'] == 'Произведение 1'
@@ -0,0 +1,117 @@
+import pytest
+
+
+@pytest.mark.django_db
+class TestConditionalGet:
+
+    @pytest.fixture
+    def urls(self, catalogue):
+        review = catalogue['reviews'][0]
+        title_url = f'/api/v1/titles/{review.title_id}/'
+        reviews_url = f'{title_url}reviews/'
+        comments_url = f'{reviews_url}{review.id}/comments/'
+        comment = review.comments.first()
+        return {
+            'titles': '/api/v1/titles/',
+            'title': title_url,
+            'reviews': reviews_url,
+            'review': f'{reviews_url}{review.id}/',
+            'comments': comments_url,
+            'comment': f'{comments_url}{comment.id}/',
+        }
+
+    @pytest.mark.parametrize('name', (
+        'titles', 'title', 'reviews', 'review', 'comments', 'comment'))
+    def test_not_modified(self, client, urls, name):
+        response = client.get(urls[name])
+        assert response.status_code == 200
+        etag = response['ETag']
+        assert response.has_header('Last-Modified')
+        repeated = client.get(urls[name], HTTP_IF_NONE_MATCH=etag)
+        assert repeated.status_code == 304
+        assert repeated['ETag'] == etag
+        assert not repeated.content
+        assert client.get(
+            urls[name], HTTP_IF_NONE_MATCH='*').status_code == 304
+        assert client.get(
+            urls[name], HTTP_IF_NONE_MATCH='"other"').status_code == 200
+        assert client.get(
+            urls[name], HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        ).status_code == 304
+
+    def test_missing_resources(self, client, catalogue):
+        review = catalogue['reviews'][0]
+        other = catalogue['titles'][1]
+        comment = review.comments.first()
+        for url in (
+            '/api/v1/titles/999999/',
+            '/api/v1/titles/999999/reviews/',
+            f'/api/v1/titles/{other.id}/reviews/{review.id}/',
+            f'/api/v1/titles/{other.id}/reviews/{review.id}/comments/',
+            f'/api/v1/titles/{review.title_id}/reviews/999999/comments/',
+            f'/api/v1/titles/{other.id}/reviews/{review.id}/comments/'
+            f'{comment.id}/',
+        ):
+            response = client.get(url, HTTP_IF_NONE_MATCH='*')
+            assert response.status_code == 404, (
+                f'{url}: для отсутствующего ресурса 404, а не 304'
+            )
+
+    def test_invalidation(self, client, admin_client, catalogue, urls):
+        from reviews.models import Review
+
+        etags = {name: client.get(url)['ETag'] for name, url in urls.items()}
+        admin_client.post(urls['reviews'], {'text': 'Отзыв', 'score': 1})
+        for name in ('titles', 'title', 'reviews', 'review'):
+            assert client.get(
+                urls[name], HTTP_IF_NONE_MATCH=etags[name]
+            ).status_code == 200, f'Новый отзыв меняет ETag {name}'
+        assert client.get(
+            urls['comments'], HTTP_IF_NONE_MATCH=etags['comments']
+        ).status_code == 304
+        admin_client.delete(urls['comment'])
+        assert client.get(
+            urls['comments'], HTTP_IF_NONE_MATCH=etags['comments']
+        ).status_code == 200
+
+        etag = client.get(urls['comments'])['ETag']
+        Review.objects.get(pk=catalogue['reviews'][0].pk).delete()
+        assert client.get(
+            urls['comments'], HTTP_IF_NONE_MATCH=etag).status_code == 404
+
+    def test_review_keeps_other_titles(self, client, catalogue, urls):
+        from reviews.models import Review
+
+        other = f'/api/v1/titles/{catalogue["titles"][1].id}/'
+        etags = {url: client.get(url)['ETag']
+                 for url in (urls['titles'], urls['title'], other)}
+        review = Review.objects.get(pk=catalogue['reviews'][0].pk)
+        review.text = 'Новый текст'
+        review.save()
+        for url, etag in etags.items():
+            assert client.get(
+                url, HTTP_IF_NONE_MATCH=etag).status_code == 304, (
+                f'{url}: текст отзыва не входит в представление произведения'
+            )
+        Review.objects.create(author=review.author, title=catalogue[
+            'titles'][2], text='Отзыв', score=3)
+        assert client.get(urls['titles'], HTTP_IF_NONE_MATCH=etags[
+            urls['titles']]).status_code == 200
+        for url in (urls['title'], other):
+            assert client.get(
+                url, HTTP_IF_NONE_MATCH=etags[url]).status_code == 304, (
+                f'{url}: отзыв на другое произведение не меняет его ETag'
+            )
+
+    def test_review_delete_bumps_comments(self, catalogue):
+        from reviews.models import Review
+        from reviews.versions import comments_resource, get_versions
+
+        review = Review.objects.get(pk=catalogue['reviews'][0].pk)
+        review.comments.all().delete()
+        resource = comments_resource(review.pk)
+        before = get_versions(resource)[0]
+        review.delete()
+        assert get_versions(resource)[0] != before, (
+            'Удаление отзыва меняет версию его комментариев'
+        )
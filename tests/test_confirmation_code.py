@@ -0,0 +1,73 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+
+@pytest.mark.django_db
+class TestConfirmationCode:
+    url = '/api/v1/auth/token/'
+
+    @pytest.fixture
+    def code(self, django_user_model):
+        from users.registration import register_user
+
+        register_user('newuser', 'newuser@yamdb.fake', 'secret-code')
+        return 'secret-code'
+
+    def get_token(self, client, code, username='newuser'):
+        return client.post(self.url, data={
+            'username': username, 'confirmation_code': code})
+
+    def test_code_is_stored_hashed(self, client, code):
+        from users.models import ConfirmationCode
+
+        assert code not in ConfirmationCode.objects.get().code_hash, (
+            'Код подтверждения не должен храниться в открытом виде'
+        )
+        assert self.get_token(client, 'wrong').status_code == 400
+        assert self.get_token(client, code).status_code == 201
+        assert self.get_token(client, code, 'unknown').status_code == 404
+
+    def test_code_is_single_use(self, client, code):
+        from users.models import ConfirmationCode
+
+        assert self.get_token(client, code).status_code == 201
+        assert not ConfirmationCode.objects.exists()
+        assert self.get_token(client, code).status_code == 400, (
+            'Код подтверждения нельзя использовать повторно'
+        )
+
+    def test_expired_and_exhausted_codes(self, client, code, settings):
+        from django.core.management import call_command
+        from users.models import ConfirmationCode
+
+        settings.CONFIRMATION_CODE_MAX_ATTEMPTS = 2
+        for _ in range(2):
+            self.get_token(client, 'wrong')
+        assert self.get_token(client, code).status_code == 400, (
+            'После исчерпания попыток верный код не должен приниматься'
+        )
+        ConfirmationCode.objects.update(
+            attempts=0, expires=timezone.now() - timedelta(seconds=1))
+        assert self.get_token(client, code).status_code == 400, (
+            'Просроченный код не должен приниматься'
+        )
+        call_command('purge_confirmation_codes')
+        assert not ConfirmationCode.objects.exists(), (
+            'Команда purge_confirmation_codes должна удалять просроченные коды'
+        )
+
+    def test_attempts_limited_before_database(
+            self, client, code, django_assert_num_queries):
+        from users.codes import token_attempts
+
+        for _ in range(token_attempts.limit):
+            self.get_token(client, 'wrong')
+        with django_assert_num_queries(0):
+            response = self.get_token(client, code)
+        assert response.status_code == 429, (
+            'Поток попыток на один username должен отсекаться без запросов '
+            'к базе данных'
+        )
+        assert 'Retry-After' in response
@@ -0,0 +1,124 @@
+import re
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+COMMENTS_SELECT = re.compile(r'FROM "reviews_comments"')
+
+
+@pytest.mark.django_db
+class TestCounters:
+
+    def reviews_url(self, review):
+        return f'/api/v1/titles/{review.title_id}/reviews/'
+
+    def comments_url(self, review):
+        return f'{self.reviews_url(review)}{review.id}/comments/'
+
+    def test_counts_in_responses(self, client, catalogue):
+        review = catalogue['reviews'][0]
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(self.reviews_url(review))
+        assert [row['comments_count'] for row in response.json()[
+            'results']] == [3, 3, 3]
+        assert not any(COMMENTS_SELECT.search(query['sql'])
+                       for query in context.captured_queries), (
+            'Количество комментариев должно читаться из столбца отзыва'
+        )
+        title = client.get(f'/api/v1/titles/{review.title_id}/').json()
+        assert title['reviews_count'] == 3
+        assert client.get(f'/api/v1/titles/{catalogue["titles"][1].id}/'
+                          ).json()['reviews_count'] == 0
+
+    def test_comment_create_and_delete(self, admin_client, catalogue):
+        review = catalogue['reviews'][0]
+        etag = admin_client.get(self.reviews_url(review))['ETag']
+        response = admin_client.post(self.comments_url(review), {'text': 'Да'})
+        assert response.status_code == 201
+        detail = admin_client.get(f'{self.reviews_url(review)}{review.id}/')
+        assert detail.json()['comments_count'] == 4
+        assert admin_client.get(
+            self.reviews_url(review), HTTP_IF_NONE_MATCH=etag
+        ).status_code == 200, (
+            'Новый комментарий меняет представление отзыва и его ETag'
+        )
+        admin_client.delete(
+            f'{self.comments_url(review)}{response.json()["id"]}/')
+        review.refresh_from_db()
+        assert review.comments_count == 3
+
+    def test_review_save_keeps_counter(self, catalogue):
+        from reviews.models import Comments, Review
+
+        review = Review.objects.get(pk=catalogue['reviews'][0].pk)
+        Comments.objects.create(
+            author=review.author, review=review, text='Да')
+        review.text = 'Новый текст'
+        review.save()
+        review.refresh_from_db()
+        assert review.comments_count == 4, (
+            'Сохранение отзыва не должно затирать счетчик комментариев'
+        )
+
+    def test_stale_title_keeps_reviews_count(self, catalogue):
+        from api.serializers import TitleSerializer
+        from reviews.models import Review, Title
+
+        title = Title.objects.get(pk=catalogue['titles'][1].pk)
+        Review.objects.create(author=catalogue['reviews'][0].author,
+                              title=title, text='Отзыв', score=4)
+        serializer = TitleSerializer(
+            title, data={'name': 'Новое название'}, partial=True)
+        assert serializer.is_valid(), serializer.errors
+        serializer.save()
+        data = TitleSerializer(Title.objects.get(pk=title.pk)).data
+        assert (data['reviews_count'], data['rating']) == (1, 4), (
+            'Изменение произведения не должно затирать количество отзывов'
+        )
+
+    def test_deferred_review_save(self, catalogue):
+        from reviews.models import Review
+
+        review = Review.objects.only('text').get(
+            pk=catalogue['reviews'][0].pk)
+        review.text = 'Новый текст'
+        with CaptureQueriesContext(connection) as context:
+            review.save()
+        first = context.captured_queries[0]['sql']
+        assert first.startswith('UPDATE "reviews_review" SET "text"'), (
+            'Отложенные поля не должны загружаться перед сохранением'
+        )
+        assert '"score"' not in first.split(' WHERE ')[0]
+        review = Review.objects.get(pk=review.pk)
+        assert (review.text, review.score) == ('Новый текст', 5)
+
+    def test_rebuild_counters(self, catalogue):
+        from reviews.models import Review, Title
+
+        review = catalogue['reviews'][0]
+        Review.objects.filter(pk=review.pk).update(comments_count=10)
+        Title.objects.filter(pk=review.title_id).update(rating_count=1)
+        out = StringIO()
+        call_command('rebuild_counters', '--dry-run', stdout=out)
+        assert 'Расхождений: 2' in out.getvalue()
+        assert Review.objects.get(pk=review.pk).comments_count == 10
+        call_command('rebuild_counters', stdout=StringIO())
+        assert Review.objects.get(pk=review.pk).comments_count == 3
+        assert Title.objects.get(pk=review.title_id).rating_count == 3
+        out = StringIO()
+        call_command('rebuild_counters', stdout=out)
+        assert 'Расхождений: 0' in out.getvalue()
+
+    def test_rebuild_changes_etag(self, client, catalogue):
+        from reviews.models import Review
+
+        review = catalogue['reviews'][0]
+        Review.objects.filter(pk=review.pk).update(comments_count=10)
+        etag = client.get(self.reviews_url(review))['ETag']
+        call_command('rebuild_counters', stdout=StringIO())
+        assert client.get(
+            self.reviews_url(review), HTTP_IF_NONE_MATCH=etag
+        ).status_code == 200, 'Пересчет счетчиков меняет ETag отзывов'
@@ -0,0 +1,93 @@
+import smtplib
+from datetime import timedelta
+
+import pytest
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.utils import timezone
+
+
+class FlakyBackend(EmailBackend):
+    """Почтовый бэкенд, который отклоняет первые failures писем."""
+    failures = 0
+
+    def send_messages(self, messages):
+        if FlakyBackend.failures:
+            FlakyBackend.failures -= 1
+            raise smtplib.SMTPServerDisconnected('Соединение разорвано')
+        return super().send_messages(messages)
+
+
+@pytest.fixture
+def flaky_backend(settings):
+    settings.EMAIL_BACKEND = 'tests.test_email_queue.FlakyBackend'
+    settings.EMAIL_RETRY_BACKOFF = 0.01
+    FlakyBackend.failures = 1
+    yield
+    FlakyBackend.failures = 0
+
+
+@pytest.mark.django_db
+class TestEmailQueue:
+    signup_url = '/api/v1/auth/signup/'
+
+    def test_signup_uses_outbox(self, client, settings):
+        from users.models import OutboxEmail
+
+        settings.EMAIL_QUEUE = 'outbox'
+        response = client.post(self.signup_url, data={
+            'username': 'newuser', 'email': 'newuser@yamdb.fake'})
+        assert response.status_code == 200
+        assert mail.outbox == [], (
+            'В режиме outbox регистрация не должна отправлять письмо сама'
+        )
+        assert OutboxEmail.objects.filter(
+            recipient='newuser@yamdb.fake', sent__isnull=True).exists(), (
+            'Письмо с кодом должно попадать в очередь OutboxEmail'
+        )
+        call_command('send_emails', '--once')
+        assert [message.to for message in mail.outbox] == [
+            ['newuser@yamdb.fake']], (
+            'Команда send_emails должна отправлять письма из очереди'
+        )
+        assert not OutboxEmail.objects.filter(sent__isnull=True).exists()
+
+    def test_outbox_retries_with_backoff(self, flaky_backend):
+        from django.core.mail import EmailMessage
+        from users.mail import OutboxDispatcher
+        from users.models import OutboxEmail
+
+        dispatcher = OutboxDispatcher()
+        dispatcher.enqueue(EmailMessage('Тема', 'Текст', '', ['a@yamdb.fake']))
+        assert dispatcher.process() == 1
+        entry = OutboxEmail.objects.get()
+        assert entry.sent is None and entry.attempts == 1, (
+            'Неудачная отправка должна оставлять письмо в очереди'
+        )
+        assert entry.next_attempt > timezone.now() - timedelta(seconds=1)
+        assert dispatcher.process() == 0, (
+            'Повтор должен ждать, пока не пройдет задержка'
+        )
+        OutboxEmail.objects.update(next_attempt=timezone.now())
+        assert dispatcher.process() == 1
+        assert dispatcher.stats()['sent'] == 1
+        assert len(mail.outbox) == 1
+
+    def test_thread_dispatcher_retries(self, flaky_backend):
+        from django.core.mail import EmailMessage
+        from users.mail import ThreadDispatcher
+
+        dispatcher = ThreadDispatcher()
+        for index in range(3):
+            dispatcher.enqueue(EmailMessage(
+                'Тема', 'Текст', '', [f'user{index}@yamdb.fake']))
+        assert dispatcher.join(timeout=5), (
+            'Фоновый поток должен отправить все письма из очереди'
+        )
+        stats = dispatcher.stats()
+        assert stats['sent'] == 3 and stats['depth'] == 0
+        assert stats['retried'] == 1, (
+            'Письмо, не принятое сервером, должно отправляться повторно'
+        )
+        assert len(mail.outbox) == 3
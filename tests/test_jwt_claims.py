@@ -0,0 +1,66 @@
+import pytest
+
+
+@pytest.mark.django_db
+class TestJWTClaims:
+    url = '/api/v1/cache/stats/'
+
+    def token_client(self, user):
+        from rest_framework.test import APIClient
+        from users.tokens import access_token_for
+
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {access_token_for(user)}')
+        return client
+
+    def test_permissions_checked_without_user_query(
+            self, admin, django_assert_num_queries):
+        client = self.token_client(admin)
+        with django_assert_num_queries(0):
+            response = client.get(self.url)
+        assert response.status_code == 200, (
+            'Права администратора должны проверяться по claims токена '
+            'без запроса пользователя из базы данных'
+        )
+
+    def test_role_change_revokes_claims(self, admin):
+        client = self.token_client(admin)
+        admin.role = 'user'
+        admin.save()
+        assert client.get(self.url).status_code == 403, (
+            'После смены роли claims старого токена не должны приниматься'
+        )
+        response = client.get('/api/v1/users/me/')
+        assert response.status_code == 200
+        assert response.json()['role'] == 'user'
+
+    def test_author_can_edit_own_review(self, catalogue):
+        review = catalogue['reviews'][0]
+        client = self.token_client(review.author)
+        response = client.patch(
+            f'/api/v1/titles/{review.title_id}/reviews/{review.id}/',
+            data={'text': 'Новый текст'})
+        assert response.status_code == 200, (
+            'Автор с токеном из claims должен изменять свой отзыв'
+        )
+
+    def test_rename_reads_user_once(self, admin):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from reviews.versions import get_versions
+
+        before = get_versions()[0]
+        admin.username = 'renamed'
+        with CaptureQueriesContext(connection) as context:
+            admin.save()
+        selects = [query['sql'] for query in context.captured_queries
+                   if query['sql'].startswith('SELECT')
+                   and 'users_user' in query['sql']]
+        assert len(selects) == 1, (
+            'Прежняя строка пользователя читается один раз для всех '
+            'обработчиков pre_save'
+        )
+        assert get_versions()[0] != before, (
+            'Имя автора выводится в отзывах: меняется версия epoch'
+        )
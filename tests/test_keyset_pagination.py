@@ -0,0 +1,94 @@
+import base64
+import datetime as dt
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+
+def cursor(text):
+    return base64.urlsafe_b64encode(text.encode()).decode()
+
+
+@pytest.fixture
+def reviews(django_user_model, catalogue):
+    """Семь отзывов на одно произведение, пять из них с одной датой."""
+    from reviews.models import Review
+
+    title = catalogue['titles'][1]
+    created = [
+        Review.objects.create(
+            author=django_user_model.objects.create_user(
+                username=f'keyset{i}', email=f'keyset{i}@yamdb.fake'),
+            title=title, text=f'Отзыв {i}', score=5)
+        for i in range(7)
+    ]
+    same = timezone.make_aware(dt.datetime(2021, 1, 1))
+    Review.objects.filter(pk__in=[review.pk for review in created[1:6]]
+                          ).update(pub_date=same)
+    Review.objects.filter(pk=created[0].pk).update(
+        pub_date=same - dt.timedelta(days=1))
+    Review.objects.filter(pk=created[6].pk).update(
+        pub_date=same + dt.timedelta(days=1))
+    return title, list(Review.objects.filter(title=title).order_by(
+        '-pub_date', '-id').values_list('id', flat=True))
+
+
+@pytest.mark.django_db
+class TestKeysetPagination:
+
+    def url(self, title):
+        return f'/api/v1/titles/{title.id}/reviews/'
+
+    def walk(self, client, url, params, link):
+        """Проходит по ссылкам link; отдает id отзывов каждой страницы."""
+        pages = []
+        while url:
+            response = client.get(url, params)
+            assert response.status_code == 200
+            data = response.json()
+            pages.append([row['id'] for row in data['results']])
+            url, params = data[link], None
+        return pages, data
+
+    def test_next_and_previous_links(self, client, reviews):
+        title, ordered = reviews
+        pages, last = self.walk(
+            client, self.url(title), {'cursor': '', 'limit': 2}, 'next')
+        assert pages == [ordered[:2], ordered[2:4], ordered[4:6],
+                         ordered[6:]], (
+            'Отзывы с одинаковой датой не должны теряться и повторяться '
+            'на границе страниц'
+        )
+        assert 'count' not in last
+        assert 'offset=' not in last['previous']
+        back, first = self.walk(client, last['previous'], None, 'previous')
+        assert back == [ordered[4:6], ordered[2:4], ordered[:2]]
+        assert first['previous'] is None
+        assert first['next'] is not None
+
+    def test_offset_without_cursor(self, client, reviews):
+        title, ordered = reviews
+        data = client.get(self.url(title), {'limit': 2, 'offset': 2}).json()
+        assert data['count'] == 7
+        assert [row['id'] for row in data['results']] == ordered[2:4]
+
+    @pytest.mark.parametrize('value', (
+        'не курсор',
+        cursor('0|2021-01-01T00:00:00'),
+        cursor('0|не дата|1'),
+        cursor('0|2021-01-01T00:00:00|id'),
+        '%%%',
+    ))
+    def test_invalid_cursor(self, client, reviews, value):
+        title, _ = reviews
+        response = client.get(self.url(title), {'cursor': value})
+        assert response.status_code == 404
+        assert response.json() == {'detail': 'Неверный курсор.'}
+
+    def test_benchmark_first_page(self, catalogue):
+        out = StringIO()
+        call_command('benchmark_pagination', '--page', '1', '--repeat', '1',
+                     stdout=out)
+        assert out.getvalue().count('страница      1') == 4
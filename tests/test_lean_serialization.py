@@ -0,0 +1,52 @@
+import pytest
+
+
+def both_modes(client, settings, url, params=None):
+    """Ответы на один запрос с быстрым выводом и через сериализаторы."""
+    from django.core.cache import caches
+
+    contents = []
+    for lean in (True, False):
+        settings.LEAN_LIST_SERIALIZATION = lean
+        # Анонимные списки кешируются: второй ответ не должен прийти
+        # из кеша первого.
+        caches['default'].clear()
+        response = client.get(url, params or {})
+        assert response.status_code == 200
+        contents.append(response.content)
+    return contents
+
+
+@pytest.mark.django_db
+class TestLeanSerialization:
+
+    @pytest.mark.parametrize('params', (
+        {'limit': 10},
+        {'ordering': '-rating', 'limit': 3, 'offset': 2},
+        {'genre': 'genre-1', 'year': 2004},
+        {'search': 'Произведение'},
+    ), ids=str)
+    def test_titles_identical(self, client, catalogue, settings, params):
+        from reviews.models import Title
+
+        Title.objects.create(name='Без категории и жанров', year=1999)
+        lean, full = both_modes(client, settings, '/api/v1/titles/', params)
+        assert lean == full, (
+            'Быстрый вывод произведений должен совпадать с TitleSerializer'
+        )
+
+    @pytest.mark.parametrize('params', (
+        {'limit': 2},
+        {'limit': 2, 'cursor': ''},
+    ), ids=str)
+    def test_reviews_and_comments_identical(
+            self, client, catalogue, settings, params):
+        review = catalogue['reviews'][0]
+        for url in (
+            f'/api/v1/titles/{review.title_id}/reviews/',
+            f'/api/v1/titles/{review.title_id}/reviews/{review.id}/comments/',
+        ):
+            lean, full = both_modes(client, settings, url, params)
+            assert lean == full, (
+                f'Быстрый вывод `{url}` должен совпадать с сериализатором'
+            )
@@ -0,0 +1,271 @@
+import os
+import sqlite3
+import subprocess
+import sys
+from contextlib import closing
+from io import StringIO
+from os.path import abspath, dirname, join
+
+import pytest
+from django.core.management import CommandError, call_command
+
+PROJECT_DIR = join(dirname(dirname(abspath(__file__))), 'api_yamdb')
+CSV_FILES = {
+    'category.csv': (
+        'id,name,slug\n'
+        '1,Фильм,movie\n'
+        '2,Книга,book\n'
+        # slug уже занят категорией 1.
+        '3,Кино,movie\n'
+    ),
+    'genre.csv': (
+        'id,name,slug\n'
+        '1,Драма,drama\n'
+        '2,Комедия,comedy\n'
+    ),
+    'titles.csv': (
+        'id,name,year,category_id\n'
+        '1,Первое,2000,1\n'
+        '2,Второе,2001,2\n'
+        '3,Третье,2002,3\n'
+        '4,Без категории\n'
+    ),
+    'genre_title.csv': (
+        'id,title_id,genre_id\n'
+        '1,1,1\n'
+        '2,1,2\n'
+        '3,2,1\n'
+    ),
+    'users.csv': (
+        'id,username,email,role,bio,first_name,last_name\n'
+        '1,reader,reader@yamdb.fake,user,,,\n'
+        '2,critic,critic@yamdb.fake,user,,,\n'
+    ),
+    'review.csv': (
+        'id,title_id,text,author_id,score,pub_date\n'
+        '1,1,Хорошо,1,8,2020-01-01T00:00:00Z\n'
+        '2,1,Плохо,2,2,2020-01-02T00:00:00Z\n'
+        # Второй отзыв автора 1 на произведение 1.
+        '3,1,Еще раз,1,10,2020-01-03T00:00:00Z\n'
+        'x,2,Без id,1,5,2020-01-04T00:00:00Z\n'
+    ),
+    'comments.csv': (
+        'id,review_id,text,author_id,pub_date\n'
+        '1,1,Согласен,2,2020-01-05T00:00:00Z\n'
+        '2,3,К пропущенному отзыву,2,2020-01-06T00:00:00Z\n'
+    ),
+}
+
+
+@pytest.fixture
+def csv_dir(tmp_path):
+    for name, content in CSV_FILES.items():
+        (tmp_path / name).write_text(content, encoding='utf-8')
+    return tmp_path
+
+
+def load(csv_dir, *args):
+    out, err = StringIO(), StringIO()
+    call_command('load_csv', '--data-dir', str(csv_dir), *args,
+                 stdout=out, stderr=err)
+    return out.getvalue(), err.getvalue()
+
+
+@pytest.mark.django_db
+class TestLoadCsv:
+
+    def test_load_and_row_errors(self, csv_dir):
+        from reviews.models import Category, Comments, Review, Title
+
+        out, err = load(csv_dir)
+        assert ('Категории - OK: прочитано 3, добавлено 2, обновлено 0, '
+                'пропущено 1') in out, (
+            'Строка, пропущенная базой из-за конфликта, не считается '
+            'добавленной'
+        )
+        assert 'category.csv:4: id=3 не записан' in err
+        assert 'titles.csv:4: нет связанных объектов: category_id=3' in err, (
+            'Пропущенная категория не должна считаться загруженной'
+        )
+        assert 'titles.csv:5: ожидалось колонок: 4' in err
+        assert 'review.csv:4: id=3 не записан' in err
+        assert 'review.csv:5: некорректный id' in err
+        assert 'comments.csv:3: нет связанных объектов: review_id=3' in err
+        assert sorted(Category.objects.values_list('pk', flat=True)) == [1, 2]
+        assert sorted(Review.objects.values_list('pk', flat=True)) == [1, 2]
+        assert Comments.objects.count() == 1
+        title = Title.objects.get(pk=1)
+        assert (title.rating_count, title.rating) == (2, 5)
+        assert Review.objects.get(pk=1).comments_count == 1
+
+    def test_ignore_existing(self, csv_dir):
+        from reviews.models import Category
+
+        load(csv_dir)
+        (csv_dir / 'category.csv').write_text(
+            'id,name,slug\n1,Другое имя,movie\n4,Музыка,music\n',
+            encoding='utf-8')
+        out, _ = load(csv_dir)
+        assert ('Категории - OK: прочитано 2, добавлено 1, обновлено 0, '
+                'пропущено 0') in out
+        assert Category.objects.get(pk=1).name == 'Фильм'
+        assert 'Жанры - OK: прочитано 2, добавлено 0' in out
+
+    def test_update_existing(self, csv_dir):
+        from reviews.models import Category
+
+        load(csv_dir)
+        (csv_dir / 'category.csv').write_text(
+            'id,name,slug\n1,Другое имя,movie\n2,Книги,book\n',
+            encoding='utf-8')
+        out, _ = load(csv_dir, '--on-conflict', 'update')
+        assert ('Категории - OK: прочитано 2, добавлено 0, обновлено 2, '
+                'пропущено 0') in out
+        assert Category.objects.get(pk=1).name == 'Другое имя'
+
+    def test_conflict_error(self, csv_dir):
+        from reviews.models import Category, Title
+        from reviews.versions import get_versions
+
+        load(csv_dir)
+        (csv_dir / 'category.csv').write_text(
+            'id,name,slug\n5,Музыка,music\n', encoding='utf-8')
+        Title.objects.filter(pk=1).update(rating_count=0, rating=None)
+        before = get_versions()[0]
+        with pytest.raises(CommandError, match='genre.csv'):
+            load(csv_dir, '--on-conflict', 'error')
+        assert Category.objects.filter(pk=5).exists()
+        assert get_versions()[0] != before, (
+            'Прерванная загрузка тоже сбрасывает версии и кеши'
+        )
+        assert Title.objects.get(pk=1).rating_count == 2, (
+            'Прерванная загрузка тоже пересчитывает рейтинги'
+        )
+
+    def test_dry_run(self, csv_dir):
+        from reviews.models import Category, Title
+
+        out, err = load(csv_dir, '--dry-run')
+        assert Category.objects.count() == Title.objects.count() == 0, (
+            '--dry-run ничего не записывает'
+        )
+        assert 'Произведения - OK: прочитано 4, добавлено 0' in out
+        assert 'titles.csv:5: ожидалось колонок: 4' in err
+        assert 'review.csv:5: некорректный id' in err
+
+
+# Схема создается по моделям, как при --nomigrations в pytest.ini.
+CREATE_SCHEMA = '''
+import django
+from django.conf import settings
+from django.core.management import call_command
+
+django.setup()
+
+
+class DisableMigrations(dict):
+    def __contains__(self, app):
+        return True
+
+    def __getitem__(self, app):
+        return None
+
+
+settings.MIGRATION_MODULES = DisableMigrations()
+call_command('migrate', run_syncdb=True, verbosity=0)
+'''
+
+TABLES = {
+    'reviews_category': 'id, slug',
+    'reviews_genre': 'id, slug',
+    'reviews_title': 'id, category_id, rating_sum, rating_count',
+    'reviews_genretitle': 'title_id, genre_id',
+    'users_user': 'id, username',
+    'reviews_review': 'id, title_id, author_id, score, comments_count',
+    'reviews_comments': 'id, review_id, author_id',
+}
+
+
+def write_catalogue(path):
+    """Файлы без конфликтов: при параллельной загрузке порядок строк
+    между процессами не определен."""
+    files = {
+        'category.csv': ['id,name,slug'] + [
+            f'{i},Категория {i},category-{i}' for i in range(1, 4)],
+        'genre.csv': ['id,name,slug'] + [
+            f'{i},Жанр {i},genre-{i}' for i in range(1, 4)],
+        'titles.csv': ['id,name,year,category_id'] + [
+            f'{i},Произведение {i},{1990 + i},{i % 3 + 1}'
+            for i in range(1, 31)],
+        'genre_title.csv': ['id,title_id,genre_id'] + [
+            f'{i},{(i - 1) // 2 + 1},{i % 3 + 1}' for i in range(1, 61)],
+        'users.csv': ['id,username,email,role,bio,first_name,last_name'] + [
+            f'{i},user{i},user{i}@yamdb.fake,user,,,' for i in range(1, 11)],
+        'review.csv': ['id,title_id,text,author_id,score,pub_date'] + [
+            f'{i},{(i - 1) // 10 + 1},Отзыв,{(i - 1) % 10 + 1},{i % 10 + 1},'
+            f'2020-01-01T00:00:00Z' for i in range(1, 101)],
+        'comments.csv': ['id,review_id,text,author_id,pub_date'] + [
+            f'{i},{i % 100 + 1},Комментарий,{i % 10 + 1},2020-01-01T00:00:00Z'
+            for i in range(1, 201)],
+    }
+    for name, lines in files.items():
+        (path / name).write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+
+class TestTaskRanges:
+
+    def test_ranges_cover_file(self, tmp_path):
+        from reviews.importer import read_csv, task_ranges
+
+        path = tmp_path / 'review.csv'
+        path.write_text(
+            'id,text\n1,"Две\nстроки"\n2,Отзыв\n3,"Ещё, ""да"""\n'
+            '4,Четыре\n5,Пять\n', encoding='utf-8')
+        ranges = task_ranges(path, 2)
+        assert [(line, limit) for _, line, limit in ranges] == [
+            (2, 2), (4, 2), (6, 1)]
+        assert ranges[0][0] == len(b'id,text\n')
+        parts = [row for task in ranges for row in read_csv(path, *task)]
+        assert parts == list(read_csv(path)), (
+            'Диапазоны должны давать те же записи и номера, что и чтение '
+            'файла целиком'
+        )
+        assert parts[:3] == [(2, ['1', 'Две\nстроки']), (3, ['2', 'Отзыв']),
+                             (4, ['3', 'Ещё, "да"'])]
+
+
+class TestParallelLoad:
+
+    def load(self, tmp_path, csv_dir, workers):
+        database = tmp_path / f'workers-{workers}.sqlite3'
+        env = {**os.environ, 'DB_ENGINE': 'django.db.backends.sqlite3',
+               'DB_NAME': str(database),
+               'DJANGO_SETTINGS_MODULE': 'api_yamdb.settings'}
+        subprocess.run([sys.executable, '-c', CREATE_SCHEMA], env=env,
+                       cwd=PROJECT_DIR, check=True)
+        result = subprocess.run(
+            [sys.executable, 'manage.py', 'load_csv', '--data-dir',
+             str(csv_dir), '--workers', str(workers), '--batch-size', '5',
+             '--rows-per-task', '7'],
+            env=env, cwd=PROJECT_DIR, check=True, stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE, universal_newlines=True)
+        assert not result.stderr, result.stderr
+        with closing(sqlite3.connect(str(database))) as db:
+            return {
+                table: sorted(db.execute(f'SELECT {columns} FROM {table}'))
+                for table, columns in TABLES.items()
+            }
+
+    def test_same_result_as_one_worker(self, tmp_path):
+        csv_dir = tmp_path / 'data'
+        csv_dir.mkdir()
+        write_catalogue(csv_dir)
+        single = self.load(tmp_path, csv_dir, workers=1)
+        assert {table: len(rows) for table, rows in single.items()} == {
+            'reviews_category': 3, 'reviews_genre': 3, 'reviews_title': 30,
+            'reviews_genretitle': 60, 'users_user': 10,
+            'reviews_review': 100, 'reviews_comments': 200,
+        }
+        assert self.load(tmp_path, csv_dir, workers=4) == single, (
+            'Параллельная загрузка должна давать те же строки и связи'
+        )
@@ -0,0 +1,15 @@
+from io import StringIO
+
+
+class TestLoadtestReport:
+
+    def test_percentiles(self):
+        from api.management.commands.loadtest import Command, percentile
+
+        ordered = list(range(1, 101))
+        assert [percentile(ordered, p) for p in (50, 95, 99)] == [50, 95, 99]
+        assert percentile([7.0], 99) == 7.0
+        command = Command(stdout=StringIO())
+        command.report([3.0, 1.0, 2.0], [], 1.0)
+        assert 'p50 2.0, p95 3.0, p99 3.0, максимум 3.0' in (
+            command.stdout.getvalue())
@@ -0,0 +1,94 @@
+import re
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def recorded(route, name):
+    from api.metrics import route_metrics
+
+    return route_metrics.histograms()[route][name]
+
+
+class TestHistogram:
+
+    def test_quantiles_within_precision(self):
+        from api.metrics import Histogram
+
+        histogram = Histogram()
+        for value in range(1, 100001):
+            histogram.record(value)
+        for quantile in (0.5, 0.9, 0.99):
+            exact = quantile * 100000
+            assert exact <= histogram.quantile(quantile) <= exact * 65 / 64, (
+                f'Квантиль {quantile} должен быть точен до 1/64'
+            )
+        assert histogram.quantile(1) == 100000
+        assert histogram.total == sum(range(1, 100001))
+
+    def test_small_values_exact(self):
+        from api.metrics import Histogram
+
+        histogram = Histogram()
+        for value in (0, 3, 3, 7):
+            histogram.record(value)
+        assert [histogram.quantile(q) for q in (0.25, 0.5, 1)] == [0, 3, 7]
+
+
+@pytest.mark.django_db
+class TestRequestMetrics:
+
+    def test_route_sample(self, client, catalogue):
+        from users.tokens import access_token_for
+
+        user = catalogue['reviews'][0].author
+        url = f'/api/v1/titles/{catalogue["titles"][0].id}/reviews/'
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(
+                url, HTTP_AUTHORIZATION=f'Bearer {access_token_for(user)}')
+        assert response.status_code == 200
+        assert recorded('viewsets-list', 'total').count == 1
+        assert recorded('viewsets-list', 'queries').total == len(
+            context.captured_queries)
+        assert recorded('viewsets-list', 'bytes').total == len(
+            response.content)
+        phases = sum(recorded('viewsets-list', phase).total for phase in (
+            'auth', 'db', 'serialize', 'render', 'other'))
+        assert abs(phases - recorded('viewsets-list', 'total').total) <= 5, (
+            'Фазы не пересекаются и в сумме дают время запроса'
+        )
+        for phase in ('auth', 'db', 'render'):
+            assert recorded('viewsets-list', phase).total > 0, (
+                f'Фаза {phase} должна замеряться'
+            )
+
+    def test_streaming_and_unresolved(self, client, catalogue, settings):
+        from api.metrics import route_metrics
+
+        settings.API_STREAMING_MIN_LIMIT = 2
+        response = client.get('/api/v1/titles/', {'limit': 10})
+        assert response.streaming
+        assert 'titles-list' not in route_metrics.histograms(), (
+            'Потоковый ответ учитывается, когда тело отдано целиком'
+        )
+        content = b''.join(response.streaming_content)
+        assert recorded('titles-list', 'bytes').total == len(content)
+        assert recorded('titles-list', 'queries').total > 0
+        client.get('/api/v1/unknown/')
+        assert recorded('unresolved', 'total').count == 1
+
+    def test_metrics_endpoint(self, client, admin_client, catalogue):
+        client.get('/api/v1/genres/')
+        assert client.get('/metrics').status_code == 401
+        response = admin_client.get('/metrics')
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain')
+        text = response.content.decode()
+        assert re.search(
+            r'^api_request_duration_seconds\{route="genres-list",'
+            r'phase="db",quantile="0.99"\} \S+$', text, re.M)
+        assert 'api_request_queries_count{route="genres-list"} 1' in text
+        assert re.search(
+            r'^api_response_bytes_sum\{route="genres-list"\} \d+$',
+            text, re.M)
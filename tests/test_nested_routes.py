@@ -0,0 +1,67 @@
+import re
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+REVIEW_SELECT = re.compile(r'^SELECT .* FROM "reviews_review"')
+
+
+def review_selects(context):
+    return [query['sql'] for query in context.captured_queries
+            if REVIEW_SELECT.match(query['sql'])]
+
+
+@pytest.mark.django_db
+class TestNestedRoutes:
+
+    def comments_url(self, title_id, review_id):
+        return f'/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+
+    def test_review_from_other_title(self, admin_client, catalogue):
+        review = catalogue['reviews'][0]
+        comment = review.comments.first()
+        url = self.comments_url(catalogue['titles'][1].id, review.id)
+        assert admin_client.get(url).status_code == 404, (
+            'Комментарии отзыва под чужим произведением должны давать 404'
+        )
+        assert admin_client.get(f'{url}{comment.id}/').status_code == 404
+        assert admin_client.post(url, {'text': 'Да'}).status_code == 404
+        assert review.comments.count() == 3
+
+    def test_missing_parent_and_empty_list(self, client, catalogue):
+        review = catalogue['reviews'][0]
+        assert client.get(
+            self.comments_url(review.title_id, 0)).status_code == 404
+        assert client.get('/api/v1/titles/0/reviews/').status_code == 404
+        response = client.get(
+            f'/api/v1/titles/{catalogue["titles"][1].id}/reviews/')
+        assert response.status_code == 200
+        assert response.json()['results'] == [], (
+            'У существующего произведения без отзывов список пустой, не 404'
+        )
+
+    def test_list_without_parent_query(self, client, catalogue):
+        review = catalogue['reviews'][0]
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(
+                self.comments_url(review.title_id, review.id))
+        assert response.status_code == 200
+        assert len(response.json()['results']) == 3
+        assert review_selects(context) == [], (
+            'Список комментариев фильтруется по цепочке из URL без '
+            'отдельного чтения отзыва'
+        )
+
+    def test_create_reads_parent_once(self, admin_client, catalogue):
+        review = catalogue['reviews'][0]
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post(
+                self.comments_url(review.title_id, review.id), {'text': 'Да'})
+        assert response.status_code == 201
+        assert response.json()['review'] == review.id
+        selects = review_selects(context)
+        assert len(selects) == 1 and '"title_id"' in selects[0], (
+            'Отзыв и его произведение должны проверяться одним запросом:\n'
+            + '\n'.join(selects)
+        )
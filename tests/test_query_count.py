@@ -0,0 +1,60 @@
+import re
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+def list_routes():
+    from api.urls import router_v1
+
+    return [
+        (prefix, basename) for prefix, viewset, basename in router_v1.registry
+    ]
+
+
+def count_queries(client, url, **params):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url, params)
+    assert response.status_code == 200, (
+        f'Запрос `{url}` вернул код {response.status_code}'
+    )
+    return len(context.captured_queries)
+
+
+@pytest.mark.django_db
+class TestQueryCount:
+
+    @pytest.mark.parametrize('prefix,basename', list_routes())
+    def test_list_query_count_does_not_depend_on_page_size(
+            self, admin_client, catalogue, prefix, basename):
+        kwargs = {}
+        if 'title_id' in re.findall(r'\?P<(\w+)>', prefix):
+            kwargs['title_id'] = catalogue['titles'][0].id
+        if 'review_id' in prefix:
+            kwargs['review_id'] = catalogue['reviews'][0].id
+        url = reverse(f'{basename}-list', kwargs=kwargs)
+
+        one = count_queries(admin_client, url, limit=1)
+        many = count_queries(admin_client, url, limit=100)
+        assert one == many, (
+            f'Список `{url}`: {one} запросов к БД на одну запись и {many} '
+            'на страницу целиком. Похоже на проблему N+1 - проверьте '
+            'select_related/prefetch_related у queryset.'
+        )
+
+    def test_title_detail_query_count_does_not_depend_on_genres(
+            self, admin_client, catalogue):
+        one_genre, three_genres = (
+            catalogue['titles'][0], catalogue['titles'][2])
+        assert one_genre.genre.count() != three_genres.genre.count()
+
+        one = count_queries(
+            admin_client, reverse('titles-detail', args=(one_genre.id,)))
+        many = count_queries(
+            admin_client, reverse('titles-detail', args=(three_genres.id,)))
+        assert one == many, (
+            'Количество запросов к БД для произведения не должно зависеть '
+            'от количества его жанров.'
+        )
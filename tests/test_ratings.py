@@ -0,0 +1,97 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+
+def stored(title):
+    from reviews.models import Title
+
+    title = Title.objects.get(pk=title.pk)
+    return title.rating_sum, title.rating_count, title.rating
+
+
+@pytest.mark.django_db
+class TestStoredRating:
+
+    def test_create_and_score_change(self, catalogue):
+        from reviews.models import Review
+
+        title = catalogue['titles'][0]
+        assert stored(title) == (15, 3, 5)
+        review = Review.objects.create(
+            author=catalogue['reviews'][0].author,
+            title=catalogue['titles'][1], text='Отзыв', score=8)
+        assert stored(catalogue['titles'][1]) == (8, 1, 8), (
+            'Новый отзыв должен учитываться в рейтинге произведения'
+        )
+        review = Review.objects.get(pk=catalogue['reviews'][0].pk)
+        review.score = 9
+        review.save()
+        assert stored(title) == (19, 3, 6), (
+            'Изменение оценки сдвигает сумму без изменения количества'
+        )
+
+    def test_move_to_another_title(self, catalogue):
+        from reviews.models import Review
+
+        first, second = catalogue['titles'][:2]
+        review = Review.objects.get(pk=catalogue['reviews'][0].pk)
+        review.title = second
+        review.score = 7
+        review.save()
+        assert stored(first) == (10, 2, 5)
+        assert stored(second) == (7, 1, 7)
+
+    def test_partially_loaded_review(self, catalogue):
+        from reviews.models import Review
+
+        review = Review.objects.only('text').get(
+            pk=catalogue['reviews'][0].pk)
+        review.text = 'Новый текст'
+        review.save()
+        assert stored(catalogue['titles'][0]) == (15, 3, 5)
+        review = Review.objects.only('text').get(pk=review.pk)
+        review.score = 2
+        review.save()
+        assert stored(catalogue['titles'][0]) == (12, 3, 4), (
+            'Без прежней оценки рейтинг пересчитывается по отзывам'
+        )
+
+    def test_stale_title_save(self, catalogue):
+        from reviews.models import Review, Title
+
+        title = catalogue['titles'][1]
+        stale = Title.objects.get(pk=title.pk)
+        Review.objects.create(author=catalogue['reviews'][0].author,
+                              title=title, text='Отзыв', score=9)
+        stale.name = 'Новое название'
+        stale.save()
+        assert stored(title) == (9, 1, 9), (
+            'Сохранение произведения не должно затирать рейтинг'
+        )
+        assert Title.objects.get(pk=title.pk).name == 'Новое название'
+
+    def test_delete(self, catalogue):
+        title = catalogue['titles'][0]
+        for review in catalogue['reviews']:
+            review.delete()
+        assert stored(title) == (0, 0, None), (
+            'У произведения без отзывов нет рейтинга'
+        )
+
+    def test_rebuild_ratings(self, catalogue):
+        from reviews.models import Title
+
+        title = catalogue['titles'][0]
+        Title.objects.filter(pk=title.pk).update(
+            rating_sum=1, rating_count=7, rating=0)
+        out = StringIO()
+        call_command('rebuild_ratings', '--dry-run', stdout=out)
+        assert 'Расхождений: 1' in out.getvalue()
+        assert stored(title) == (1, 7, 0)
+        call_command('rebuild_ratings', stdout=StringIO())
+        assert stored(title) == (15, 3, 5)
+        out = StringIO()
+        call_command('rebuild_ratings', stdout=out)
+        assert 'Расхождений: 0' in out.getvalue()
@@ -0,0 +1,93 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import transaction
+
+EMPTY_CSV = {
+    'titles.csv': 'id,name,year,category_id\n',
+    'genre_title.csv': 'id,title_id,genre_id\n',
+    'users.csv': 'id,username,email,role,bio,first_name,last_name\n',
+    'review.csv': 'id,title_id,text,author_id,score,pub_date\n',
+    'comments.csv': 'id,review_id,text,author_id,pub_date\n',
+}
+
+
+def slugs(response):
+    return [row['slug'] for row in response.json()['results']]
+
+
+@pytest.mark.django_db
+class TestResponseCache:
+
+    def test_hit_and_miss(self, client, admin_client, catalogue):
+        first = client.get('/api/v1/categories/')
+        assert first['X-Cache'] == 'MISS'
+        second = client.get('/api/v1/categories/')
+        assert second['X-Cache'] == 'HIT'
+        assert second.json() == first.json()
+        assert client.get(
+            '/api/v1/categories/', {'limit': 1})['X-Cache'] == 'MISS', (
+            'Строка запроса входит в ключ кеша'
+        )
+        assert not admin_client.get('/api/v1/categories/').has_header(
+            'X-Cache'), 'Авторизованные запросы идут мимо кеша'
+        stats = admin_client.get('/api/v1/cache/stats/').json()
+        assert (stats['hits'], stats['misses']) == (1, 2)
+        assert client.get('/api/v1/cache/stats/').status_code == 401
+
+    def test_import_invalidates(self, client, catalogue, tmp_path):
+        client.get('/api/v1/categories/')
+        (tmp_path / 'category.csv').write_text(
+            'id,name,slug\n100,Музыка,aaa-music\n', encoding='utf-8')
+        (tmp_path / 'genre.csv').write_text(
+            'id,name,slug\n100,Джаз,aaa-jazz\n', encoding='utf-8')
+        for name, content in EMPTY_CSV.items():
+            (tmp_path / name).write_text(content, encoding='utf-8')
+        call_command('load_csv', '--data-dir', str(tmp_path),
+                     stdout=StringIO())
+        response = client.get('/api/v1/categories/')
+        assert response['X-Cache'] == 'MISS'
+        assert 'aaa-music' in slugs(response), (
+            'После загрузки CSV справочники отдаются без старого кеша'
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+class TestInvalidationOnCommit:
+
+    def test_write_invalidates_after_commit(self, client, admin_client,
+                                            catalogue):
+        from reviews.models import Genre
+
+        client.get('/api/v1/genres/')
+        before = admin_client.get('/api/v1/cache/stats/').json()
+        with transaction.atomic():
+            Genre.objects.create(name='Джаз', slug='aaa-jazz')
+            inside = client.get('/api/v1/genres/')
+            assert inside['X-Cache'] == 'HIT', (
+                'До фиксации транзакции поколение не меняется'
+            )
+        response = client.get('/api/v1/genres/')
+        assert response['X-Cache'] == 'MISS'
+        assert 'aaa-jazz' in slugs(response)
+        stats = admin_client.get('/api/v1/cache/stats/').json()
+        assert stats['invalidations'] - before['invalidations'] == 2, (
+            'Жанр сбрасывает группы genres и titles'
+        )
+
+    def test_rollback_keeps_cache(self, client, catalogue):
+        from reviews.models import Category
+
+        client.get('/api/v1/categories/')
+        with transaction.atomic():
+            Category.objects.create(name='Музыка', slug='aaa-music')
+            transaction.set_rollback(True)
+        assert client.get('/api/v1/categories/')['X-Cache'] == 'HIT'
+
+    def test_api_write(self, client, admin_client, catalogue):
+        client.get('/api/v1/categories/')
+        response = admin_client.post(
+            '/api/v1/categories/', {'name': 'Музыка', 'slug': 'aaa-music'})
+        assert response.status_code == 201
+        assert 'aaa-music' in slugs(client.get('/api/v1/categories/'))
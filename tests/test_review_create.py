@@ -0,0 +1,100 @@
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+TITLE_SELECT = re.compile(r'^SELECT .* FROM "reviews_title"')
+
+
+@pytest.fixture(autouse=True)
+def no_write_limit(settings):
+    settings.REST_FRAMEWORK = {
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': {'user_write': None},
+    }
+
+
+def author_client(user):
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+class TestReviewCreate:
+    review = {'text': 'Отзыв', 'score': 7}
+
+    @pytest.mark.django_db
+    def test_single_title_query(self, catalogue, admin):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        url = f'/api/v1/titles/{catalogue["titles"][1].id}/reviews/'
+        with CaptureQueriesContext(connection) as context:
+            response = author_client(admin).post(url, self.review)
+        assert response.status_code == 201
+        selects = [query['sql'] for query in context.captured_queries
+                   if TITLE_SELECT.match(query['sql'])]
+        assert len(selects) == 1, (
+            'Произведение должно читаться один раз на запрос:\n'
+            + '\n'.join(selects)
+        )
+
+    @pytest.mark.django_db
+    def test_duplicate_is_bad_request(self, catalogue):
+        review = catalogue['reviews'][0]
+        response = author_client(review.author).post(
+            f'/api/v1/titles/{review.title_id}/reviews/', self.review)
+        assert response.status_code == 400
+        assert response.json() == {
+            'non_field_errors': ['Можно оставлять только один отзыв!']}
+        assert author_client(review.author).post(
+            '/api/v1/titles/0/reviews/', self.review).status_code == 404
+
+    @pytest.mark.django_db(transaction=True)
+    def test_parallel_reviews(self, django_user_model):
+        from api.views import ReviewsViewSet
+        from django.db import OperationalError, connection
+        from rest_framework.test import APIRequestFactory, force_authenticate
+        from reviews.models import Review, Title
+
+        title = Title.objects.create(name='Произведение', year=2000)
+        author = django_user_model.objects.create_user(
+            username='author', email='author@yamdb.fake')
+        view = ReviewsViewSet.as_view({'post': 'create'})
+
+        def post(_):
+            # Тестовый клиент Django 2.2 ловит исключения запросов через
+            # общий сигнал и в потоках отдает их чужим запросам, поэтому
+            # представление вызывается напрямую.
+            request = APIRequestFactory().post(
+                f'/api/v1/titles/{title.id}/reviews/', self.review)
+            force_authenticate(request, user=author)
+            try:
+                while True:
+                    try:
+                        return view(request, title_id=title.id).status_code
+                    except OperationalError as error:
+                        # Общий кеш SQLite в памяти не ждет блокировку
+                        # таблицы, как файловая база или PostgreSQL, а
+                        # сразу возвращает ошибку; транзакция запроса
+                        # откатывается, и его можно повторить.
+                        if 'locked' not in str(error):
+                            raise
+                        time.sleep(0.01)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            statuses = list(executor.map(post, range(16)))
+        assert sorted(statuses) == [201] + [400] * 15, (
+            'Из параллельных отзывов одного автора создается один, '
+            f'остальные получают 400, а не 500: {statuses}'
+        )
+        title.refresh_from_db()
+        assert Review.objects.filter(title=title).count() == 1
+        assert (title.rating_count, title.rating) == (1, 7), (
+            'Отклоненные отзывы не должны менять рейтинг произведения'
+        )
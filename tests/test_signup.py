@@ -0,0 +1,125 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def sync_email(settings):
+    settings.EMAIL_QUEUE = 'sync'
+    settings.REST_FRAMEWORK = {
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': {'signup': None},
+    }
+
+
+def data_queries(client, url, data):
+    """Запросы к данным без точек сохранения транзакции теста."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as context:
+        response = client.post(url, data=data)
+    queries = [
+        query['sql'] for query in context.captured_queries
+        if 'SAVEPOINT' not in query['sql']
+    ]
+    return response, queries
+
+
+class TestSignup:
+    url = '/api/v1/auth/signup/'
+    data = {'username': 'newuser', 'email': 'newuser@yamdb.fake'}
+
+    @pytest.mark.django_db
+    def test_signup_without_lookups(self, client, django_user_model):
+        from users.models import ConfirmationCode
+
+        response, queries = data_queries(client, self.url, self.data)
+        assert response.status_code == 200
+        assert len(queries) == 2, (
+            'Регистрация должна выполняться вставкой пользователя и кода '
+            'без предварительных запросов к базе данных'
+        )
+        user = django_user_model.objects.get(username='newuser')
+        user.bio = 'Биография'
+        user.save()
+        code_hash = ConfirmationCode.objects.get(username='newuser').code_hash
+        response, queries = data_queries(client, self.url, self.data)
+        assert len(queries) == 2
+        assert response.status_code == 200, (
+            'Повторная регистрация той же пары username и email '
+            'должна возвращать код 200'
+        )
+        assert ConfirmationCode.objects.get(
+            username='newuser').code_hash != code_hash, (
+            'Повторная регистрация должна выдавать новый код подтверждения'
+        )
+        user.refresh_from_db()
+        assert user.bio == 'Биография', (
+            'Повторная регистрация не должна менять данные пользователя'
+        )
+
+    @pytest.mark.django_db
+    def test_signup_conflicts(self, client, django_user_model):
+        django_user_model.objects.create_user(**self.data)
+        response = client.post(self.url, data={
+            'username': 'newuser', 'email': 'other@yamdb.fake'})
+        assert response.status_code == 400 and 'username' in response.json()
+        response = client.post(self.url, data={
+            'username': 'other', 'email': 'newuser@yamdb.fake'})
+        assert response.status_code == 400 and 'email' in response.json(), (
+            'Занятый email должен возвращать ошибку валидации по полю email'
+        )
+        assert django_user_model.objects.count() == 1
+
+    @pytest.mark.django_db
+    def test_unique_index_race(self, client, django_user_model,
+                               monkeypatch):
+        from django.db import IntegrityError
+        from users import registration
+
+        upsert = registration.upsert
+
+        def parallel_insert(obj, conflict, update=()):
+            # Как PostgreSQL, когда ту же пару вставил параллельный запрос:
+            # срабатывает индекс username, а не (username, email).
+            if conflict == ('username', 'email'):
+                raise IntegrityError('duplicate key value violates unique '
+                                     'constraint "users_user_username_key"')
+            return upsert(obj, conflict, update)
+
+        django_user_model.objects.create_user(**self.data)
+        monkeypatch.setattr(registration, 'upsert', parallel_insert)
+        response = client.post(self.url, data=self.data)
+        assert response.status_code == 200, (
+            'Пара username и email, добавленная параллельным запросом, '
+            'не должна становиться ошибкой валидации'
+        )
+        assert django_user_model.objects.count() == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_parallel_signups(self, django_user_model):
+        from django.db import connection
+        from rest_framework.test import APIClient
+
+        requests = [self.data] * 12 + [
+            {'username': 'newuser', 'email': f'other{i}@yamdb.fake'}
+            for i in range(4)
+        ]
+
+        def signup(data):
+            try:
+                return APIClient().post(self.url, data=data).status_code
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            statuses = list(executor.map(signup, requests))
+        assert statuses[:12] == [200] * 12, (
+            'Параллельные регистрации одного пользователя не должны '
+            'приводить к ошибкам'
+        )
+        assert statuses[12:] == [400] * 4
+        assert django_user_model.objects.count() == 1, (
+            'Параллельные регистрации не должны создавать дубликаты'
+        )
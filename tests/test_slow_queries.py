@@ -0,0 +1,102 @@
+import pytest
+from django.db import connection
+
+
+@pytest.fixture
+def slow_log(settings):
+    from api.slow_queries import slow_query_log
+
+    # Порог меньше любого запроса: в журнал попадает все.
+    settings.SLOW_QUERY_MS = 1e-6
+    slow_query_log.clear()
+    yield slow_query_log
+    slow_query_log.clear()
+
+
+class TestFingerprint:
+
+    def test_values_do_not_matter(self):
+        from api.slow_queries import fingerprint, normalize
+
+        first = ('SELECT "t"."id" FROM "t" WHERE "t"."id" IN (%s, %s) '
+                 "AND name = 'a' LIMIT 5")
+        second = ('SELECT "t"."id" FROM "t"\n WHERE "t"."id" IN (%s) '
+                  "AND name = 'b''c' LIMIT 10")
+        assert fingerprint(first) == fingerprint(second)
+        assert normalize(first) == (
+            'SELECT "t"."id" FROM "t" WHERE "t"."id" IN (?) '
+            'AND name = ? LIMIT ?')
+        assert fingerprint(first) != fingerprint(
+            first.replace('"id" IN', '"year" IN'))
+
+
+@pytest.mark.django_db
+class TestSlowQueryLog:
+
+    def test_request_entries(self, client, catalogue, slow_log):
+        client.get('/api/v1/genres/')
+        entries = slow_log.snapshot()
+        assert entries, 'Запросы дольше порога должны попасть в журнал'
+        genres = [entry for entry in entries
+                  if entry['sql'].startswith('SELECT "reviews_genre"')]
+        assert len(genres) == 1
+        entry = genres[0]
+        assert (entry['route'], entry['view']) == (
+            'genres-list', 'GenreViewSet.list')
+        assert entry['plan'] and 'reviews_genre' in entry['plan'], (
+            'Для SELECT должен сохраняться план выполнения'
+        )
+        client.get('/api/v1/genres/', {'search': 'Жанр'})
+        client.get('/api/v1/genres/')
+        assert len([entry for entry in slow_log.snapshot()
+                    if entry['fingerprint'] == genres[0]['fingerprint']
+                    ]) == 1, 'Повторы одного отпечатка не плодят записей'
+
+    def test_serializer_field_and_writes(self, catalogue):
+        from api.serializers import TitleSerializer
+        from api.slow_queries import SlowQueryLog, SlowQueryWrapper
+        from reviews.models import Title
+
+        log = SlowQueryLog(max_size=10)
+        wrapper = SlowQueryWrapper(1e-6, log=log)
+        title = Title.objects.get(pk=catalogue['titles'][2].pk)
+        with connection.execute_wrapper(wrapper):
+            TitleSerializer(title).data
+            Title.objects.filter(pk=title.pk).update(description='Да')
+        fields = {entry['field'] for entry in log.snapshot()}
+        assert 'TitleSerializer.genre' in fields, (
+            'Запрос из поля сериализатора должен указывать на это поле'
+        )
+        update = [entry for entry in log.snapshot()
+                  if entry['sql'].startswith('UPDATE')]
+        assert update and update[0]['plan'] is None, (
+            'Изменяющие запросы не должны выполняться повторно для EXPLAIN'
+        )
+
+    def test_lru_bound(self, catalogue):
+        from api.slow_queries import SlowQueryLog, SlowQueryWrapper
+        from reviews.models import Category, Genre, Title
+
+        log = SlowQueryLog(max_size=2)
+        with connection.execute_wrapper(SlowQueryWrapper(1e-6, log=log)):
+            for model in (Title, Genre, Category, Title):
+                list(model.objects.all())
+        tables = [entry['sql'].split(' FROM ')[1].split()[0]
+                  for entry in log.snapshot()]
+        assert sorted(tables) == ['"reviews_category"', '"reviews_title"'], (
+            'Журнал хранит только последние max_size отпечатков'
+        )
+
+    def test_endpoint(self, client, admin_client, slow_log):
+        assert client.get('/api/v1/db/slow-queries/').status_code == 401
+        response = admin_client.get('/api/v1/db/slow-queries/')
+        assert response.status_code == 200
+        assert isinstance(response.json(), list)
+
+    def test_disabled_by_default(self, client, catalogue, settings):
+        from api.slow_queries import slow_query_log
+
+        slow_query_log.clear()
+        settings.SLOW_QUERY_MS = 0
+        client.get('/api/v1/genres/')
+        assert slow_query_log.snapshot() == []
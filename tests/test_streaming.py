@@ -0,0 +1,75 @@
+import datetime as dt
+from collections import OrderedDict
+from decimal import Decimal
+
+import pytest
+
+
+def body(response):
+    assert response.status_code == 200
+    if response.streaming:
+        return b''.join(response.streaming_content)
+    return response.content
+
+
+class TestFastJSONRenderer:
+
+    def test_same_bytes_as_drf(self, settings):
+        pytest.importorskip('orjson')
+        from api.renderers import FastJSONRenderer
+        from django.utils import timezone
+        from rest_framework.renderers import JSONRenderer
+
+        data = OrderedDict([
+            ('name', 'Произведение "1" '),
+            ('pub_date', dt.datetime(2022, 1, 2, 3, 4, 5, 678901,
+                                     tzinfo=timezone.utc)),
+            ('day', dt.date(2022, 1, 2)),
+            ('score', Decimal('9.50')),
+            ('rating', None),
+            ('nested', [{1: True, 'list': [1.5, 'Жанр']}]),
+        ])
+        settings.API_JSON_ENCODER = 'orjson'
+        assert FastJSONRenderer().render(data) == JSONRenderer().render(
+            data), 'Вывод через orjson должен совпадать с JSONRenderer DRF'
+
+
+@pytest.mark.django_db
+class TestStreamingList:
+
+    @pytest.fixture(autouse=True)
+    def small_chunks(self, settings, monkeypatch):
+        from api.streaming import StreamingListMixin
+
+        settings.API_STREAMING_MIN_LIMIT = 3
+        monkeypatch.setattr(StreamingListMixin, 'stream_chunk_size', 2)
+
+    def both_modes(self, client, settings, url, params):
+        from django.core.cache import caches
+
+        streamed = client.get(url, params)
+        assert streamed.streaming, f'Страница `{url}` должна идти потоком'
+        settings.API_STREAMING_MIN_LIMIT = 1000
+        caches['default'].clear()
+        regular = client.get(url, params)
+        assert not regular.streaming
+        return body(streamed), body(regular)
+
+    @pytest.mark.parametrize('lean', (True, False))
+    def test_titles_identical(self, client, catalogue, settings, lean):
+        settings.LEAN_LIST_SERIALIZATION = lean
+        streamed, regular = self.both_modes(
+            client, settings, '/api/v1/titles/', {'limit': 4, 'offset': 1})
+        assert streamed == regular, (
+            'Потоковый ответ должен совпадать с обычным побайтно'
+        )
+
+    def test_users_identical(self, admin_client, catalogue, settings):
+        streamed, regular = self.both_modes(
+            admin_client, settings, '/api/v1/users/', {'limit': 3})
+        assert streamed == regular
+
+    def test_small_pages_not_streamed(self, client, catalogue):
+        response = client.get('/api/v1/titles/', {'limit': 2})
+        assert not response.streaming
+        assert len(response.json()['results']) == 2
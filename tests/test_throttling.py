@@ -0,0 +1,69 @@
+import pytest
+
+
+@pytest.fixture
+def rates(settings):
+    settings.REST_FRAMEWORK = {
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': {
+            'anon_read': '3/min', 'user_write': '2/min', 'signup': '2/min'},
+    }
+
+
+@pytest.mark.django_db
+class TestThrottling:
+
+    def test_anon_read_bucket(self, client, rates):
+        statuses = [
+            client.get('/api/v1/genres/').status_code for _ in range(4)]
+        assert statuses == [200, 200, 200, 429], (
+            'Анонимное чтение должно ограничиваться емкостью корзины'
+        )
+        response = client.get('/api/v1/genres/')
+        assert int(response['Retry-After']) > 0, (
+            'Ответ 429 должен содержать заголовок Retry-After'
+        )
+
+    def test_anon_buckets_per_client_address(self, client, rates):
+        def statuses(forwarded_for):
+            return [client.get(
+                '/api/v1/genres/', HTTP_X_FORWARDED_FOR=forwarded_for
+            ).status_code for _ in range(4)]
+
+        assert statuses('10.0.0.1') == [200, 200, 200, 429]
+        assert statuses('10.0.0.2') == [200, 200, 200, 429], (
+            'Анонимные клиенты за nginx должны ограничиваться каждый '
+            'в своей корзине по адресу из X-Forwarded-For'
+        )
+        assert statuses('10.0.0.3, 10.0.0.1')[0] == 429, (
+            'Адрес, подставленный клиентом перед адресом от nginx, '
+            'не должен давать новую корзину'
+        )
+
+    def test_scoped_signup_limit(self, client, rates, settings):
+        settings.EMAIL_QUEUE = 'sync'
+        statuses = [
+            client.post('/api/v1/auth/signup/', data={
+                'username': f'user{i}', 'email': f'user{i}@yamdb.fake',
+            }).status_code
+            for i in range(3)
+        ]
+        assert statuses == [200, 200, 429], (
+            'Регистрация должна ограничиваться лимитом signup из настроек'
+        )
+
+    def test_authenticated_reads_are_not_limited(self, admin_client, rates):
+        for _ in range(5):
+            assert admin_client.get('/api/v1/genres/').status_code == 200
+        assert admin_client.post(
+            '/api/v1/genres/', data={'name': 'Жанр', 'slug': 'genre'}
+        ).status_code == 201
+        assert admin_client.post(
+            '/api/v1/genres/', data={'name': 'Жанр 2', 'slug': 'genre-2'}
+        ).status_code == 201
+        assert admin_client.post(
+            '/api/v1/genres/', data={'name': 'Жанр 3', 'slug': 'genre-3'}
+        ).status_code == 429, (
+            'Изменения авторизованных пользователей должны '
+            'ограничиваться лимитом user_write'
+        )
@@ -0,0 +1,60 @@
+import re
+
+import pytest
+from django.db import connection
+
+FILTERS = (
+    {'genre': 'genre-1'},
+    {'category': 'category-0'},
+    {'year': 2003},
+    {'name': 'Произведение 3'},
+    {'category': 'category-0', 'year': 2003},
+    {'genre': 'genre-1', 'year': 2004},
+    {'genre': 'genre-1', 'category': 'category-2'},
+    {'genre': 'genre-2', 'category': 'category-2', 'year': 2005},
+)
+# Полный проход по таблице или индексу: SQLite пишет SCAN, PostgreSQL -
+# Seq Scan. Поиск по индексу в SQLite - SEARCH, в PostgreSQL - Index Scan.
+SEQUENTIAL_SCAN = re.compile(r'\bSCAN (?!CONSTANT ROW)|Seq Scan')
+
+
+def plan(params):
+    from api.filters import TitleFilter
+    from reviews.models import Title
+
+    queryset = TitleFilter(
+        params, queryset=Title.objects.order_by('name', 'id')).qs
+    if connection.vendor == 'postgresql':
+        # На нескольких строках PostgreSQL выбирает Seq Scan даже при
+        # подходящем индексе; запрет показывает, есть ли индексный план.
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+    return queryset.explain(), queryset
+
+
+@pytest.mark.django_db
+class TestTitleFilterPlans:
+
+    @pytest.mark.parametrize('params', FILTERS, ids=str)
+    def test_no_sequential_scans(self, catalogue, params, record_property):
+        explained, _ = plan(params)
+        record_property('explain', explained)
+        scans = [line for line in explained.splitlines()
+                 if SEQUENTIAL_SCAN.search(line)]
+        assert not scans, (
+            f'Фильтр {params} не должен читать таблицы целиком:\n{explained}'
+        )
+
+    def test_genre_without_duplicates(self, catalogue):
+        from reviews.models import Title
+
+        _, queryset = plan({'genre': 'genre-0'})
+        names = list(queryset.values_list('name', flat=True))
+        assert names == [f'Произведение {i}' for i in range(6)], (
+            'Произведение с несколькими жанрами должно встречаться один раз'
+        )
+        _, queryset = plan({'genre': 'genre-2', 'category': 'category-2'})
+        assert list(queryset) == list(Title.objects.filter(
+            name__in=('Произведение 2', 'Произведение 5')).order_by('name'))
+        _, queryset = plan({'genre': 'unknown'})
+        assert not queryset.exists()
@@ -0,0 +1,43 @@
+import pytest
+
+
+@pytest.mark.django_db
+class TestTitleOrdering:
+    url = '/api/v1/titles/'
+
+    def names(self, client, ordering):
+        response = client.get(self.url, {'ordering': ordering, 'limit': 10})
+        assert response.status_code == 200
+        return [title['name'] for title in response.json()['results']]
+
+    def test_rating_without_scores_last(self, client, catalogue):
+        from reviews.models import Review
+
+        author = catalogue['reviews'][0].author
+        Review.objects.create(
+            author=author, title=catalogue['titles'][2], text='Да', score=9)
+        for ordering, unrated in (('rating', (1, 3, 4, 5)),
+                                  ('-rating', (5, 4, 3, 1))):
+            names = self.names(client, ordering)
+            assert len(names) == 6
+            assert names[2:] == [f'Произведение {i}' for i in unrated], (
+                'Произведения без оценок должны идти в конце, '
+                'по id в направлении сортировки'
+            )
+        assert self.names(client, '-rating')[:2] == [
+            'Произведение 2', 'Произведение 0']
+        assert self.names(client, 'rating')[:2] == [
+            'Произведение 0', 'Произведение 2']
+
+    def test_year_and_review_count(self, client, catalogue):
+        assert self.names(client, '-year') == [
+            f'Произведение {i}' for i in range(5, -1, -1)]
+        assert self.names(client, '-review_count')[0] == 'Произведение 0', (
+            'review_count должен сортировать по количеству отзывов'
+        )
+
+    def test_unknown_field_ignored(self, client, catalogue):
+        assert self.names(client, 'description') == [
+            f'Произведение {i}' for i in range(6)], (
+            'Недопустимое поле сортировки не должно менять порядок'
+        )
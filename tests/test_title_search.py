@@ -0,0 +1,67 @@
+import pytest
+
+
+@pytest.mark.django_db
+class TestTitleSearch:
+    url = '/api/v1/titles/'
+
+    @pytest.fixture
+    def titles(self):
+        from reviews.models import Title
+
+        return [
+            Title.objects.create(
+                name='Война и мир', year=1869,
+                description='Роман-эпопея о войне 1812 года'),
+            Title.objects.create(
+                name='Звёздные войны', year=1977,
+                description='Космическая опера'),
+            Title.objects.create(name='Мир', year=2000, description='Фильм'),
+        ]
+
+    def search(self, client, query):
+        response = client.get(self.url, {'search': query})
+        assert response.status_code == 200, (
+            f'Поиск `{query}` по `{self.url}` должен возвращать код 200'
+        )
+        return [title['name'] for title in response.json()['results']]
+
+    def test_search_by_words_and_prefix(self, client, titles):
+        assert self.search(client, 'война мир') == ['Война и мир'], (
+            'Поиск должен находить произведения, содержащие все слова запроса'
+        )
+        assert self.search(client, 'войн') == [
+            'Война и мир', 'Звёздные войны'], (
+            'Поиск должен находить слова по их началу'
+        )
+        assert self.search(client, 'опера') == ['Звёздные войны'], (
+            'Поиск должен учитывать описание произведения'
+        )
+
+    # Кеш ответов сбрасывается после фиксации транзакции.
+    @pytest.mark.django_db(transaction=True)
+    def test_search_follows_title_changes(self, client, titles):
+        assert self.search(client, 'опера') == ['Звёздные войны']
+        titles[1].description = 'Фантастика'
+        titles[1].save()
+        assert self.search(client, 'опера') == [], (
+            'Индекс поиска должен обновляться при изменении произведения'
+        )
+
+    def test_all_matches_are_paginated(self, client, titles):
+        from reviews.models import Title
+        from reviews.search import title_index
+
+        Title.objects.bulk_create(
+            Title(name=f'Сериал {i:04}', year=2000, description='Эпизоды')
+            for i in range(1200))
+        title_index.reset()
+        data = client.get(self.url, {'search': 'сериал', 'limit': 100,
+                                     'offset': 1150}).json()
+        assert data['count'] == 1200, (
+            'Количество найденных произведений не должно обрезаться'
+        )
+        assert [title['name'] for title in data['results']] == [
+            f'Сериал {i:04}' for i in range(1150, 1200)]
+        assert data['next'] is None
+        assert self.search(client, 'война мир') == ['Война и мир']